@@ -0,0 +1 @@
+"""Benchmark suite and local fake BOCHK endpoint."""
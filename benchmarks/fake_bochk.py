@@ -0,0 +1,186 @@
+"""
+Local stand-in for BOCHK's jsonAvailableDateAndTime.action.
+
+Serves dateQuota responses with configurable latency, error rate and quota
+pattern, so pollers and benchmarks can run without touching the real site.
+
+Usage:
+    python -m benchmarks.fake_bochk --port 8099 --latency 0.05 --pattern flip
+Then point a target (or BOCHK_API_URL) at http://127.0.0.1:8099/jsonAvailableDateAndTime.action
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+PATTERNS = ("closed", "open", "flip", "random")
+
+API_PATH = "/jsonAvailableDateAndTime.action"
+
+
+def build_quota(pattern, cycle, days=60, start=None):
+    """Build a dateQuota dict for the given pattern.
+
+    Args:
+        pattern (str): "closed" (all F), "open" (every 7th date available),
+            "flip" (one date toggles every 5 requests) or "random".
+        cycle (int): Request counter, drives the time-varying patterns.
+        days (int): Number of dates in the quota.
+        start (date): First date (default: today).
+
+    Returns:
+        dict: YYYYMMDD -> status ("F" = full, "A" = available)
+    """
+    start = start or date.today()
+    dates = [(start + timedelta(days=i)).strftime("%Y%m%d") for i in range(days)]
+    quota = {d: "F" for d in dates}
+    if pattern == "open":
+        for d in dates[::7]:
+            quota[d] = "A"
+    elif pattern == "flip":
+        if (cycle // 5) % 2:
+            quota[dates[days // 2]] = "A"
+    elif pattern == "random":
+        for d in dates:
+            if random.random() < 0.05:
+                quota[d] = "A"
+    return quota
+
+
+class FakeBochkServer:
+    """Threaded HTTP server answering like the BOCHK availability endpoint.
+
+    Attributes:
+        latency (float): Seconds to wait before answering.
+        jitter (float): Extra random latency, up to this many seconds.
+        error_rate (float): Fraction of requests answered with HTTP 500.
+        throttle_rate (float): Fraction answered with a non-SUCCESS eaiCode.
+        pattern (str): Quota pattern, see build_quota().
+        requests (int): Number of requests served.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, pattern="closed", days=60):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.pattern = pattern
+        self.days = days
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.httpd.handle_error = self._handle_error
+        self.thread = None
+
+    @property
+    def url(self):
+        """Full URL of the fake endpoint."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def start(self):
+        """Serve in a background thread."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handle_error(self, request, client_address):
+        """Ignore clients dropping kept-alive connections; report anything else."""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            ThreadingHTTPServer.handle_error(self.httpd, request, client_address)
+
+    def respond(self, form):
+        """Build (status, body) for one request."""
+        with self.lock:
+            self.requests += 1
+            cycle = self.requests
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if random.random() < self.error_rate:
+            return 500, {"error": "internal error"}
+        if random.random() < self.throttle_rate:
+            return 200, {"eaiCode": "SYSTEM_BUSY", "dateQuota": None}
+        app_date = form.get("bean.appDate", [""])[0]
+        body = {
+            "eaiCode": "SUCCESS",
+            "acceptTerms": None,
+            "appDate": app_date or None,
+            "dateQuota": build_quota(self.pattern, cycle, self.days),
+        }
+        return 200, body
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                if self.path.split("?")[0] != API_PATH:
+                    status, body = 404, {"error": "not found"}
+                else:
+                    status, body = server.respond(form)
+                payload = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up (timeout)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake BOCHK availability endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HTTP 500s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of non-SUCCESS eaiCodes")
+    parser.add_argument("--pattern", choices=PATTERNS, default="flip")
+    args = parser.parse_args()
+
+    server = FakeBochkServer(
+        args.host, args.port, args.latency, args.jitter,
+        args.error_rate, args.throttle_rate, args.pattern,
+    )
+    print(f"Fake BOCHK endpoint on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Benchmark suite for the BOCHK monitor.
+
+Measures poll-cycle latency against a local fake endpoint, parse() throughput,
+read_history_from_logs() on synthetic 30/90/365-day log corpora, dashboard and
+history response times, notification enqueue latency, and cold-start time of
+the entry points. Results are written
+as flat JSON metrics so two runs can be compared.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --only parse,poll --output benchmarks/results/baseline.json
+    python -m benchmarks.run --compare benchmarks/results/baseline.json --threshold 0.25
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.fake_bochk import FakeBochkServer, build_quota  # noqa: E402
+
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+# name -> function(args, workdir) returning {metric: (value, unit, better)}
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under name."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def _time_calls(func, repeat):
+    """Run func repeat times and return per-call durations in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _latency_metrics(prefix, samples, scale=1000.0, unit="ms"):
+    """Summarize durations as p50/p95/max metrics (lower is better)."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        f"{prefix}.p50": (statistics.median(ordered) * scale, unit, "lower"),
+        f"{prefix}.p95": (p95 * scale, unit, "lower"),
+        f"{prefix}.max": (ordered[-1] * scale, unit, "lower"),
+    }
+
+
+def _history_store(workdir, name="history.db"):
+    """Point the process-wide history store at a fresh database in workdir."""
+    history_store = importlib.import_module("src.history_store")
+    store = history_store.HistoryStore(os.path.join(workdir, name))
+    store.set_meta("logs_imported", "1")
+    history_store._STORE = store
+    return store
+
+
+@benchmark("poll")
+def bench_poll(args, workdir):
+    """Fetch and full-cycle latency against the fake endpoint."""
+    from src.changes import QuotaChangeDetector
+    from src.monitor import get_jsonAvailableDateAndTime
+
+    store = _history_store(workdir, "poll.db")
+    detector = QuotaChangeDetector()
+    with FakeBochkServer(latency=args.latency, pattern="flip") as server:
+        def fetch():
+            return get_jsonAvailableDateAndTime(url=server.url)
+
+        # Warm up the keep-alive connection
+        fetch()
+        metrics = _latency_metrics("poll.fetch", _time_calls(fetch, args.repeat))
+
+        counter = iter(range(10 ** 9))
+
+        def cycle():
+            res_json = fetch()
+            change = detector.update(res_json)
+            checked_at = (datetime(2026, 1, 1) + timedelta(seconds=next(counter))).strftime("%Y-%m-%d %H:%M:%S")
+            store.record(checked_at, len(change.available_list), change.available_list, res_json.get("eaiCode"), None)
+            event = change.event()
+            if event is not None:
+                store.record_quota_event(checked_at, *event)
+
+        metrics.update(_latency_metrics("poll.cycle", _time_calls(cycle, args.repeat)))
+    return metrics
+
+
+@benchmark("parse")
+def bench_parse(args, workdir):
+    """parse() throughput on a realistic dateQuota."""
+    from src.monitor import parse
+
+    res_json = {"eaiCode": "SUCCESS", "dateQuota": build_quota("open", 0, days=args.quota_days)}
+    check_dates = list(res_json["dateQuota"])[::3]
+    metrics = {}
+    for label, dates in (("all", ["all"]), ("list", check_dates)):
+        loops = args.repeat * 200
+        started = time.perf_counter()
+        for _ in range(loops):
+            parse(res_json, dates)
+        elapsed = time.perf_counter() - started
+        metrics[f"parse.{label}"] = (loops / elapsed, "ops/s", "higher")
+    return metrics
+
+
+def _write_log_corpus(logs_dir, days, cycles_per_day, quota_days):
+    """Write synthetic daily log files in the legacy raw-JSON-every-cycle format."""
+    start = datetime(2025, 1, 1)
+    step = 86400 // cycles_per_day
+    for day in range(days):
+        current = start + timedelta(days=day)
+        path = os.path.join(logs_dir, current.strftime("bochk_monitor_%Y_%m_%d.log"))
+        with open(path, "w", encoding="utf-8") as handle:
+            for cycle in range(cycles_per_day):
+                stamp = (current + timedelta(seconds=cycle * step)).strftime("%Y-%m-%d %H:%M:%S")
+                quota = build_quota("flip", day * cycles_per_day + cycle, days=quota_days, start=current.date())
+                response = {"acceptTerms": None, "eaiCode": "SUCCESS", "dateQuota": quota}
+                available = [d for d, status in quota.items() if status != "F"]
+                handle.write(f"{stamp},123 INFO: {response}\n")
+                if available:
+                    handle.write(f"{stamp},124 INFO: Monitor cycle: {len(available)} available dates: {available}\n")
+
+
+@benchmark("history_logs")
+def bench_history_logs(args, workdir):
+    """read_history_from_logs() cold, warm and after an append, per corpus size."""
+    logger_module = importlib.import_module("src.logger")
+    metrics = {}
+    for days in args.days:
+        logs_dir = os.path.join(workdir, f"logs_{days}")
+        os.makedirs(logs_dir, exist_ok=True)
+        _write_log_corpus(logs_dir, days, args.cycles_per_day, args.quota_days)
+        logger_module.LOGS_DIR = logs_dir
+        logger_module.HISTORY_INDEX_DIR = os.path.join(logs_dir, ".history_index")
+        logger_module._history_index = None
+
+        started = time.perf_counter()
+        entries = logger_module.read_history_from_logs()
+        metrics[f"history_logs.{days}d.cold"] = ((time.perf_counter() - started) * 1000, "ms", "lower")
+
+        samples = _time_calls(logger_module.read_history_from_logs, 3)
+        metrics[f"history_logs.{days}d.warm"] = (min(samples) * 1000, "ms", "lower")
+
+        last_file = sorted(f for f in os.listdir(logs_dir) if f.endswith(".log"))[-1]
+        with open(os.path.join(logs_dir, last_file), "a", encoding="utf-8") as handle:
+            handle.write("2030-01-01 00:00:00,000 INFO: Monitor cycle: 1 available dates: ['20300101']\n")
+        started = time.perf_counter()
+        logger_module.read_history_from_logs()
+        metrics[f"history_logs.{days}d.append"] = ((time.perf_counter() - started) * 1000, "ms", "lower")
+        metrics[f"history_logs.{days}d.entries"] = (len(entries), "entries", "info")
+        shutil.rmtree(logs_dir, ignore_errors=True)
+    return metrics
+
+
+@benchmark("routes")
+def bench_routes(args, workdir):
+    """Response time of the dashboard and history pages."""
+    store = _history_store(workdir, "routes.db")
+    start = datetime(2025, 1, 1)
+    step = 86400 // args.cycles_per_day
+    entries = []
+    for i in range(max(args.days) * args.cycles_per_day):
+        available = ["20250301"] if i % 50 == 0 else []
+        entries.append({
+            "checked_at": (start + timedelta(seconds=i * step)).strftime("%Y-%m-%d %H:%M:%S"),
+            "available_num": len(available),
+            "available_list": available,
+            "eai_code": "SUCCESS",
+            "error": None,
+        })
+    store.import_entries(entries)
+
+    app_module = importlib.import_module("src.app")
+    client = app_module.create_app().test_client()
+    auth = {"Authorization": "Basic " + __import__("base64").b64encode(
+        f"{os.getenv('ADMIN_USERNAME', 'admin')}:{os.getenv('ADMIN_PASSWORD', 'admin')}".encode()
+    ).decode()}
+
+    metrics = {}
+    for label, path in (("index", "/"), ("history", "/history"), ("api_history", "/api/history?limit=100")):
+        def get(path=path):
+            response = client.get(path, headers=auth)
+            response.get_data()
+            assert response.status_code == 200, (path, response.status_code)
+        get()
+        metrics.update(_latency_metrics(f"routes.{label}", _time_calls(get, args.repeat)))
+    return metrics
+
+
+@benchmark("notify")
+def bench_notify(args, workdir):
+    """Latency of handing a notification to the dispatcher, and of delivering it per policy."""
+    from src.dispatcher import NotificationDispatcher
+
+    dispatcher = NotificationDispatcher(send=lambda title, content: True, maxsize=args.repeat * 10 + 10)
+    dispatcher.start()
+    samples = _time_calls(lambda: dispatcher.enqueue("benchmark", "content"), args.repeat * 10)
+    dispatcher.stop(timeout=10)
+    metrics = _latency_metrics("notify.enqueue", samples, scale=1e6, unit="us")
+
+    # Delivery latency per policy with a slow primary (50ms) and a fast backup (10ms)
+    from src.notifier import Channel, Notifier
+
+    class SleepChannel(Channel):
+        def __init__(self, name, delay):
+            super().__init__(timeout=1.0)
+            self.name = name
+            self.delay = delay
+
+        def deliver(self, title, content, receivers):
+            time.sleep(self.delay)
+
+    for policy in ("fallback", "all", "first", "hedged"):
+        notifier = Notifier([SleepChannel("slow", 0.05), SleepChannel("fast", 0.01)], policy, hedge_seconds=0.02)
+        samples = _time_calls(lambda: notifier.send("benchmark", "content"), max(5, args.repeat // 5))
+        notifier.close()
+        metrics.update(_latency_metrics(f"notify.deliver.{policy}", samples))
+    return metrics
+
+
+# Modules the entry points must not load at import time (they are imported lazily)
+LAZY_MODULES = ("resend", "tqdm", "flask_basicauth", "asyncio", "requests", "multiprocessing")
+
+# label -> code run in a fresh interpreter
+STARTUP_SNIPPETS = {
+    "import_web": "import web",
+    "create_app": "import web; web.create_app()",
+    "import_run_cli": "import run_cli",
+}
+
+
+def _startup_sample(code):
+    """Run code in a fresh interpreter; return (seconds, lazy modules it loaded)."""
+    probe = (
+        "import sys, time; started = time.perf_counter(); "
+        f"{code}; elapsed = time.perf_counter() - started; "
+        f"print('startup', elapsed, *(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=PROJECT_ROOT, env=dict(os.environ, PROFILE_TARGETS=""),
+        capture_output=True, text=True, timeout=120, check=True,
+    ).stdout
+    # The last line is ours (the app may print/log before it)
+    fields = output.strip().splitlines()[-1].split()
+    return float(fields[1]), fields[2:]
+
+
+@benchmark("startup")
+def bench_startup(args, workdir):
+    """Cold-start time of web.py / run_cli.py and which lazy modules they load."""
+    metrics = {}
+    for label, code in STARTUP_SNIPPETS.items():
+        samples = []
+        loaded = []
+        for _ in range(max(3, args.repeat // 10)):
+            elapsed, loaded = _startup_sample(code)
+            samples.append(elapsed)
+        metrics.update(_latency_metrics(f"startup.{label}", samples))
+        if label != "create_app":
+            # Any module here is an import-time regression
+            metrics[f"startup.{label}.eager_modules"] = (len(loaded), "modules", "lower")
+            if loaded:
+                print(f"  {label} loaded lazy modules: {', '.join(loaded)}")
+    return metrics
+
+
+def _git_revision():
+    """Short git revision of the working tree, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Print metric changes versus a baseline run.
+
+    Returns:
+        list: Names of metrics that regressed by more than threshold.
+    """
+    regressions = []
+    print(f"\n{'metric':45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metric in sorted(current["results"].items()):
+        old = baseline["results"].get(name)
+        if old is None or metric["better"] == "info" or not old["value"]:
+            continue
+        change = metric["value"] / old["value"] - 1
+        worse = change > threshold if metric["better"] == "lower" else change < -threshold
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:45} {old['value']:12.3f} {metric['value']:12.3f} {change:+8.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BOCHK monitor benchmarks")
+    parser.add_argument("--only", help="comma-separated benchmarks: " + ",".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=50, help="samples per latency metric")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake endpoint latency (seconds)")
+    parser.add_argument("--days", default="30,90,365", help="log corpus sizes in days")
+    parser.add_argument("--cycles-per-day", type=int, default=144, help="monitor cycles per synthetic day")
+    parser.add_argument("--quota-days", type=int, default=30, help="dates per dateQuota")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+    args.days = [int(d) for d in args.days.split(",") if d.strip()]
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix="bochk_bench_")
+    # Everything the app writes (lock, shared state, metrics, logs) stays in
+    # workdir; set before src is imported, as its paths are read at import
+    os.environ["DATA_DIR"] = os.path.join(workdir, "data")
+    results = {}
+    try:
+        for name in names:
+            print(f"Running {name}...", flush=True)
+            for metric, (value, unit, better) in BENCHMARKS[name](args, workdir).items():
+                results[metric] = {"value": round(value, 4), "unit": unit, "better": better}
+                print(f"  {metric:45} {value:14.3f} {unit}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+        handle.write("\n")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,8 @@ BOCHK Appointment Monitor Package
 __version__ = "1.0.0"
 __author__ = "Developer"
 
-from .config import load_config, save_config
+from .config import config_version, load_config, save_config
 from .send_email import send_email
 from .logger import logger
 
-__all__ = ["load_config", "save_config", "send_email", "logger"]
+__all__ = ["config_version", "load_config", "save_config", "send_email", "logger"]
@@ -0,0 +1,280 @@
+"""
+Notification coalescing module.
+Turns "these dates are open" into alerts for newly opened dates only: a date
+is alerted once and stays quiet while it remains open, a reopening within the
+dedup window isn't alerted again, and alerts can be held for a short digest
+interval so that several openings go out as one email. A date counts as
+alerted only once its email is delivered: if the queue is full or every
+channel fails it is forgotten again and the next update retries it. The state
+is kept in data/alert_state.json, so a restart or redeploy doesn't send
+everything again.
+"""
+import json
+import os
+import threading
+import time
+
+from .config import env_number, get_data_dir
+from .dispatcher import enqueue_email
+from .leader import write_json_atomic
+from .logger import logger
+from .metrics import ALERTS
+
+
+# Alerted dates and pending digests, survives restarts
+ALERT_STATE_PATH = os.path.join(get_data_dir(), "alert_state.json")
+# A date that closes and reopens within this many seconds of its alert isn't alerted again
+NOTIFY_DEDUP_SECONDS = env_number("NOTIFY_DEDUP_SECONDS", 3600)
+# Collect new dates for this many seconds and send them as one email (0 = send right away)
+NOTIFY_DIGEST_SECONDS = env_number("NOTIFY_DIGEST_SECONDS", 0)
+
+
+class AlertGroup:
+    """Dates currently open for one recipient group, and how to tell them.
+
+    Attributes:
+        dates (list): Open dates the group watches.
+        receivers (list): Recipients (None: the configured receivers).
+        title (str): Email subject.
+        body (str): Email body with a ``{dates}`` placeholder.
+    """
+
+    __slots__ = ("dates", "receivers", "title", "body")
+
+    def __init__(self, dates, receivers, title, body):
+        self.dates = dates
+        self.receivers = receivers
+        self.title = title
+        self.body = body
+
+
+class AlertCoalescer:
+    """Decides which open dates are worth an email, and when.
+
+    update() is given the complete set of open dates per group every time
+    it changes; groups are named by a scope (one per poller, e.g.
+    ``poller`` or ``target:<name>``) and a key within it (``*`` for the
+    configured receivers, else a subscriber name). A group missing from an
+    update has no open dates.
+
+    Attributes:
+        seen (dict): scope -> key -> date -> [alerted at (epoch), still open].
+        pending (dict): scope -> key -> digest waiting to be sent.
+        retry (set): Scopes with an undelivered email since their last
+            update(); see retry_pending().
+    """
+
+    def __init__(
+        self,
+        path=ALERT_STATE_PATH,
+        dedup_seconds=NOTIFY_DEDUP_SECONDS,
+        digest_seconds=NOTIFY_DIGEST_SECONDS,
+        send=enqueue_email,
+        clock=time.time,
+    ):
+        self.path = path
+        self.dedup_seconds = max(0.0, float(dedup_seconds))
+        self.digest_seconds = max(0.0, float(digest_seconds))
+        self.send = send
+        self.clock = clock
+        self.lock = threading.Lock()
+        self._timer = None
+        self.seen = {}
+        self.pending = {}
+        self.retry = set()
+        self.load()
+
+    def load(self):
+        """(Re)load the state saved by this or a previous process."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Ignoring unreadable alert state {self.path}: {exc}")
+            data = {}
+        with self.lock:
+            self.seen = data.get("seen") or {}
+            self.pending = data.get("pending") or {}
+
+    def update(self, scope, groups):
+        """Record the open dates of every group in scope and alert the new ones.
+
+        Args:
+            scope (str): Poller the groups belong to.
+            groups (dict): key -> AlertGroup with the dates open right now.
+
+        Returns:
+            dict: key -> dates alerted (sent or added to a digest) by this call.
+        """
+        now = self.clock()
+        alerted = {}
+        outgoing = []
+        with self.lock:
+            self.retry.discard(scope)
+            seen = self.seen.setdefault(scope, {})
+            pending = self.pending.setdefault(scope, {})
+            dirty = False
+            for key in set(seen) | set(groups) | set(pending):
+                group = groups.get(key)
+                open_dates = group.dates if group is not None else ()
+                new_dates, changed = self._track(seen.setdefault(key, {}), open_dates, now)
+                dirty = dirty or changed
+                digest = pending.get(key)
+                if digest is not None:
+                    # Dates that closed again before the digest went out are dropped
+                    still_open = [date for date in digest["dates"] if date in open_dates]
+                    if len(still_open) != len(digest["dates"]):
+                        for date in set(digest["dates"]) - set(still_open):
+                            seen[key].pop(date, None)
+                        digest["dates"] = still_open
+                        dirty = True
+                    if not still_open:
+                        del pending[key]
+                if not seen[key]:
+                    del seen[key]
+                if not new_dates:
+                    continue
+                alerted[key] = new_dates
+                dirty = True
+                if self.digest_seconds <= 0:
+                    outgoing.append((scope, key, group.title, group.body, group.receivers, new_dates))
+                    continue
+                digest = pending.setdefault(key, {
+                    "since": now,
+                    "dates": [],
+                    "title": group.title,
+                    "body": group.body,
+                    "receivers": group.receivers,
+                })
+                digest["dates"].extend(new_dates)
+                ALERTS.inc(len(new_dates), outcome="batched")
+            if not seen:
+                del self.seen[scope]
+            if not pending:
+                del self.pending[scope]
+            if dirty:
+                self._save()
+            self._schedule_flush(now)
+        for item in outgoing:
+            self._send(*item)
+        return alerted
+
+    def flush(self):
+        """Send the digests whose batch interval is over (runs on a timer)."""
+        now = self.clock()
+        outgoing = []
+        with self.lock:
+            self._timer = None
+            for scope, digests in list(self.pending.items()):
+                for key, digest in list(digests.items()):
+                    if now - digest["since"] < self.digest_seconds:
+                        continue
+                    outgoing.append(
+                        (scope, key, digest["title"], digest["body"], digest["receivers"], digest["dates"])
+                    )
+                    del digests[key]
+                if not digests:
+                    del self.pending[scope]
+            if outgoing:
+                self._save()
+            self._schedule_flush(now)
+        for item in outgoing:
+            self._send(*item)
+
+    def retry_pending(self, scope):
+        """Whether scope has an undelivered email, i.e. needs update() even if nothing changed."""
+        with self.lock:
+            return scope in self.retry
+
+    def stats(self):
+        """Return the number of tracked open dates and of dates waiting in digests."""
+        with self.lock:
+            return {
+                "open": sum(
+                    1 for keys in self.seen.values() for dates in keys.values()
+                    for _, is_open in dates.values() if is_open
+                ),
+                "pending": sum(
+                    len(digest["dates"]) for digests in self.pending.values() for digest in digests.values()
+                ),
+            }
+
+    def _track(self, seen, open_dates, now):
+        """Update one group's alerted dates; caller holds self.lock.
+
+        Returns:
+            tuple: (dates to alert, whether seen changed)
+        """
+        new_dates = []
+        changed = False
+        for date in open_dates:
+            record = seen.get(date)
+            if record is not None and record[1]:
+                continue  # Still open since it was alerted
+            if record is not None and now - record[0] < self.dedup_seconds:
+                record[1] = True  # Reopened within the dedup window
+                changed = True
+                ALERTS.inc(outcome="suppressed")
+                continue
+            seen[date] = [now, True]
+            new_dates.append(date)
+        open_set = set(open_dates)
+        for date, record in list(seen.items()):
+            if date in open_set:
+                continue
+            if record[1]:
+                record[1] = False
+                changed = True
+            if now - record[0] >= self.dedup_seconds:
+                del seen[date]
+                changed = True
+        return new_dates, changed
+
+    def _schedule_flush(self, now):
+        """Arm the digest timer for the oldest pending digest; caller holds self.lock."""
+        if self._timer is not None or not self.pending:
+            return
+        oldest = min(digest["since"] for digests in self.pending.values() for digest in digests.values())
+        self._timer = threading.Timer(max(0.0, oldest + self.digest_seconds - now), self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _save(self):
+        """Persist the state; caller holds self.lock."""
+        try:
+            write_json_atomic(self.path, {"seen": self.seen, "pending": self.pending})
+        except OSError as exc:
+            logger.warning(f"Failed to save alert state: {exc}")
+
+    def _send(self, scope, key, title, body, receivers, dates):
+        """Queue one email for dates; they are forgotten again if it isn't delivered."""
+        content = body.format(dates=", ".join(sorted(dates)))
+
+        def done(ok):
+            if ok:
+                ALERTS.inc(len(dates), outcome="sent")
+            else:
+                self._forget(scope, key, dates)
+
+        if self.send(title, content, receivers=receivers or None, on_done=done):
+            logger.info(f"Email notification queued for dates: {sorted(dates)}")
+        else:
+            self._forget(scope, key, dates)
+
+    def _forget(self, scope, key, dates):
+        """Undo the alert of dates whose email wasn't delivered, so they're retried."""
+        ALERTS.inc(len(dates), outcome="failed")
+        logger.warning(f"Alert for dates {sorted(dates)} not delivered, will retry")
+        with self.lock:
+            seen = self.seen.get(scope, {}).get(key)
+            if seen is not None:
+                for date in dates:
+                    seen.pop(date, None)
+                if not seen:
+                    del self.seen[scope][key]
+                    if not self.seen[scope]:
+                        del self.seen[scope]
+            self.retry.add(scope)
+            self._save()
@@ -7,15 +7,60 @@ managing monitor configuration, and viewing monitoring history.
 import glob
 from datetime import datetime, timedelta, timezone
 
-from flask import Flask, flash, jsonify, redirect, render_template, request, url_for
-from flask_basicauth import BasicAuth
-
-from .config import load_config, save_config
-from .logger import logger, read_history_from_logs, TIMEZONE_OFFSET
-from .monitor import get_jsonAvailableDateAndTime, parse
+from flask import (
+    Flask,
+    Response,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_from_directory,
+    stream_template,
+    url_for,
+)
+
+from .breaker import CircuitBreaker, response_failure
+from .alerts import AlertCoalescer, AlertGroup
+from .changes import QuotaChangeDetector
+from .config import config_version, load_config, save_config
+from .dates import compile_dates, refresh as refresh_dates
+from .events import EventBroker, format_event
+from .history_buffer import HISTORY_LIMIT, HistoryRecord, HistoryRing
+from .history_store import get_history_store
+from .leader import (
+    CONTROL_PATH,
+    LEADER_POLL_SECONDS,
+    SHARED_HISTORY_ENTRIES,
+    SHARED_STATE_PATH,
+    LeaderElection,
+    SharedFile,
+    write_json_atomic,
+)
+from .logger import logger, TIMEZONE_OFFSET
+from .metrics import (
+    HISTORY_BUILD_SECONDS,
+    PARSE_SECONDS,
+    dump_samples,
+    record_cycle,
+    record_error,
+    render as render_metrics,
+)
+from .monitor import get_jsonAvailableDateAndTime
+from .profiler import PROFILE_DIR, PROFILE_MODES, PROFILER, ProfilerMiddleware, profile
+from .scheduler import (
+    SCHEDULE_MODES,
+    WAKE_CHECK,
+    WAKE_CONFIG,
+    WAKE_STOP,
+    AdaptiveScheduler,
+    Wakeup,
+)
 from .send_email import send_email
+from .subscriptions import SubscriptionIndex
 
 
+import json
 import os
 import threading
 import time
@@ -39,9 +84,17 @@ def _now_str(fmt="%Y-%m-%d %H:%M:%S"):
 def create_app():
     """Create and configure Flask application.
 
+    This is the gunicorn entry point (``web:create_app()``): nothing is built
+    at import time. The first app created in a process also becomes the
+    module-level ``app`` / ``monitor_state``.
+
     Returns:
-        Flask: Configured Flask application instance.
+        Flask: Configured Flask application instance; its MonitorState is
+            ``app.extensions["monitor_state"]``.
     """
+    global _default_app
+    from flask_basicauth import BasicAuth
+
     app = Flask(
         __name__,
         template_folder=os.path.join(os.path.dirname(__file__), "..", "templates"),
@@ -60,25 +113,58 @@ def create_app():
 
     basic_auth = BasicAuth(app)
 
+    # Profiles requests to armed route:<path> targets (a no-op otherwise)
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app)
+
     # Initialize monitor state and register routes
     monitor_state = MonitorState(load_config())
+    app.extensions["monitor_state"] = monitor_state
     register_routes(app, monitor_state)
 
-    return app, monitor_state
+    with _default_app_lock:
+        if _default_app is None:
+            _default_app = app
+    return app
 
 
 class MonitorState:
     """Manages monitoring state and background polling thread.
 
+    With several web workers only the elected leader process polls (see
+    leader.py). It publishes its state to a shared file that the other
+    workers serve from, and start/stop requests handled by another worker
+    reach it through a control file.
+
     Attributes:
         running (bool): Whether monitoring is currently active.
         interval_seconds (int): Seconds between checks.
-        check_dates (list): Dates to check for availability.
+        check_dates (list): Date specs to notify about (see dates.py).
+        date_matcher (DateMatcher): check_dates compiled; recompiled when
+            the config changes (or the day rolls over).
         notify_on_available (bool): Whether to send email on availability.
         last_checked_at (str): Timestamp of last check.
         last_available_num (int): Number of available slots found.
         last_available_list (list): List of available dates.
-        history (list): Recent monitoring events (limited to history_limit).
+        history (HistoryRing): Recent monitoring events (limited to history_limit).
+        schedule_mode (str): "fixed" or "adaptive" polling schedule.
+        scheduler (AdaptiveScheduler): Picks intervals in adaptive mode.
+        next_interval_seconds (float): Delay chosen after the last cycle.
+        wakeup (Wakeup): Interrupts the poller's wait on stop, config
+            changes and "check now".
+        breaker (CircuitBreaker): Backs off (and eventually stops polling
+            for a while) when BOCHK fails or answers with a non-SUCCESS eaiCode.
+        engine (AsyncPollEngine): Engine polling extra ``monitor.targets``
+            concurrently, or None when no targets are configured.
+        subscriptions (SubscriptionIndex): Per-subscriber dates and channels,
+            notified when one of their dates opens.
+        alerts (AlertCoalescer): Sends an email only for newly opened dates
+            (deduplicated, optionally batched into digests).
+        events (EventBroker): Pushes cycle results and state changes to
+            dashboards connected to /api/events.
+        version (int): Incremented on every change visible in snapshot();
+            /api/state uses it (with boot_id) as its ETag.
+        boot_id (str): Distinguishes versions of different processes/restarts.
+        election (LeaderElection): Whether this process is the poller.
     """
 
     def __init__(self, config):
@@ -95,6 +181,7 @@ class MonitorState:
         self.check_dates = list(
             monitor_config.get("check_dates", ["20260213", "20260214", "20260215"])
         )
+        self.date_matcher = compile_dates(self.check_dates)
         self.notify_on_available = bool(
             monitor_config.get("notify_on_available", True)
         )
@@ -103,37 +190,131 @@ class MonitorState:
         self.last_available_list = []
         self.last_eai_code = None
         self.last_error = None
-        self.history = []
-        self.history_limit = 200
+        self.history_limit = int(monitor_config.get("history_limit", HISTORY_LIMIT))
+        self.history = HistoryRing(self.history_limit)
+        self.schedule_mode = _schedule_mode(monitor_config.get("schedule_mode"))
+        self.scheduler = AdaptiveScheduler(
+            lambda since: get_history_store().entries(since=since),
+            min_interval=monitor_config.get("min_interval_seconds", 15),
+            max_interval=monitor_config.get("max_interval_seconds", 300),
+            daily_budget=monitor_config.get("daily_request_budget", 1440),
+        )
+        self.next_interval_seconds = None
+        self.breaker = CircuitBreaker()
+        self.wakeup = Wakeup()
+        self.detector = QuotaChangeDetector()
+        self.alerts = AlertCoalescer()
+        # Inputs of the last alerts update; unchanged quota + inputs = nothing to do
+        self._alert_inputs = None
+        self.events = EventBroker()
+        self.version = 0
+        self.boot_id = format(time.time_ns(), "x")
+        self._state_json = None
+        self.engine = None
+        self._apply_targets(monitor_config.get("targets") or [])
+        self.subscriptions = SubscriptionIndex.from_config(config.get("subscribers"))
+
+        self.election = LeaderElection()
+        self.shared_state = SharedFile(SHARED_STATE_PATH)
+        self.control = SharedFile(CONTROL_PATH)
+        self._config_version = config_version()
+        self._shared_version = None
+        self._follower_view = None
+        self._followed_etag = None
+        self._followed_checked_at = None
+        if self.election.try_acquire():
+            # Fresh start: commands left over from a previous run don't apply
+            self.control.read()
+        self._coordinate_now = threading.Event()
+        self.coordinator = threading.Thread(target=self._coordinate, daemon=True)
+        self.coordinator.start()
 
     def start(self):
-        """Start the background monitoring thread."""
+        """Start monitoring (in this process if it is the leader, else via the leader)."""
+        self._send_control(True)
+        if self.election.is_leader:
+            self._start_local()
+
+    def stop(self):
+        """Stop monitoring (in this process if it is the leader, else via the leader)."""
+        self._send_control(False)
+        if self.election.is_leader:
+            self._stop_local()
+
+    def check_now(self):
+        """Poll right away instead of waiting for the next cycle.
+
+        Runs in this process if it is the leader, else via the leader.
+
+        Returns:
+            bool: False if monitoring isn't running.
+        """
+        if not self.status()["running"]:
+            return False
+        control, _ = self.control.read()
+        self._send_control(bool(control is None or control.get("running")), check=True)
+        if self.election.is_leader:
+            self.wakeup.wake(WAKE_CHECK)
+        return True
+
+    def _start_local(self):
+        """Start the background monitoring thread (there is never more than one)."""
         with self.lock:
             if self.running:
                 return
             self.running = True
-            self.thread = threading.Thread(target=self._loop, daemon=True)
-            self.thread.start()
+            self.version += 1
+            # A poller still waiting after a recent stop was woken by it and
+            # carries on; _loop clears self.thread (under the lock) when it exits
+            if self.thread is None:
+                self.wakeup.clear()
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
             logger.info("Monitor started")
+        if self.engine is not None:
+            self.engine.start()
+        self._publish_state()
 
-    def stop(self):
+    def _stop_local(self):
         """Stop the background monitoring thread."""
         with self.lock:
             self.running = False
+            self.version += 1
             logger.info("Monitor stopped")
-
-    def update_config(self, check_dates, interval_seconds, notify_on_available):
+        self.wakeup.wake(WAKE_STOP)
+        # Outside the lock: the engine's result handler takes it while we join
+        if self.engine is not None:
+            self.engine.stop()
+        self._publish_state()
+
+    def update_config(
+        self,
+        check_dates,
+        interval_seconds,
+        notify_on_available,
+        schedule_mode=None,
+        daily_request_budget=None,
+    ):
         """Update monitoring configuration.
 
         Args:
             check_dates (list): New dates to check.
             interval_seconds (int): New polling interval in seconds.
             notify_on_available (bool): Whether to send email on availability.
+            schedule_mode (str): "fixed" or "adaptive" (None keeps current).
+            daily_request_budget (int): Adaptive request budget (None keeps current).
         """
         with self.lock:
             self.check_dates = check_dates
+            self.date_matcher = compile_dates(check_dates)
             self.interval_seconds = interval_seconds
             self.notify_on_available = notify_on_available
+            if schedule_mode is not None:
+                self.schedule_mode = _schedule_mode(schedule_mode)
+            self.scheduler.configure(daily_budget=daily_request_budget)
+            self.version += 1
+        self.wakeup.wake(WAKE_CONFIG)
+        self._publish_state()
 
     def apply_config(self, config):
         """Apply configuration from config dict.
@@ -146,119 +327,530 @@ class MonitorState:
             self.check_dates = list(
                 monitor_config.get("check_dates", self.check_dates)
             )
+            self.date_matcher = compile_dates(self.check_dates)
             self.interval_seconds = int(
                 monitor_config.get("interval_seconds", self.interval_seconds)
             )
             self.notify_on_available = bool(
                 monitor_config.get("notify_on_available", self.notify_on_available)
             )
+            self.schedule_mode = _schedule_mode(
+                monitor_config.get("schedule_mode", self.schedule_mode)
+            )
+            self.scheduler.configure(
+                min_interval=monitor_config.get("min_interval_seconds"),
+                max_interval=monitor_config.get("max_interval_seconds"),
+                daily_budget=monitor_config.get("daily_request_budget"),
+            )
+            if "history_limit" in monitor_config:
+                self.history_limit = int(monitor_config["history_limit"])
+                self.history.resize(self.history_limit)
+            self.version += 1
+        if "targets" in monitor_config:
+            self._apply_targets(monitor_config.get("targets") or [])
+        if "subscribers" in config:
+            self.subscriptions = SubscriptionIndex.from_config(config["subscribers"])
+        self.wakeup.wake(WAKE_CONFIG)
+        self._publish_state()
+
+    def _apply_targets(self, targets_config):
+        """Sync the async engine with the configured extra targets.
+
+        Args:
+            targets_config (list): ``monitor.targets`` entries.
+        """
+        if self.engine is None and not targets_config:
+            return
+        # asyncio is only loaded when extra targets are configured
+        from .async_engine import AsyncPollEngine, PollTarget
+
+        targets = [PollTarget.from_config(item) for item in targets_config]
+        if self.engine is None:
+            self.engine = AsyncPollEngine(on_result=self._on_target_result)
+        wanted = {target.name for target in targets}
+        for name in set(self.engine.targets) - wanted:
+            self.engine.remove_target(name)
+        for target in targets:
+            self.engine.add_target(target)
+
+    def _on_target_result(self, target, result):
+        """Handle a poll result from the async engine (runs on its result thread).
+
+        Args:
+            target (PollTarget): Target that was polled.
+            result (dict): Poll result.
+        """
+        # The engine already holds the result; bump so /api/state picks it up
+        with self.lock:
+            self.version += 1
+        self.events.publish("target", {"name": target.name, "result": result})
+        if result["error"]:
+            logger.error(f"Target {target.name} error: {result['error']}")
+            return
+        logger.info(
+            f"Target {target.name}: {result['available_num']} available dates: {result['available_list']}"
+        )
+        notify_list = self._date_matcher().filter(result["available_list"])
+        with self.lock:
+            notify_on_available = self.notify_on_available
+        groups = {}
+        if notify_list and notify_on_available and target.notify:
+            groups["*"] = AlertGroup(
+                notify_list,
+                None,
+                "BOCHK appointment available ({name})".format(name=target.name),
+                "Available dates matching your criteria: {dates}",
+            )
+        self.alerts.update(f"target:{target.name}", groups)
 
     def snapshot(self):
         """Take thread-safe snapshot of current state.
 
         Returns:
             dict: Current state snapshot with running status, configuration,
-                  and recent results.
+                  and recent results. ``history`` is an immutable
+                  HistorySnapshot (no copy is made).
         """
+        view = self._shared_view()
+        if view is not None:
+            return dict(view[1], history=view[3])
         with self.lock:
-            return {
-                "running": self.running,
-                "interval_seconds": self.interval_seconds,
-                "check_dates": list(self.check_dates),
-                "notify_on_available": self.notify_on_available,
-                "last_checked_at": self.last_checked_at,
-                "last_available_num": self.last_available_num,
-                "last_available_list": list(self.last_available_list),
-                "last_eai_code": self.last_eai_code,
-                "last_error": self.last_error,
-                "history": list(self.history),
-            }
+            snapshot = self._status_locked()
+            snapshot["history"] = self.history.snapshot()
+            snapshot["targets"] = self.engine.snapshot() if self.engine else {}
+            return snapshot
+
+    def status(self):
+        """Take a snapshot without history or targets (cheap; sent with every event).
+
+        Returns:
+            dict: Running status, configuration and latest result.
+        """
+        view = self._shared_view()
+        if view is not None:
+            return _status_of(view[1])
+        with self.lock:
+            return self._status_locked()
+
+    def _status_locked(self):
+        """Build the status dict; caller holds self.lock."""
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "check_dates": list(self.check_dates),
+            "notify_on_available": self.notify_on_available,
+            "last_checked_at": self.last_checked_at,
+            "last_available_num": self.last_available_num,
+            "last_available_list": list(self.last_available_list),
+            "last_eai_code": self.last_eai_code,
+            "last_error": self.last_error,
+            "history_count": len(self.history),
+            "schedule_mode": self.schedule_mode,
+            "next_interval_seconds": self.next_interval_seconds,
+            "daily_request_budget": self.scheduler.daily_budget,
+            "breaker": self.breaker.snapshot(),
+            "version": self.version,
+        }
+
+    def etag(self):
+        """Strong ETag for the current state version."""
+        view = self._shared_view()
+        if view is not None:
+            return view[0]
+        with self.lock:
+            return f"{self.boot_id}-{self.version}"
+
+    def state_json(self):
+        """Return (etag, JSON body) of snapshot(), serialized once per version.
+
+        Returns:
+            tuple: (etag string, UTF-8 encoded JSON bytes)
+        """
+        view = self._shared_view()
+        if view is not None:
+            return view[0], view[2]
+        version, etag, _, body = self._state_payload()
+        return etag, body
+
+    def _state_payload(self):
+        """Return (version, etag, state dict, JSON body) of this process's state, cached per version."""
+        cached = self._state_json
+        with self.lock:
+            version = self.version
+        if cached is not None and cached[0] == version:
+            return cached
+        snapshot = self.snapshot()
+        snapshot["history"] = snapshot["history"].to_list()
+        etag = f"{self.boot_id}-{snapshot['version']}"
+        body = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._state_json = (snapshot["version"], etag, snapshot, body)
+        return self._state_json
+
+    def _shared_view(self):
+        """Leader's published state, or None if this process is the leader.
+
+        Its history holds only the latest SHARED_HISTORY_ENTRIES entries;
+        /history pages through the SQLite store instead.
+
+        Returns:
+            tuple: (etag, state dict, JSON body, HistorySnapshot), rebuilt
+                only when the shared state file changes.
+        """
+        if self.election.is_leader:
+            return None
+        data, changed = self.shared_state.read()
+        if data is None:
+            return None
+        view = self._follower_view
+        if changed or view is None:
+            state = data["state"]
+            history = HistoryRing(len(state["history"]) or 1)
+            for entry in state["history"]:
+                history.append(HistoryRecord.from_entry(entry))
+            body = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            view = (data["etag"], state, body, history.snapshot())
+            self._follower_view = view
+        return view
+
+    def _send_control(self, running, check=False):
+        """Record the desired running state (and a "check now") for whichever process is the leader."""
+        command = {"running": running, "check": check, "pid": os.getpid(), "at": _now_str()}
+        try:
+            write_json_atomic(CONTROL_PATH, command)
+        except OSError as exc:
+            logger.warning(f"Failed to write monitor control file: {exc}")
+            return
+        if self.election.is_leader:
+            # Our own command: already applied locally
+            self.control.read()
+
+    def _coordinate(self):
+        """Coordinator thread: leadership, cross-worker commands and state sharing."""
+        while True:
+            # Woken early when the leader has new state to publish
+            self._coordinate_now.wait(LEADER_POLL_SECONDS)
+            self._coordinate_now.clear()
+            try:
+                dump_samples()
+                PROFILER.sync()
+                if self.election.is_leader:
+                    self._lead()
+                elif self.election.try_acquire():
+                    logger.info("Became the poller leader")
+                    self._take_over()
+                else:
+                    self._follow()
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.warning(f"Leader coordination error: {exc}")
+
+    def _lead(self):
+        """Leader tick: apply commands and config changes, publish state."""
+        control, changed = self.control.read()
+        if changed and control is not None:
+            if control.get("running"):
+                self._start_local()
+            else:
+                self._stop_local()
+            if control.get("check"):
+                self.wakeup.wake(WAKE_CHECK)
+        version = config_version()
+        if version != self._config_version:
+            # Saved by another worker's /config request
+            self._config_version = version
+            self.apply_config(load_config())
+        version, etag, state, _ = self._state_payload()
+        if version != self._shared_version:
+            # Status plus the latest entries only: this is rewritten on every change
+            shared = dict(state, history=state["history"][-SHARED_HISTORY_ENTRIES:])
+            write_json_atomic(SHARED_STATE_PATH, {"etag": etag, "state": shared})
+            self._shared_version = version
+
+    def _take_over(self):
+        """Continue where a previous leader stopped (it exited or crashed)."""
+        self._follower_view = None
+        self._config_version = config_version()
+        self.apply_config(load_config())
+        # Pick up what the previous leader already alerted
+        self.alerts.load()
+        control, _ = self.control.read()
+        if control is not None and control.get("running"):
+            self._start_local()
+        self._lead()
+
+    def _follow(self):
+        """Follower tick: forward the leader's state changes to SSE subscribers."""
+        view = self._shared_view()
+        if view is None or view[0] == self._followed_etag:
+            return
+        state = view[1]
+        if state["last_checked_at"] != self._followed_checked_at and state["history"]:
+            self.events.publish("cycle", {"entry": state["history"][-1], "state": _status_of(state)})
+        else:
+            self.events.publish("state", _status_of(state))
+        self._followed_etag = view[0]
+        self._followed_checked_at = state["last_checked_at"]
+
+    def _publish_state(self):
+        """Push the current status to SSE subscribers (and, as leader, to the other workers)."""
+        self.events.publish("state", self.status())
+        if self.election.is_leader:
+            self._coordinate_now.set()
+
+    def _publish_cycle(self, entry):
+        """Push one cycle result, with the status it produced, to SSE subscribers.
+
+        Args:
+            entry (dict): History entry of the cycle.
+        """
+        self.events.publish("cycle", {"entry": entry, "state": self.status()})
+        if self.election.is_leader:
+            self._coordinate_now.set()
 
     def _loop(self):
         """Background monitoring loop that runs in daemon thread."""
         while True:
             with self.lock:
                 if not self.running:
+                    self.thread = None
                     break
-                interval_seconds = self.interval_seconds
-                check_dates = list(self.check_dates)
                 notify_on_available = self.notify_on_available
+            date_matcher = self._date_matcher()
 
-            try:
-                res_json = get_jsonAvailableDateAndTime()
-                # Log raw response for analysis
-                logger.info(res_json)
-                
-                # Use "all" to get all available dates for history/logging
-                total_available_num, total_available_list = parse(res_json, ["all"])
-                eai_code = res_json.get("eaiCode")
-                
-                checked_at = _now_str()
-
-                # Log the cycle summary for history parsing
-                if total_available_num > 0:
-                    logger.info(f"Monitor cycle: {total_available_num} available dates: {total_available_list}")
-
-                # Determine which dates trigger notification
-                if "all" in check_dates:
-                    notify_list = total_available_list
-                else:
-                    # Filter: only dates that are in check_dates
-                    notify_list = [d for d in total_available_list if d in check_dates]
-
-                with self.lock:
-                    self.last_checked_at = checked_at
-                    self.last_available_num = total_available_num
-                    self.last_available_list = list(total_available_list)
-                    self.last_eai_code = eai_code
-                    self.last_error = None
-                    self._append_history(
-                        {
-                            "checked_at": checked_at,
-                            "available_num": total_available_num,
-                            "available_list": list(total_available_list),
-                            "eai_code": eai_code,
-                            "error": None,
-                        }
-                    )
+            wait = self.breaker.before_call()
+            if wait > 0:
+                # Open breaker: sit out the open period (only stop ends it early)
+                self._set_next_interval(wait)
+                self._publish_state()
+                self.wakeup.wait(wait)
+                continue
+
+            with profile("cycle"):
+                self._run_cycle(date_matcher, notify_on_available)
+
+            self._wait_for_next_cycle()
+
+    def _wait_for_next_cycle(self):
+        """Wait for the next cycle; returns early on stop or "check now".
+
+        A config change recomputes the delay (counted from the end of the
+        last cycle) and keeps waiting if it isn't due yet.
+        """
+        cycle_ended = time.monotonic()
+        while True:
+            with self.lock:
+                interval_seconds = self.interval_seconds
+                schedule_mode = self.schedule_mode
+            due = cycle_ended + self._next_interval(interval_seconds, schedule_mode)
+            if self.wakeup.wait(due - time.monotonic()) != WAKE_CONFIG:
+                return
+
+    def _run_cycle(self, date_matcher, notify_on_available):
+        """Poll once and record, publish and notify the result.
+
+        Only fetching and parsing the response count as an upstream failure
+        (breaker, error row in the history); a failure to publish or notify
+        afterwards is logged and leaves the recorded cycle alone.
+
+        Args:
+            date_matcher (DateMatcher): Dates that trigger a notification.
+            notify_on_available (bool): Whether to send notifications.
+        """
+        try:
+            res_json = get_jsonAvailableDateAndTime()
+            checked_at = _now_str()
+            failure = response_failure(res_json)
+            with PARSE_SECONDS.time():
+                change = self.detector.update(res_json)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            self._record_cycle_error(exc)
+            return
+
+        if failure is None:
+            self.breaker.record_success()
+        else:
+            logger.warning(f"BOCHK answered with {failure}")
+            self.breaker.record_failure(failure)
+
+        # Only log the raw response periodically (keyframes); otherwise
+        # log per-date transitions when the quota actually changed
+        record_cycle(res_json.get("eaiCode"), change)
+        if change.keyframe:
+            logger.info(res_json)
+        elif change.changed:
+            logger.info(f"Quota delta: {change.changed}")
+        self._store_quota_event(checked_at, change)
+
+        # All available dates for history/logging
+        total_available_list = change.available_list
+        total_available_num = len(total_available_list)
+        eai_code = res_json.get("eaiCode")
+
+        # Log the cycle summary for history parsing
+        if total_available_num > 0:
+            logger.info(f"Monitor cycle: {total_available_num} available dates: {total_available_list}")
+
+        entry = {
+            "checked_at": checked_at,
+            "available_num": total_available_num,
+            "available_list": list(total_available_list),
+            "eai_code": eai_code,
+            "error": None,
+        }
+        with self.lock:
+            self.last_checked_at = checked_at
+            self.last_available_num = total_available_num
+            self.last_available_list = list(total_available_list)
+            self.last_eai_code = eai_code
+            self.last_error = None
+            self._append_history(entry)
+            self.version += 1
+        self._store_history(entry)
+
+        try:
+            self._publish_cycle(entry)
+            self._notify(change, date_matcher, notify_on_available)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            # The poll itself succeeded: not an upstream failure
+            logger.error(f"Failed to publish or notify cycle result: {exc}")
+
+    def _record_cycle_error(self, exc):
+        """Record a failed fetch/parse: breaker, metrics and an error history entry.
+
+        Args:
+            exc (Exception): What went wrong.
+        """
+        record_error(exc)
+        checked_at = _now_str()
+        error_text = str(exc)
+        self.breaker.record_failure(error_text)
+        entry = {
+            "checked_at": checked_at,
+            "available_num": None,
+            "available_list": [],
+            "eai_code": None,
+            "error": error_text,
+        }
+        with self.lock:
+            self.last_checked_at = checked_at
+            self.last_error = error_text
+            self._append_history(entry)
+            self.version += 1
+        logger.error(f"Monitoring error: {error_text}")
+        self._store_history(entry)
+        try:
+            self._publish_cycle(entry)
+        except Exception as publish_exc:  # pragma: no cover - defensive logging
+            logger.error(f"Failed to publish cycle result: {publish_exc}")
+
+    def _date_matcher(self):
+        """Return the compiled check_dates matcher, recompiled after midnight."""
+        with self.lock:
+            matcher = self.date_matcher
+        current = refresh_dates(matcher)
+        if current is not matcher:
+            with self.lock:
+                if self.date_matcher is matcher:
+                    self.date_matcher = current
+        return current
 
-                if len(notify_list) > 0 and notify_on_available:
-                    send_email(
+    def _notify(self, change, date_matcher, notify_on_available):
+        """Hand the open dates of every recipient group to the alert coalescer.
+
+        It only emails dates that newly opened (see alerts.py); the emails
+        are delivered by the dispatcher thread and never block the poll. An
+        undelivered email makes the next cycle update again so it is retried.
+
+        Args:
+            change (QuotaChange): This cycle's detector result.
+            date_matcher (DateMatcher): Dates the configured receivers watch.
+            notify_on_available (bool): Whether to send notifications.
+        """
+        inputs = (date_matcher, self.subscriptions, notify_on_available)
+        unchanged = not change.changed and inputs == self._alert_inputs
+        if not change.quota or (unchanged and not self.alerts.retry_pending("poller")):
+            # No dateQuota (e.g. throttled) or nothing new since the last update
+            return
+        self._alert_inputs = inputs
+        groups = {}
+        if notify_on_available:
+            available = change.available_list
+            notify_list = date_matcher.filter(available)
+            if notify_list:
+                groups["*"] = AlertGroup(
+                    notify_list,
+                    None,
+                    "BOCHK appointment available",
+                    "Available dates matching your criteria: {dates}",
+                )
+            for subscriber, dates in self.subscriptions.match(available).items():
+                receivers = subscriber.channels.get("email")
+                if receivers:
+                    groups[subscriber.name] = AlertGroup(
+                        dates,
+                        receivers,
                         "BOCHK appointment available",
-                        "Available dates matching your criteria: {dates}".format(
-                            dates=", ".join(notify_list)
-                        ),
+                        "Available dates matching your subscription: {dates}",
                     )
-                    logger.info(f"Email notification sent for dates: {notify_list}")
+        self.alerts.update("poller", groups)
+
+    def _next_interval(self, interval_seconds, schedule_mode):
+        """Choose the delay before the next cycle.
 
+        Args:
+            interval_seconds (int): Fixed interval.
+            schedule_mode (str): "fixed" or "adaptive".
+
+        Returns:
+            float: Seconds to sleep (longer while the breaker backs off).
+        """
+        delay = interval_seconds
+        if schedule_mode == "adaptive":
+            try:
+                delay = self.scheduler.next_interval()
             except Exception as exc:  # pragma: no cover - defensive logging
-                checked_at = _now_str()
-                error_text = str(exc)
-                with self.lock:
-                    self.last_checked_at = checked_at
-                    self.last_error = error_text
-                    self._append_history(
-                        {
-                            "checked_at": checked_at,
-                            "available_num": None,
-                            "available_list": [],
-                            "eai_code": None,
-                            "error": error_text,
-                        }
-                    )
-                logger.error(f"Monitoring error: {error_text}")
+                logger.warning(f"Adaptive scheduler failed, using fixed interval: {exc}")
+        return self._set_next_interval(self.breaker.next_delay(delay))
 
-            time.sleep(interval_seconds)
+    def _set_next_interval(self, delay):
+        """Record the chosen delay for the dashboard and return it."""
+        with self.lock:
+            self.next_interval_seconds = round(delay, 1)
+            self.version += 1
+        return delay
+
+    def _store_history(self, entry):
+        """Persist entry to the history store without interrupting the loop.
+
+        Args:
+            entry (dict): History entry with check results.
+        """
+        try:
+            get_history_store().record_entry(entry)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning(f"Failed to store history entry: {exc}")
+
+    def _store_quota_event(self, checked_at, change):
+        """Persist a quota keyframe or delta, if this cycle produced one.
+
+        Args:
+            checked_at (str): Cycle timestamp.
+            change (QuotaChange): Result from the change detector.
+        """
+        event = change.event()
+        if event is None:
+            return
+        try:
+            get_history_store().record_quota_event(checked_at, *event)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning(f"Failed to store quota event: {exc}")
 
     def _append_history(self, entry):
-        """Append entry to history, maintaining size limit.
+        """Append entry to the history ring buffer (oldest entry is evicted when full).
 
         Args:
             entry (dict): History entry with check results.
         """
-        self.history.append(entry)
-        if len(self.history) > self.history_limit:
-            self.history = self.history[-self.history_limit :]
+        self.history.append(HistoryRecord.from_entry(entry))
 
 
 def register_routes(app, monitor_state):
@@ -291,10 +883,38 @@ def register_routes(app, monitor_state):
 
     @app.route("/history")
     def history():
-        """Display monitoring history in reverse chronological order."""
-        # Read from logs to show full history
-        full_history = read_history_from_logs()
-        return render_template("history.html", history=full_history[::-1])
+        """Display one page of monitoring history in reverse chronological order."""
+        before = request.args.get("before") or None
+        limit = parse_limit_input(request.args.get("limit"))
+        with HISTORY_BUILD_SECONDS.time(route="history"):
+            items, next_before = _history_page(before, limit)
+        return stream_template(
+            "history.html",
+            history=iter(items),
+            before=before,
+            next_before=next_before,
+            limit=limit,
+        )
+
+    @app.route("/api/history", methods=["GET"])
+    def api_history():
+        """API endpoint returning one page of history, newest first.
+
+        Query args:
+            before: Cursor (``next_before`` of the previous page).
+            limit: Page size (default 50, max 500).
+        """
+        before = request.args.get("before") or None
+        limit = parse_limit_input(request.args.get("limit"))
+        with HISTORY_BUILD_SECONDS.time(route="api_history"):
+            items, next_before = _history_page(before, limit)
+            response = jsonify({"items": items, "next_before": next_before})
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Prometheus metrics, summed over all web workers."""
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
     @app.route("/config", methods=["POST"])
     def update_config():
@@ -319,6 +939,10 @@ def register_routes(app, monitor_state):
              check_dates = ["all"]
 
         interval_seconds = parse_interval_input(interval_raw)
+        schedule_mode = _schedule_mode(request.form.get("schedule_mode"))
+        daily_request_budget = parse_budget_input(
+            request.form.get("daily_request_budget", "")
+        )
         receivers = parse_dates_input(receivers_raw)
 
         # Parse mail_port (None if empty, otherwise int)
@@ -327,11 +951,16 @@ def register_routes(app, monitor_state):
             mail_port = int(mail_port_raw.strip())
 
         config = load_config()
-        config["monitor"] = {
-            "check_dates": check_dates,
-            "interval_seconds": interval_seconds,
-            "notify_on_available": notify_on_available,
-        }
+        # Update in place so settings without form fields (e.g. targets) survive
+        config["monitor"].update(
+            {
+                "check_dates": check_dates,
+                "interval_seconds": interval_seconds,
+                "notify_on_available": notify_on_available,
+                "schedule_mode": schedule_mode,
+                "daily_request_budget": daily_request_budget,
+            }
+        )
         config["email"] = {
             "mail_host": mail_host.strip(),
             "mail_port": mail_port,
@@ -343,7 +972,11 @@ def register_routes(app, monitor_state):
         save_config(config)
 
         monitor_state.update_config(
-            check_dates, interval_seconds, notify_on_available
+            check_dates,
+            interval_seconds,
+            notify_on_available,
+            schedule_mode=schedule_mode,
+            daily_request_budget=daily_request_budget,
         )
         flash("配置已保存", "success")
         return redirect(url_for("index"))
@@ -358,6 +991,50 @@ def register_routes(app, monitor_state):
             flash("测试邮件发送失败，请检查邮箱配置", "error")
         return redirect(url_for("index"))
 
+    @app.route("/api/state", methods=["GET"])
+    def api_state():
+        """Current monitor state as JSON, with conditional GET support.
+
+        The ETag is the state version, so a client sending it back in
+        If-None-Match gets 304 Not Modified until something changes.
+        """
+        etag = monitor_state.etag()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        etag, body = monitor_state.state_json()
+        response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    @app.route("/api/events", methods=["GET"])
+    def api_events():
+        """Server-Sent Events stream of cycle results and state changes.
+
+        Events: ``state`` (status dict, also sent on connect), ``cycle``
+        (``{"entry", "state"}`` after every poll) and ``target`` (extra target
+        results). Answers 503 when SSE_MAX_STREAMS streams are already open
+        in this worker; the dashboard then polls /api/state instead.
+        """
+        subscriber = monitor_state.events.subscribe()
+        if subscriber is None:
+            return Response(
+                "Too many open event streams", status=503, mimetype="text/plain",
+                headers={"Retry-After": "60"},
+            )
+        initial = [format_event("state", monitor_state.status())]
+        return Response(
+            monitor_state.events.stream(subscriber, initial),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # Stop reverse proxies (nginx, Railway's edge) from buffering the stream
+                "X-Accel-Buffering": "no",
+            },
+        )
+
     @app.route("/api/next-7-days", methods=["GET"])
     def get_next_7_days():
         """API endpoint returning next 7 days in YYYYMMDD format."""
@@ -369,6 +1046,43 @@ def register_routes(app, monitor_state):
             dates.append(date_str)
         return jsonify({"dates": dates})
 
+    @app.route("/api/targets", methods=["GET"])
+    def get_targets():
+        """API endpoint returning the latest result per extra polling target."""
+        return jsonify({"targets": monitor_state.snapshot()["targets"]})
+
+    @app.route("/admin/profiles", methods=["GET"])
+    def list_profiles():
+        """Armed profiling targets and saved profiles (newest first)."""
+        return jsonify(
+            {"armed": PROFILER.armed_targets(), "modes": list(PROFILE_MODES), "files": PROFILER.files()}
+        )
+
+    @app.route("/admin/profiles", methods=["POST"])
+    def arm_profile():
+        """Profile the next runs of a target in every worker.
+
+        Form/JSON fields:
+            target: ``cycle``, ``history`` or ``route:<path>``.
+            runs: Number of runs to profile (default 1, 0 disarms).
+            mode: ``cprofile`` (default) or ``sample``.
+        """
+        data = request.get_json(silent=True) or request.form
+        target = (data.get("target") or "").strip()
+        try:
+            runs = int(data.get("runs", 1))
+            if not target:
+                raise ValueError("target is required")
+            PROFILER.request(target, runs, data.get("mode", "cprofile"))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify({"armed": PROFILER.armed_targets()}), 202
+
+    @app.route("/admin/profiles/<path:name>", methods=["GET"])
+    def download_profile(name):
+        """Download a saved profile (open .pstats with pstats/snakeviz)."""
+        return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
     @app.route("/start", methods=["POST"])
     def start_monitor():
         """Start background monitoring."""
@@ -381,6 +1095,78 @@ def register_routes(app, monitor_state):
         monitor_state.stop()
         return redirect(url_for("index"))
 
+    @app.route("/check-now", methods=["POST"])
+    def check_now():
+        """Poll right away instead of waiting for the next cycle."""
+        if not monitor_state.check_now():
+            flash("监控未运行", "error")
+        return redirect(url_for("index"))
+
+
+def _status_of(state):
+    """Reduce a full state dict to the status() fields."""
+    return {key: value for key, value in state.items() if key not in ("history", "targets")}
+
+
+def _history_page(before, limit):
+    """Fetch one page of history and the cursor for the next (older) page.
+
+    Args:
+        before (str): Cursor from the previous page, None for the latest page.
+        limit (int): Page size.
+
+    Returns:
+        tuple: (list of entries, next cursor or None if this is the last page)
+    """
+    return get_history_store().page(before=before, limit=limit)
+
+
+def parse_limit_input(value, default=50, maximum=500):
+    """Parse and clamp a page size query argument.
+
+    Args:
+        value (str): Raw limit value (may be None).
+        default (int): Value used when missing or invalid.
+        maximum (int): Upper bound.
+
+    Returns:
+        int: Page size between 1 and maximum.
+    """
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(1, limit), maximum)
+
+
+def _schedule_mode(value):
+    """Normalize a schedule mode, defaulting to "fixed".
+
+    Args:
+        value (str): Raw mode.
+
+    Returns:
+        str: One of scheduler.SCHEDULE_MODES.
+    """
+    value = (value or "").strip().lower()
+    return value if value in SCHEDULE_MODES else "fixed"
+
+
+def parse_budget_input(value):
+    """Parse and validate the daily request budget input.
+
+    Args:
+        value (str): Budget string (should be convertible to int).
+
+    Returns:
+        int: Requests per day, minimum 24, default 1440.
+    """
+    try:
+        budget = int(value)
+    except ValueError:
+        return 1440
+    return max(24, budget)
+
 
 def parse_dates_input(value):
     """Parse comma/newline-separated date input into list.
@@ -411,8 +1197,22 @@ def parse_interval_input(value):
     return max(10, interval_seconds)
 
 
-# Create app instance for import by entry points
-app, monitor_state = create_app()
+# Built by the first create_app() call (see __getattr__)
+_default_app = None
+_default_app_lock = threading.Lock()
+
+
+def __getattr__(name):
+    """Module-level ``app`` and ``monitor_state``, created on first access.
+
+    Keeps ``from src.app import app, monitor_state`` (and ``web:app``)
+    working without building the app when the module is imported.
+    """
+    if name not in ("app", "monitor_state"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    app = _default_app if _default_app is not None else create_app()
+    return app if name == "app" else app.extensions["monitor_state"]
+
 
 if __name__ == "__main__":
     # Get port from environment or use default
@@ -421,5 +1221,6 @@ if __name__ == "__main__":
 
     # In production, gunicorn will handle the web server
     # This block is for local development only
-    monitor_state.start()
+    app = create_app()
+    app.extensions["monitor_state"].start()
     app.run(host=host, port=port, debug=False)
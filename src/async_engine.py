@@ -0,0 +1,256 @@
+"""
+Asyncio polling engine.
+Polls several targets (different bean.appDate queries, appointment types or
+mirrored endpoints) concurrently on independent schedules from one event loop.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .breaker import SUCCESS_CODE, CircuitBreaker
+from .logger import logger
+from .monitor import BOCHK_API_URL, BOCHK_POOL_SIZE, get_jsonAvailableDateAndTime, now_str, parse
+
+
+class PollTarget:
+    """A single endpoint/query polled on its own schedule.
+
+    Attributes:
+        name (str): Unique target name.
+        url (str): Endpoint to query.
+        params (dict): Form fields posted to the endpoint.
+        interval_seconds (float): Seconds between polls.
+        timeout (float): Per-poll timeout in seconds.
+        notify (bool): Whether available dates should trigger a notification.
+    """
+
+    def __init__(self, name, url=None, params=None, interval_seconds=60, timeout=20, notify=False):
+        self.name = name
+        self.url = url or BOCHK_API_URL
+        self.params = dict(params) if params is not None else {"bean.appDate": ""}
+        self.interval_seconds = float(interval_seconds)
+        self.timeout = float(timeout)
+        self.notify = bool(notify)
+
+    @classmethod
+    def from_config(cls, item):
+        """Build a target from a ``monitor.targets`` config entry.
+
+        Args:
+            item (dict): Entry with ``name`` and optional ``url``, ``app_date``,
+                ``params``, ``interval_seconds``, ``timeout`` and ``notify``.
+        """
+        params = dict(item.get("params") or {})
+        params.setdefault("bean.appDate", item.get("app_date", ""))
+        return cls(
+            item["name"],
+            url=item.get("url"),
+            params=params,
+            interval_seconds=item.get("interval_seconds", 60),
+            timeout=item.get("timeout", 20),
+            notify=item.get("notify", False),
+        )
+
+
+class AsyncPollEngine:
+    """Runs one asyncio task per target inside a dedicated event loop thread.
+
+    Blocking HTTP calls go through the shared pooled session on a small thread
+    pool; each poll is bounded by its target's timeout and every task can be
+    cancelled independently. Results are passed to ``on_result(target, result)``
+    on a separate single thread, in the order they arrive, so handlers may
+    block (disk writes, notification hand-off) without stalling the loop.
+
+    The thread pool is sized from the session's connection pool (one
+    connection is left for the main poller), not from the number of targets:
+    more concurrent requests than pooled connections would open throwaway
+    connections ("Connection pool is full"). Extra polls wait for a worker,
+    which counts toward their timeout.
+    """
+
+    def __init__(self, targets=(), on_result=None, fetch=None, workers=None):
+        """Initialize the engine.
+
+        Args:
+            targets (iterable): PollTarget instances.
+            on_result (callable): Called with (target, result dict) after each
+                poll, on the engine's result thread.
+            fetch (callable): Fetch function taking url, params, timeout
+                (default: monitor.get_jsonAvailableDateAndTime).
+            workers (int): Concurrent fetches (default: BOCHK_POOL_SIZE - 1).
+        """
+        self.targets = {target.name: target for target in targets}
+        self.on_result = on_result
+        self.fetch = fetch or get_jsonAvailableDateAndTime
+        self.workers = max(1, int(workers if workers is not None else BOCHK_POOL_SIZE - 1))
+        self.results = {}
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.executor = None
+        self.result_executor = None
+        self._tasks = {}
+        self._ready = threading.Event()
+
+    @property
+    def running(self):
+        """Whether the event loop thread is alive."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start the event loop thread and schedule every target."""
+        if self.running:
+            return
+        self._ready.clear()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="poll")
+        self.result_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poll-result")
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        logger.info(f"Async poll engine started with {len(self.targets)} target(s)")
+
+    def stop(self, timeout=5):
+        """Cancel all target tasks and stop the event loop thread."""
+        if not self.running:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        try:
+            future.result(timeout)
+        except Exception:
+            pass
+        # Stopped only now: stopping inside _shutdown() would leave future unresolved
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        # In-flight requests are bounded by their own timeouts; don't wait for them
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        # Results already handed off are still handled (e.g. their alerts)
+        self.result_executor.shutdown(wait=False)
+        self.thread = None
+        logger.info("Async poll engine stopped")
+
+    def add_target(self, target):
+        """Add (or replace) a target; it starts polling immediately if running."""
+        with self.lock:
+            self.targets[target.name] = target
+        if self.running:
+            self.loop.call_soon_threadsafe(self._schedule, target)
+
+    def remove_target(self, name):
+        """Stop polling and forget the named target."""
+        with self.lock:
+            self.targets.pop(name, None)
+            self.results.pop(name, None)
+        if self.running:
+            self.loop.call_soon_threadsafe(self._cancel, name)
+
+    def snapshot(self):
+        """Return a copy of the latest result per target."""
+        with self.lock:
+            return {name: dict(result) for name, result in self.results.items()}
+
+    def _run_loop(self):
+        """Thread body: own an event loop until stop() is called."""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        with self.lock:
+            targets = list(self.targets.values())
+        for target in targets:
+            self._schedule(target)
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def _schedule(self, target):
+        """Create (or restart) the polling task for a target."""
+        self._cancel(target.name)
+        self._tasks[target.name] = self.loop.create_task(self._run_target(target))
+
+    def _cancel(self, name):
+        """Cancel the polling task for a target, if any."""
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    async def _shutdown(self):
+        """Cancel all tasks and wait for them to finish."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_target(self, target):
+        """Poll one target forever on its own interval (backing off on failures)."""
+        breaker = CircuitBreaker(name=target.name)
+        while True:
+            wait = breaker.before_call()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            started = time.monotonic()
+            result = await self.poll_once(target)
+            if result["error"]:
+                breaker.record_failure(result["error"])
+            elif result["eai_code"] not in (None, SUCCESS_CODE):
+                breaker.record_failure(f"eaiCode {result['eai_code']}")
+            else:
+                breaker.record_success()
+            result["breaker"] = breaker.snapshot()
+            with self.lock:
+                self.results[target.name] = result
+            if self.on_result is not None:
+                self.result_executor.submit(self._handle_result, target, result)
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0.0, breaker.next_delay(target.interval_seconds) - elapsed))
+
+    def _handle_result(self, target, result):
+        """Result thread body: pass one result to on_result."""
+        try:
+            self.on_result(target, result)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.error(f"Target {target.name} result handler failed: {exc}")
+
+    async def poll_once(self, target):
+        """Poll a target once, bounded by its timeout.
+
+        Returns:
+            dict: Result with checked_at, available_num, available_list,
+                  eai_code, error and elapsed (seconds).
+        """
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        call = partial(self.fetch, url=target.url, params=target.params, timeout=target.timeout)
+        try:
+            res_json = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, call), target.timeout
+            )
+            available_num, available_list = parse(res_json, ["all"])
+            result = {
+                "available_num": available_num,
+                "available_list": available_list,
+                "eai_code": res_json.get("eaiCode"),
+                "error": None,
+            }
+        except asyncio.TimeoutError:
+            result = self._error_result(f"timed out after {target.timeout:g}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            result = self._error_result(str(exc))
+        result["checked_at"] = now_str()
+        result["elapsed"] = round(time.monotonic() - started, 4)
+        return result
+
+    @staticmethod
+    def _error_result(error_text):
+        """Result dict for a failed poll."""
+        return {
+            "available_num": None,
+            "available_list": [],
+            "eai_code": None,
+            "error": error_text,
+        }
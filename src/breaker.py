@@ -0,0 +1,225 @@
+"""
+Upstream failure handling module.
+Exponential backoff with jitter, a circuit breaker and a retry budget, so the
+poller backs off while BOCHK errors or throttles us instead of hammering it
+at the normal interval.
+"""
+import os
+import random
+import threading
+import time
+
+from .config import env_number
+from .logger import custom_time_converter, logger
+from .metrics import BREAKER_TRANSITIONS
+
+
+# Consecutive failed cycles that open the breaker
+BREAKER_FAILURE_THRESHOLD = env_number("BREAKER_FAILURE_THRESHOLD", 5, int)
+# How long the breaker stays open; doubles with every failed probe up to the max
+BREAKER_OPEN_SECONDS = env_number("BREAKER_OPEN_SECONDS", 300)
+BREAKER_MAX_OPEN_SECONDS = env_number("BREAKER_MAX_OPEN_SECONDS", 3600)
+# Backoff between failed cycles while the breaker is still closed
+BACKOFF_BASE_SECONDS = env_number("BACKOFF_BASE_SECONDS", 30)
+BACKOFF_MAX_SECONDS = env_number("BACKOFF_MAX_SECONDS", 900)
+# Retry budget: at most RETRY_BUDGET retries banked, each success earns RETRY_BUDGET_RATIO
+RETRY_BUDGET = env_number("RETRY_BUDGET", 10)
+RETRY_BUDGET_RATIO = env_number("RETRY_BUDGET_RATIO", 0.1)
+
+# eaiCode of a normal answer; anything else (e.g. SYSTEM_BUSY) is a failure
+SUCCESS_CODE = "SUCCESS"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def response_failure(res_json):
+    """Describe why a response counts as a failure.
+
+    Args:
+        res_json (dict): API response.
+
+    Returns:
+        str: Failure reason, or None for a normal answer.
+    """
+    code = res_json.get("eaiCode")
+    if code is not None and code != SUCCESS_CODE:
+        return f"eaiCode {code}"
+    return None
+
+
+def backoff_delay(failures, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS):
+    """Delay after the n-th consecutive failure: exponential, capped, jittered.
+
+    Half of the delay is fixed and half random ("equal jitter"), so several
+    pollers spread out without ever retrying immediately.
+
+    Args:
+        failures (int): Consecutive failures so far (>= 1).
+        base (float): Delay after the first failure.
+        cap (float): Upper bound before jitter.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    delay = min(cap, base * 2 ** max(0, failures - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryBudget:
+    """Token bucket that limits retries to a fraction of successful calls.
+
+    Each success deposits ``ratio`` tokens (up to ``capacity``) and every
+    retry spends one, so a flapping upstream can't turn each success into an
+    unbounded series of retries.
+    """
+
+    def __init__(self, capacity=RETRY_BUDGET, ratio=RETRY_BUDGET_RATIO):
+        self.capacity = max(1.0, float(capacity))
+        self.ratio = max(0.0, float(ratio))
+        self.tokens = self.capacity
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend one retry; returns False when the budget is exhausted."""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one upstream.
+
+    Closed: calls go through; failures are retried with backoff_delay() and
+    each retry spends the retry budget. Enough consecutive failures (or an
+    empty budget) open the breaker: no calls until the open period ends.
+    Then one probe is allowed (half-open); success closes the breaker, failure
+    opens it again for twice as long.
+
+    Meant to be driven by a single polling loop: before_call(), then
+    record_success() or record_failure(), then sleep next_delay().
+
+    Attributes:
+        name (str): Upstream name, for logs and metrics.
+        state (str): CLOSED, OPEN or HALF_OPEN.
+        failures (int): Consecutive failed calls.
+        trips (int): Consecutive openings without a successful probe.
+        last_failure (str): Reason of the latest failure.
+    """
+
+    def __init__(
+        self,
+        name="bochk",
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        open_seconds=BREAKER_OPEN_SECONDS,
+        max_open_seconds=BREAKER_MAX_OPEN_SECONDS,
+        backoff_base=BACKOFF_BASE_SECONDS,
+        backoff_max=BACKOFF_MAX_SECONDS,
+        budget=None,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.open_seconds = float(open_seconds)
+        self.max_open_seconds = max(self.open_seconds, float(max_open_seconds))
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.budget = budget if budget is not None else RetryBudget()
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.last_failure = None
+        self.retry_at = None
+
+    def before_call(self):
+        """Check whether a call may be made now.
+
+        Returns:
+            float: 0 if the call may proceed, otherwise seconds to wait.
+        """
+        with self.lock:
+            now = self.clock()
+            if self.state == OPEN:
+                if now < self.retry_at:
+                    return self.retry_at - now
+                self._set_state(HALF_OPEN)
+                return 0.0
+            if self.state == CLOSED and self.failures and not self.budget.withdraw():
+                self._open(now, "retry budget exhausted")
+                return self.retry_at - now
+            return 0.0
+
+    def record_success(self):
+        """Record a successful call (closes the breaker)."""
+        with self.lock:
+            self.budget.deposit()
+            self.failures = 0
+            self.trips = 0
+            self.retry_at = None
+            if self.state != CLOSED:
+                logger.info(f"Circuit breaker {self.name} closed")
+                self._set_state(CLOSED)
+
+    def record_failure(self, reason):
+        """Record a failed call.
+
+        Args:
+            reason (str): Error text or failure description.
+        """
+        with self.lock:
+            self.failures += 1
+            self.last_failure = reason
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open(self.clock(), reason)
+
+    def next_delay(self, interval):
+        """Seconds to wait before the next call.
+
+        Args:
+            interval (float): Normal polling interval.
+
+        Returns:
+            float: interval while healthy, a backoff while failing, or the
+                rest of the open period.
+        """
+        with self.lock:
+            if self.state == OPEN:
+                return max(0.0, self.retry_at - self.clock())
+            if self.failures:
+                return max(interval, backoff_delay(self.failures, self.backoff_base, self.backoff_max))
+            return interval
+
+    def snapshot(self):
+        """Return the breaker state for the dashboard and /api/state."""
+        with self.lock:
+            retry_at = None
+            if self.state == OPEN:
+                wall = time.time() + max(0.0, self.retry_at - self.clock())
+                retry_at = time.strftime("%Y-%m-%d %H:%M:%S", custom_time_converter(wall))
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "trips": self.trips,
+                "retry_at": retry_at,
+                "retry_budget": round(self.budget.tokens, 1),
+                "last_failure": self.last_failure,
+            }
+
+    def _open(self, now, reason):
+        """Open the breaker; caller holds self.lock."""
+        self.trips += 1
+        duration = min(self.max_open_seconds, self.open_seconds * 2 ** (self.trips - 1))
+        duration *= random.uniform(0.9, 1.1)
+        self.retry_at = now + duration
+        self._set_state(OPEN)
+        logger.warning(f"Circuit breaker {self.name} opened for {duration:.0f}s: {reason}")
+
+    def _set_state(self, state):
+        self.state = state
+        BREAKER_TRANSITIONS.inc(upstream=self.name, state=state)
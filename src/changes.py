@@ -0,0 +1,109 @@
+"""
+Quota change detection module.
+Keeps the previous dateQuota and reports per-date transitions, so only deltas
+(plus periodic full keyframes) need to be logged and stored.
+"""
+
+
+# A full dateQuota keyframe is emitted at least this often (in cycles)
+KEYFRAME_EVERY = 60
+
+
+def _is_open(status):
+    """Whether a dateQuota status means the date can be booked."""
+    return status is not None and status != "F"
+
+
+class QuotaChange:
+    """Result of comparing one response with the previous one.
+
+    Attributes:
+        keyframe (bool): Whether this cycle should be recorded in full.
+        changed (dict): date -> (old status, new status) for every changed date.
+        opened (list): Dates that became available this cycle.
+        closed (list): Dates that stopped being available this cycle.
+        available_list (list): All available dates, in dateQuota order.
+        quota (dict): The full dateQuota of this cycle.
+    """
+
+    __slots__ = ("keyframe", "changed", "opened", "closed", "available_list", "quota")
+
+    def __init__(self, keyframe, changed, opened, closed, available_list, quota):
+        self.keyframe = keyframe
+        self.changed = changed
+        self.opened = opened
+        self.closed = closed
+        self.available_list = available_list
+        self.quota = quota
+
+    def event(self):
+        """Return the (kind, payload) to store for this cycle, or None if nothing changed.
+
+        Keyframes store the whole dateQuota; deltas store date -> new status
+        (None for dates that disappeared from the response).
+        """
+        if self.keyframe:
+            return "key", dict(self.quota)
+        if self.changed:
+            return "delta", {date: new for date, (old, new) in self.changed.items()}
+        return None
+
+
+class QuotaChangeDetector:
+    """Tracks dateQuota across cycles.
+
+    When the quota is unchanged (the common case) the comparison is a single
+    dict equality check and the cached available list is reused.
+    """
+
+    def __init__(self, keyframe_every=KEYFRAME_EVERY):
+        self.keyframe_every = keyframe_every
+        self.previous = None
+        self.available_list = []
+        self.cycles_since_keyframe = 0
+
+    def reset(self):
+        """Forget the previous state; the next cycle becomes a keyframe."""
+        self.previous = None
+        self.available_list = []
+
+    def update(self, res_json):
+        """Compare a response with the previous one.
+
+        Args:
+            res_json (dict): API response.
+
+        Returns:
+            QuotaChange: Transitions for this cycle.
+        """
+        quota = res_json.get("dateQuota")
+        if not isinstance(quota, dict):
+            # No quota in the response (e.g. throttled): nothing to compare
+            return QuotaChange(False, {}, [], [], [], {})
+
+        keyframe = self.previous is None or self.cycles_since_keyframe + 1 >= self.keyframe_every
+        self.cycles_since_keyframe = 0 if keyframe else self.cycles_since_keyframe + 1
+
+        if quota == self.previous:
+            return QuotaChange(keyframe, {}, [], [], list(self.available_list), quota)
+
+        previous = self.previous or {}
+        changed = {}
+        opened = []
+        closed = []
+        for date in quota.keys() | previous.keys():
+            old = previous.get(date)
+            new = quota.get(date)
+            if old == new:
+                continue
+            changed[date] = (old, new)
+            if _is_open(new) and not _is_open(old):
+                opened.append(date)
+            elif _is_open(old) and not _is_open(new):
+                closed.append(date)
+
+        self.previous = dict(quota)
+        self.available_list = [date for date, status in quota.items() if status != "F"]
+        return QuotaChange(
+            keyframe, changed, sorted(opened), sorted(closed), list(self.available_list), quota
+        )
@@ -2,6 +2,7 @@
 Configuration management module.
 Supports loading from environment variables (.env), config.json file, or defaults.
 """
+import copy
 import json
 import os
 import threading
@@ -15,6 +16,13 @@ DEFAULT_CONFIG = {
         "check_dates": ["20260213", "20260214", "20260215"],
         "interval_seconds": 60,
         "notify_on_available": True,
+        # "fixed" polls every interval_seconds; "adaptive" learns from history
+        "schedule_mode": "fixed",
+        "min_interval_seconds": 15,
+        "max_interval_seconds": 300,
+        "daily_request_budget": 1440,
+        # Cycles kept in memory for the dashboard (older ones are in history.db)
+        "history_limit": 200,
     },
     "email": {
         "mail_host": "smtp.qq.com",
@@ -28,9 +36,44 @@ DEFAULT_CONFIG = {
 
 _CONFIG_LOCK = threading.Lock()
 
+# Environment variables read by _load_config_from_env()
+_ENV_KEYS = (
+    "MONITOR_ALL_DATES",
+    "MONITOR_CHECK_DATES",
+    "MONITOR_INTERVAL_SECONDS",
+    "MONITOR_NOTIFY_ON_AVAILABLE",
+    "MONITOR_SCHEDULE_MODE",
+    "MONITOR_DAILY_REQUEST_BUDGET",
+    "MONITOR_HISTORY_LIMIT",
+    "MAIL_HOST",
+    "MAIL_PORT",
+    "MAIL_USER",
+    "MAIL_PASS",
+    "SENDER",
+    "RECEIVERS",
+)
 
-def _get_data_dir():
-    """Get the persistent data directory."""
+# Cached merged config, keyed by config.json stat and an env fingerprint
+_cache_key = None
+_cached_config = None
+# Bumped whenever the effective configuration changes
+_config_version = 0
+
+
+def env_number(name, default, cast=float):
+    """Read a numeric setting from the environment, falling back to default."""
+    try:
+        return cast(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def get_data_dir():
+    """Get the persistent data directory (DATA_DIR, else data/ in the project root)."""
+    # Set by tests and benchmarks so they never touch the real data/ directory
+    data_dir = os.getenv("DATA_DIR")
+    if data_dir:
+        return data_dir
     # Try to find a persistent volume mount point
     # Railway usually allows mounting at arbitrary paths, but if user mounts at /app/data
     # we should check that.
@@ -41,7 +84,7 @@ def _get_data_dir():
 
 def _config_path():
     """Get the path to config.json in the data directory."""
-    data_dir = _get_data_dir()
+    data_dir = get_data_dir()
     return os.path.join(data_dir, "config.json")
 
 
@@ -76,14 +119,24 @@ def _load_config_from_env():
     notify_on_available_str = os.getenv("MONITOR_NOTIFY_ON_AVAILABLE", "").lower()
     notify_on_available = notify_on_available_str in ("true", "1", "yes") if notify_on_available_str else None
     
-    if check_dates is not None or interval_seconds is not None or notify_on_available is not None:
-        env_config["monitor"] = {}
-        if check_dates is not None:
-            env_config["monitor"]["check_dates"] = check_dates
-        if interval_seconds is not None:
-            env_config["monitor"]["interval_seconds"] = interval_seconds
-        if notify_on_available is not None:
-            env_config["monitor"]["notify_on_available"] = notify_on_available
+    schedule_mode = os.getenv("MONITOR_SCHEDULE_MODE", "").strip().lower() or None
+    
+    budget_str = os.getenv("MONITOR_DAILY_REQUEST_BUDGET", "")
+    daily_request_budget = int(budget_str) if budget_str.isdigit() else None
+    
+    history_limit_str = os.getenv("MONITOR_HISTORY_LIMIT", "")
+    history_limit = int(history_limit_str) if history_limit_str.isdigit() else None
+    
+    monitor_vars = {
+        "check_dates": check_dates,
+        "interval_seconds": interval_seconds,
+        "notify_on_available": notify_on_available,
+        "schedule_mode": schedule_mode,
+        "daily_request_budget": daily_request_budget,
+        "history_limit": history_limit,
+    }
+    if any(v is not None for v in monitor_vars.values()):
+        env_config["monitor"] = {k: v for k, v in monitor_vars.items() if v is not None}
     
     # Email settings from environment
     mail_port_str = os.getenv("MAIL_PORT", "").strip()
@@ -108,34 +161,77 @@ def _load_config_from_env():
     return env_config
 
 
-def load_config():
+def _read_config():
     """Load configuration from .env first, then config.json, with .env taking precedence."""
     # Load from environment variables first
     env_config = _load_config_from_env()
     
     # Then try to load from config.json
     path = _config_path()
-    with _CONFIG_LOCK:
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as handle:
-                    file_config = json.load(handle)
-                    # Merge: env config overrides file config
-                    file_config = _merge_config(DEFAULT_CONFIG, file_config)
-                    return _merge_config(file_config, env_config)
-            except (OSError, json.JSONDecodeError):
-                pass
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                file_config = json.load(handle)
+                # Merge: env config overrides file config
+                file_config = _merge_config(DEFAULT_CONFIG, file_config)
+                return _merge_config(file_config, env_config)
+        except (OSError, json.JSONDecodeError):
+            pass
     
     # If no config.json or error, use defaults merged with env
     return _merge_config(DEFAULT_CONFIG, env_config)
 
 
+def _fingerprint():
+    """Cheap identity of the config sources: config.json stat plus relevant env vars."""
+    try:
+        stat = os.stat(_config_path())
+        file_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except OSError:
+        file_key = None
+    return file_key, tuple(os.environ.get(key) for key in _ENV_KEYS)
+
+
+def _refresh_cache():
+    """Reload the cached config if its sources changed (caller holds _CONFIG_LOCK)."""
+    global _cache_key, _cached_config, _config_version
+    key = _fingerprint()
+    if key != _cache_key or _cached_config is None:
+        config = _read_config()
+        if config != _cached_config:
+            _config_version += 1
+        _cached_config = config
+        _cache_key = key
+
+
+def load_config():
+    """Load configuration from .env first, then config.json, with .env taking precedence.
+    
+    The merged result is cached and only rebuilt when config.json's mtime/size or
+    one of the config environment variables changes. Callers get their own copy.
+    """
+    with _CONFIG_LOCK:
+        _refresh_cache()
+        return copy.deepcopy(_cached_config)
+
+
+def config_version():
+    """Return a counter that increases whenever the effective configuration changes."""
+    with _CONFIG_LOCK:
+        _refresh_cache()
+        return _config_version
+
+
 def save_config(config):
     """Save configuration to config.json."""
     path = _config_path()
     # Ensure config directory exists
     os.makedirs(os.path.dirname(path), exist_ok=True)
+    global _cache_key
     with _CONFIG_LOCK:
         with open(path, "w", encoding="utf-8") as handle:
             json.dump(config, handle, indent=2, ensure_ascii=True)
             handle.write("\n")
+        # Force a reload even if mtime granularity hides the write
+        _cache_key = None
+        _refresh_cache()
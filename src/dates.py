@@ -0,0 +1,233 @@
+"""
+Date matcher module.
+Compiles watch specs (dates, ranges, weekdays, next N business days and
+exclusions) once into a set of matching YYYYMMDD strings, so checking a
+dateQuota key is a single hash lookup.
+
+Spec syntax (one item per list entry or comma-separated):
+    all                    every date
+    20260213               one date
+    20260213-20260220      inclusive range
+    weekdays / weekends    Monday-Friday / Saturday-Sunday
+    mon, tue, ..., sun     single weekdays
+    next:10                the next 10 business days (Mon-Fri), from today
+    !<spec>                exclude, e.g. !20260214 or !20260301-20260305
+
+Dates, ranges and next:N are combined (union); weekday items then restrict
+that set (or every date, if there are no date items); exclusions are removed
+last.
+"""
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from .logger import custom_time_converter, logger
+
+
+# Days before/after today that are compiled into the lookup set; dateQuota
+# only covers the next couple of months
+WINDOW_PAST_DAYS = 7
+WINDOW_FUTURE_DAYS = 400
+
+WEEKDAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+WEEKDAY_GROUPS = {
+    "weekdays": frozenset(range(5)),
+    "weekends": frozenset((5, 6)),
+}
+
+
+def today_str():
+    """Today's date as YYYYMMDD in the configured timezone (TIMEZONE_OFFSET)."""
+    return time.strftime("%Y%m%d", custom_time_converter(time.time()))
+
+
+def _parse_day(text):
+    return datetime.strptime(text, "%Y%m%d").date()
+
+
+def _next_business_days(today, count):
+    days = []
+    day = today
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+class _Rules:
+    """Parsed spec: the slow but complete definition of a matcher."""
+
+    __slots__ = ("everything", "dates", "ranges", "weekdays", "excluded_dates", "excluded_ranges", "excluded_weekdays")
+
+    def __init__(self):
+        self.everything = False
+        self.dates = set()
+        self.ranges = []
+        self.weekdays = set()
+        self.excluded_dates = set()
+        self.excluded_ranges = []
+        self.excluded_weekdays = set()
+
+    def add(self, token, today):
+        """Add one spec item; raises ValueError if it can't be parsed."""
+        exclude = token.startswith("!")
+        token = token.lstrip("!").strip().lower()
+        dates = self.excluded_dates if exclude else self.dates
+        ranges = self.excluded_ranges if exclude else self.ranges
+        weekdays = self.excluded_weekdays if exclude else self.weekdays
+        if token == "all":
+            if exclude:
+                raise ValueError("'!all' excludes everything")
+            self.everything = True
+        elif token in WEEKDAY_GROUPS:
+            weekdays.update(WEEKDAY_GROUPS[token])
+        elif token in WEEKDAY_NAMES:
+            weekdays.add(WEEKDAY_NAMES.index(token))
+        elif token.startswith("next:"):
+            dates.update(_next_business_days(today, int(token[5:])))
+        elif "-" in token:
+            start, end = (_parse_day(part.strip()) for part in token.split("-", 1))
+            ranges.append((min(start, end), max(start, end)))
+        else:
+            dates.add(_parse_day(token))
+
+    def match(self, day):
+        """Whether a date object matches (evaluates every rule)."""
+        if day in self.excluded_dates or day.weekday() in self.excluded_weekdays:
+            return False
+        if any(start <= day <= end for start, end in self.excluded_ranges):
+            return False
+        if self.everything:
+            return True
+        if self.dates or self.ranges:
+            if day not in self.dates and not any(start <= day <= end for start, end in self.ranges):
+                return False
+        elif not self.weekdays and not self._has_exclusions():
+            return False  # Empty spec matches nothing
+        return not self.weekdays or day.weekday() in self.weekdays
+
+    def candidates(self, start, end):
+        """Days that can match: listed and range days if any, else every day in [start, end]."""
+        if not (self.dates or self.ranges):
+            return (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+        days = set(self.dates)
+        for range_start, range_end in self.ranges:
+            day = max(range_start, start)
+            while day <= min(range_end, end):
+                days.add(day)
+                day += timedelta(days=1)
+        return days
+
+    def _has_exclusions(self):
+        return bool(self.excluded_dates or self.excluded_ranges or self.excluded_weekdays)
+
+    def is_empty(self):
+        return not (self.everything or self.dates or self.ranges or self.weekdays or self._has_exclusions())
+
+    def is_everything(self):
+        return self.everything and not self._has_exclusions()
+
+
+class DateMatcher:
+    """Compiled watch spec.
+
+    Dates inside the compile window are answered from a frozenset of
+    YYYYMMDD strings; dates outside it (rare) fall back to the rules.
+
+    Attributes:
+        specs (tuple): Normalized spec items the matcher was compiled from.
+        today (str): YYYYMMDD the matcher was compiled for (next:N and the
+            window depend on it).
+        everything (bool): Matches every date (``all`` without exclusions).
+        dates (frozenset): Matching dates inside the window.
+        exact (bool): ``dates`` is complete, also outside the window (specs
+            made of listed dates and next:N only).
+    """
+
+    __slots__ = ("specs", "today", "everything", "exact", "dates", "window_start", "window_end", "_rules")
+
+    def __init__(self, specs, today):
+        self.specs = specs
+        self.today = today
+        rules = _Rules()
+        today_date = _parse_day(today)
+        for token in specs:
+            try:
+                rules.add(token, today_date)
+            except ValueError:
+                logger.warning(f"Ignoring invalid date spec: {token!r}")
+        self._rules = rules
+        self.everything = rules.is_everything()
+        self.exact = not (rules.everything or rules.ranges) and (bool(rules.dates) or rules.is_empty())
+        start = today_date - timedelta(days=WINDOW_PAST_DAYS)
+        end = today_date + timedelta(days=WINDOW_FUTURE_DAYS)
+        self.window_start = start.strftime("%Y%m%d")
+        self.window_end = end.strftime("%Y%m%d")
+        if self.everything:
+            self.dates = frozenset()
+        else:
+            self.dates = frozenset(
+                day.strftime("%Y%m%d") for day in rules.candidates(start, end) if rules.match(day)
+            )
+
+    def __contains__(self, key):
+        if self.everything or key in self.dates:
+            return True
+        if self.exact or self.window_start <= key <= self.window_end:
+            return False
+        try:
+            return self._rules.match(_parse_day(key))
+        except ValueError:
+            return False
+
+    def filter(self, keys):
+        """Return the matching keys, in input order."""
+        if self.everything:
+            return list(keys)
+        return [key for key in keys if key in self]
+
+
+def normalize_specs(specs):
+    """Turn a spec list/string into a tuple of stripped items."""
+    if specs is None:
+        return ()
+    if isinstance(specs, str):
+        specs = [specs]
+    items = []
+    for spec in specs:
+        items.extend(part.strip() for part in str(spec).split(","))
+    return tuple(item for item in items if item)
+
+
+@lru_cache(maxsize=128)
+def _compile(specs, today):
+    return DateMatcher(specs, today)
+
+
+def compile_dates(specs, today=None):
+    """Compile (or fetch the cached) matcher for specs.
+
+    Args:
+        specs: List of spec items (see module docstring) or a DateMatcher
+            (returned as is unless it was compiled for an earlier day).
+        today (str): YYYYMMDD to compile for (default: today).
+
+    Returns:
+        DateMatcher: Shared, immutable matcher.
+    """
+    if isinstance(specs, DateMatcher):
+        return refresh(specs)
+    return _compile(normalize_specs(specs), today or today_str())
+
+
+def refresh(matcher):
+    """Return matcher, recompiled if it was compiled for an earlier day.
+
+    Args:
+        matcher (DateMatcher): Previously compiled matcher.
+    """
+    today = today_str()
+    if matcher.today == today:
+        return matcher
+    return _compile(matcher.specs, today)
@@ -0,0 +1,155 @@
+"""
+Notification dispatcher module.
+Sends notifications from a background thread so pollers only have to enqueue.
+"""
+import queue
+import threading
+import time
+
+from .logger import logger
+from .send_email import send_email
+
+
+# Maximum number of notifications waiting to be sent
+DISPATCH_QUEUE_SIZE = 100
+
+_STOP = object()
+
+
+class NotificationDispatcher:
+    """Background sender fed by a bounded queue.
+
+    Sending (over the notifier channels, see notifier.py) happens on the
+    dispatcher thread, so a slow mail server never delays the next poll. When
+    the queue is full new notifications are dropped and logged.
+
+    Attributes:
+        sent (int): Notifications delivered.
+        failed (int): Notifications that could not be delivered.
+        dropped (int): Notifications rejected because the queue was full.
+    """
+
+    def __init__(self, send=send_email, maxsize=DISPATCH_QUEUE_SIZE):
+        """Initialize the dispatcher.
+
+        Args:
+            send (callable): Function taking (title, content) and optionally
+                receivers, returning bool.
+            maxsize (int): Queue capacity.
+        """
+        self.send = send
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the dispatcher thread if it isn't running."""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=None):
+        """Send everything already queued, then stop the thread."""
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is not None:
+            self.queue.put(_STOP)
+            thread.join(timeout)
+
+    def enqueue(self, title, content, receivers=None, on_done=None):
+        """Queue a notification without blocking.
+
+        Args:
+            title (str): Email subject.
+            content (str): Email body text.
+            receivers (list): Recipients (default: the configured receivers).
+            on_done (callable): Called with True/False on the dispatcher
+                thread once the send succeeded or failed (not when dropped).
+
+        Returns:
+            bool: True if queued, False if the queue was full.
+        """
+        self.start()
+        try:
+            self.queue.put_nowait((title, content, receivers, on_done, time.monotonic()))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            logger.warning(f"Notification queue full, dropped: {title}")
+            return False
+
+    def stats(self):
+        """Return dispatcher counters and current queue depth."""
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
+
+    def _run(self):
+        """Thread body: deliver queued notifications one by one."""
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            title, content, receivers, on_done, enqueued_at = item
+            try:
+                if receivers:
+                    ok = self.send(title, content, receivers)
+                else:
+                    ok = self.send(title, content)
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.error(f"Notification send error: {exc}")
+                ok = False
+            with self.lock:
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            waited = time.monotonic() - enqueued_at
+            if ok:
+                logger.info(f"Notification delivered after {waited:.2f}s: {title}")
+            else:
+                logger.error(f"Notification failed after {waited:.2f}s: {title}")
+            if on_done is not None:
+                try:
+                    on_done(ok)
+                except Exception as exc:  # pragma: no cover - defensive logging
+                    logger.error(f"Notification callback error: {exc}")
+
+
+_DISPATCHER = None
+_DISPATCHER_LOCK = threading.Lock()
+
+
+def get_dispatcher():
+    """Return the process-wide dispatcher, creating it on first use."""
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            _DISPATCHER = NotificationDispatcher()
+        return _DISPATCHER
+
+
+def enqueue_email(title, content, receivers=None, on_done=None):
+    """Queue an email notification on the shared dispatcher.
+
+    Args:
+        title (str): Email subject.
+        content (str): Email body text.
+        receivers (list): Recipients (default: the configured receivers).
+        on_done (callable): Called with whether the send succeeded.
+
+    Returns:
+        bool: True if queued, False if the queue was full.
+    """
+    return get_dispatcher().enqueue(title, content, receivers, on_done)
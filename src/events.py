@@ -0,0 +1,178 @@
+"""
+Server-Sent Events module.
+Fans out monitor events to connected dashboards; each event is serialized once
+and handed to every subscriber's queue.
+"""
+import json
+import queue
+import threading
+import time
+
+from .config import env_number
+
+
+# Seconds between keep-alive comments on an idle stream
+SSE_KEEPALIVE_SECONDS = 15
+# Open streams per process; each one holds a gunicorn thread (see --threads in
+# the Procfile), so this must stay below the thread count or streams starve
+# every other request
+SSE_MAX_STREAMS = env_number("SSE_MAX_STREAMS", 4, int)
+# Streams are closed after this many seconds; the browser reconnects on its own
+SSE_MAX_STREAM_SECONDS = env_number("SSE_MAX_STREAM_SECONDS", 300)
+# Events buffered per subscriber before it is considered too slow and dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+# Reconnect delay suggested to browsers (milliseconds)
+SSE_RETRY_MS = 5000
+
+_CLOSED = object()
+
+
+def format_event(event, data, event_id=None):
+    """Encode one SSE message.
+
+    Args:
+        event (str): Event name.
+        data: JSON-serializable payload.
+        event_id: Optional event id (sent as ``id:``).
+
+    Returns:
+        str: Message text ending with a blank line.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+class EventBroker:
+    """Publish/subscribe hub for SSE streams.
+
+    Publishing costs one JSON encode plus a non-blocking queue put per
+    subscriber. A subscriber whose queue is full is disconnected (its browser
+    reconnects and gets a fresh state event) instead of slowing the publisher.
+
+    Attributes:
+        published (int): Events published.
+        dropped (int): Subscribers disconnected for falling behind.
+        rejected (int): Subscriptions refused because max_streams were open.
+    """
+
+    def __init__(self, maxsize=SUBSCRIBER_QUEUE_SIZE, max_streams=SSE_MAX_STREAMS):
+        self.maxsize = maxsize
+        self.max_streams = max(1, int(max_streams))
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.published = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def subscribe(self):
+        """Register a new subscriber.
+
+        Returns:
+            queue.Queue: Queue receiving formatted messages, or None if
+                max_streams subscribers are already connected.
+        """
+        subscriber = queue.Queue(maxsize=self.maxsize)
+        with self.lock:
+            if len(self.subscribers) >= self.max_streams:
+                self.rejected += 1
+                return None
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber (safe to call twice)."""
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        """Send an event to every subscriber without blocking.
+
+        Args:
+            event (str): Event name.
+            data: JSON-serializable payload.
+        """
+        with self.lock:
+            if not self.subscribers:
+                return
+            self.published += 1
+            message = format_event(event, data)
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    self.subscribers.discard(subscriber)
+                    self.dropped += 1
+                    _close(subscriber)
+
+    def close(self):
+        """Disconnect every subscriber."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            _close(subscriber)
+
+    def stream(
+        self, subscriber, initial=(), keepalive=SSE_KEEPALIVE_SECONDS, max_seconds=SSE_MAX_STREAM_SECONDS
+    ):
+        """Generate SSE text for one subscriber until it is closed or max_seconds pass.
+
+        Args:
+            subscriber (queue.Queue): Queue from subscribe().
+            initial (iterable): Messages sent before any published event.
+            keepalive (float): Seconds between keep-alive comments.
+            max_seconds (float): Lifetime of the stream; ending it frees the
+                thread and the browser reconnects after SSE_RETRY_MS.
+
+        Yields:
+            str: SSE messages.
+        """
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            yield from initial
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    message = subscriber.get(timeout=min(keepalive, remaining))
+                except queue.Empty:
+                    if time.monotonic() >= deadline:
+                        break
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is _CLOSED:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        """Return subscriber count and counters."""
+        with self.lock:
+            return {
+                "subscribers": len(self.subscribers),
+                "published": self.published,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+            }
+
+
+def _close(subscriber):
+    """Wake a subscriber's stream so it ends."""
+    while True:
+        try:
+            subscriber.put_nowait(_CLOSED)
+            return
+        except queue.Full:
+            # Make room for the sentinel; the subscriber is being dropped anyway
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                pass
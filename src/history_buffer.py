@@ -0,0 +1,169 @@
+"""
+In-memory recent history module.
+Keeps the latest monitor cycles in a fixed-capacity ring buffer of compact
+records, with lock-free, copy-free snapshots for readers.
+"""
+import threading
+
+
+# Default number of cycles kept in memory
+HISTORY_LIMIT = 200
+
+
+class HistoryRecord:
+    """One monitor cycle (immutable by convention).
+
+    Attributes:
+        checked_at (str): Cycle timestamp.
+        available_num (int): Available dates, None if the cycle failed.
+        available_list (tuple): Available dates.
+        eai_code (str): API result code.
+        error (str): Error message for failed cycles.
+    """
+
+    __slots__ = ("checked_at", "available_num", "available_list", "eai_code", "error")
+
+    def __init__(self, checked_at, available_num, available_list, eai_code, error):
+        self.checked_at = checked_at
+        self.available_num = available_num
+        self.available_list = tuple(available_list)
+        self.eai_code = eai_code
+        self.error = error
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Build a record from a history entry dict."""
+        return cls(
+            entry["checked_at"],
+            entry["available_num"],
+            entry["available_list"],
+            entry["eai_code"],
+            entry["error"],
+        )
+
+    def to_dict(self):
+        """Return the record as a history entry dict."""
+        return {
+            "checked_at": self.checked_at,
+            "available_num": self.available_num,
+            "available_list": list(self.available_list),
+            "eai_code": self.eai_code,
+            "error": self.error,
+        }
+
+
+class HistorySnapshot:
+    """Read-only view of a HistoryRing at one version.
+
+    Taking a snapshot copies nothing: it remembers the ring's buffer and how
+    many records had been appended. Iteration reads slots lazily and skips any
+    slot the writer has since overwritten (only possible when a reader is more
+    than ``capacity`` appends behind), so readers never block the writer.
+    len() counts the records still readable, so it can shrink while a slow
+    reader holds an old snapshot.
+
+    Attributes:
+        version (int): Total records appended when the snapshot was taken.
+    """
+
+    __slots__ = ("_slots", "_capacity", "version", "_count")
+
+    def __init__(self, slots, capacity, version, count):
+        self._slots = slots
+        self._capacity = capacity
+        self.version = version
+        self._count = count
+
+    def __len__(self):
+        return self.version - self._first_valid()
+
+    def _first_valid(self):
+        """Oldest sequence not yet overwritten.
+
+        The writer overwrites slots oldest first, so overwritten sequences are
+        always a prefix of the snapshot's range and can be found by bisection.
+        """
+        low, high = self.version - self._count, self.version
+        while low < high:
+            middle = (low + high) // 2
+            item = self._slots[middle % self._capacity]
+            if item is not None and item[0] == middle:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _records(self, sequences):
+        for sequence in sequences:
+            item = self._slots[sequence % self._capacity]
+            # Each slot holds (sequence, record); a newer sequence means it was overwritten
+            if item is not None and item[0] == sequence:
+                yield item[1]
+
+    def __iter__(self):
+        """Iterate records oldest first."""
+        return self._records(range(self._first_valid(), self.version))
+
+    def latest(self, n=None):
+        """Return up to n records, newest first.
+
+        Args:
+            n (int): Maximum number of records (None for all).
+        """
+        count = len(self)
+        n = count if n is None else min(n, count)
+        return list(self._records(range(self.version - 1, self.version - 1 - n, -1)))
+
+    def to_list(self):
+        """Return all records as entry dicts, oldest first."""
+        return [record.to_dict() for record in self]
+
+
+class HistoryRing:
+    """Fixed-capacity ring buffer of HistoryRecords.
+
+    Appending overwrites the oldest slot in O(1) regardless of capacity, so
+    the limit can be raised well beyond the dashboard's needs.
+    """
+
+    def __init__(self, capacity=HISTORY_LIMIT):
+        self.lock = threading.Lock()
+        self.capacity = max(1, int(capacity))
+        self._slots = [None] * self.capacity
+        self._version = 0
+        self._count = 0
+        self._snapshot = HistorySnapshot(self._slots, self.capacity, 0, 0)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        """Add a record, evicting the oldest one when full."""
+        with self.lock:
+            sequence = self._version
+            self._slots[sequence % self.capacity] = (sequence, record)
+            self._version = sequence + 1
+            self._count = min(self._count + 1, self.capacity)
+            self._snapshot = HistorySnapshot(self._slots, self.capacity, self._version, self._count)
+
+    def snapshot(self):
+        """Return the current immutable snapshot (no lock, no copy)."""
+        return self._snapshot
+
+    def resize(self, capacity):
+        """Change capacity, keeping the newest records that fit.
+
+        Existing snapshots keep reading the old buffer, which is no longer written.
+        """
+        capacity = max(1, int(capacity))
+        with self.lock:
+            if capacity == self.capacity:
+                return
+            records = list(self._snapshot)[-capacity:]
+            start = self._version - len(records)
+            self._slots = [None] * capacity
+            for sequence, record in enumerate(records, start):
+                self._slots[sequence % capacity] = (sequence, record)
+            self.capacity = capacity
+            self._count = len(records)
+            self._snapshot = HistorySnapshot(self._slots, capacity, self._version, self._count)
@@ -0,0 +1,306 @@
+"""
+History storage module.
+Persists one row per monitor cycle in SQLite under the data directory, indexed
+by timestamp, so history can be queried and paged without scanning the logs.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+from .config import get_data_dir
+from .logger import logger, read_history_from_logs
+
+
+HISTORY_DB_PATH = os.path.join(get_data_dir(), "history.db")
+
+# Timestamps have one-second resolution and two cycles can share a second
+# (check-now right after a scheduled poll), so rows are keyed by id
+_TABLES = {
+    "history": """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    checked_at TEXT NOT NULL,
+    available_num INTEGER,
+    available_list TEXT NOT NULL DEFAULT '',
+    eai_code TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS history_checked_at ON history (checked_at);
+""",
+    "quota_events": """
+CREATE TABLE IF NOT EXISTS quota_events (
+    id INTEGER PRIMARY KEY,
+    checked_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quota_events_checked_at ON quota_events (checked_at, kind);
+""",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+_COLUMNS = "checked_at, available_num, available_list, eai_code, error"
+
+
+def _row_to_entry(row):
+    """Convert a history row into the dict shape used by the app and templates."""
+    checked_at, available_num, available_list, eai_code, error = row
+    return {
+        "checked_at": checked_at,
+        "available_num": available_num,
+        "available_list": available_list.split(",") if available_list else [],
+        "eai_code": eai_code,
+        "error": error,
+    }
+
+
+class HistoryStore:
+    """Append-only store of monitor cycles.
+
+    Rows are indexed by their ``checked_at`` second (``YYYY-MM-DD HH:MM:SS``),
+    which sorts chronologically, so lookups and paging are index range scans;
+    cycles within the same second are kept in insertion (id) order.
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        """Open (and create if needed) the store at path.
+
+        Args:
+            path (str): SQLite database file.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate()
+            self.conn.executescript(_SCHEMA + "".join(_TABLES.values()))
+            self.conn.commit()
+
+    def _migrate(self):
+        """Move tables keyed by checked_at (one row per second) to id keys; lock held."""
+        for table, schema in _TABLES.items():
+            columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+            if not columns or "id" in columns:
+                continue
+            names = ", ".join(columns)
+            self.conn.executescript(
+                f"BEGIN; ALTER TABLE {table} RENAME TO {table}_old; {schema}"
+                f"INSERT INTO {table} ({names}) SELECT {names} FROM {table}_old ORDER BY checked_at; "
+                f"DROP TABLE {table}_old; COMMIT;"
+            )
+            logger.info(f"Migrated history table {table} to id keys")
+
+    def record(self, checked_at, available_num, available_list, eai_code, error):
+        """Append one monitor cycle.
+
+        Args:
+            checked_at (str): Cycle timestamp, ``YYYY-MM-DD HH:MM:SS``.
+            available_num (int): Number of available dates, None on error.
+            available_list (list): Available dates.
+            eai_code (str): eaiCode returned by BOCHK, None on error.
+            error (str): Error text, None on success.
+        """
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO history ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                (checked_at, available_num, ",".join(available_list), eai_code, error),
+            )
+            self.conn.commit()
+
+    def record_entry(self, entry):
+        """Append a history entry dict (as kept by MonitorState)."""
+        self.record(
+            entry["checked_at"],
+            entry["available_num"],
+            entry["available_list"],
+            entry["eai_code"],
+            entry["error"],
+        )
+
+    def import_entries(self, entries):
+        """Bulk-append history entry dicts in one transaction.
+
+        Entries whose second is already stored are skipped (backfill dedup).
+        """
+        rows = [
+            (
+                entry["checked_at"],
+                entry["available_num"],
+                ",".join(entry["available_list"]),
+                entry["eai_code"],
+                entry["error"],
+                entry["checked_at"],
+            )
+            for entry in entries
+        ]
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT INTO history ({_COLUMNS}) SELECT ?, ?, ?, ?, ? "
+                "WHERE NOT EXISTS (SELECT 1 FROM history WHERE checked_at = ?)",
+                rows,
+            )
+            self.conn.commit()
+
+    def count(self):
+        """Return the number of stored cycles."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def get(self, checked_at):
+        """Return the (first) entry recorded at checked_at, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM history WHERE checked_at = ? ORDER BY id LIMIT 1", (checked_at,)
+            ).fetchone()
+        return _row_to_entry(row) if row else None
+
+    def entries(self, since=None, newest_first=False):
+        """Return stored entries in chronological (or reverse) order.
+
+        Args:
+            since (str): Only entries with checked_at >= since.
+            newest_first (bool): Return newest entries first.
+
+        Returns:
+            list: History entry dicts.
+        """
+        order = "DESC" if newest_first else "ASC"
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM history WHERE checked_at >= ? ORDER BY checked_at {order}, id {order}",
+                (since or "",),
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def page(self, before=None, limit=50):
+        """Return up to limit entries older than the cursor, newest first.
+
+        Args:
+            before (str): Cursor from a previous page (``<checked_at>|<id>``;
+                a bare timestamp means strictly before that second), None for
+                the latest page.
+            limit (int): Maximum number of entries.
+
+        Returns:
+            tuple: (list of history entry dicts, cursor of the next (older)
+                page or None if this is the last one)
+        """
+        checked_at, _, row_id = (before or "").partition("|")
+        with self.lock:
+            if checked_at and row_id.isdigit():
+                rows = self.conn.execute(
+                    f"SELECT id, {_COLUMNS} FROM history WHERE (checked_at, id) < (?, ?) "
+                    "ORDER BY checked_at DESC, id DESC LIMIT ?",
+                    (checked_at, int(row_id), limit + 1),
+                ).fetchall()
+            elif checked_at:
+                rows = self.conn.execute(
+                    f"SELECT id, {_COLUMNS} FROM history WHERE checked_at < ? "
+                    "ORDER BY checked_at DESC, id DESC LIMIT ?",
+                    (checked_at, limit + 1),
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    f"SELECT id, {_COLUMNS} FROM history ORDER BY checked_at DESC, id DESC LIMIT ?",
+                    (limit + 1,),
+                ).fetchall()
+        # The extra row only tells whether an older page exists
+        cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            cursor = f"{rows[-1][1]}|{rows[-1][0]}"
+        return [_row_to_entry(row[1:]) for row in rows], cursor
+
+    def record_quota_event(self, checked_at, kind, payload):
+        """Store a dateQuota keyframe ("key") or per-date delta ("delta").
+
+        Args:
+            checked_at (str): Cycle timestamp.
+            kind (str): "key" for a full dateQuota, "delta" for changed dates only.
+            payload (dict): dateQuota (key) or date -> new status (delta).
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO quota_events (checked_at, kind, payload) VALUES (?, ?, ?)",
+                (checked_at, kind, json.dumps(payload, separators=(",", ":"))),
+            )
+            self.conn.commit()
+
+    def quota_at(self, checked_at):
+        """Rebuild the full dateQuota as of checked_at from the last keyframe and later deltas.
+
+        Returns:
+            dict: dateQuota, or None if no keyframe precedes checked_at.
+        """
+        with self.lock:
+            key_row = self.conn.execute(
+                "SELECT id, checked_at, payload FROM quota_events WHERE kind = 'key' AND checked_at <= ? "
+                "ORDER BY checked_at DESC, id DESC LIMIT 1",
+                (checked_at,),
+            ).fetchone()
+            if key_row is None:
+                return None
+            delta_rows = self.conn.execute(
+                "SELECT payload FROM quota_events WHERE kind = 'delta' AND (checked_at, id) > (?, ?) "
+                "AND checked_at <= ? ORDER BY checked_at, id",
+                (key_row[1], key_row[0], checked_at),
+            ).fetchall()
+        quota = json.loads(key_row[2])
+        for (payload,) in delta_rows:
+            for date, status in json.loads(payload).items():
+                if status is None:
+                    quota.pop(date, None)
+                else:
+                    quota[date] = status
+        return quota
+
+    def get_meta(self, key, default=None):
+        """Read a value from the meta table."""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        """Write a value to the meta table."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+            self.conn.commit()
+
+    def import_logs_once(self):
+        """Backfill the store from existing log files the first time it is opened."""
+        if self.get_meta("logs_imported"):
+            return
+        entries = read_history_from_logs()
+        self.import_entries(entries)
+        self.set_meta("logs_imported", "1")
+        logger.info(f"Imported {len(entries)} history entries from logs")
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_history_store():
+    """Return the process-wide history store, creating it on first use."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            store = HistoryStore()
+            try:
+                store.import_logs_once()
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.warning(f"History import from logs failed: {exc}")
+            _STORE = store
+        return _STORE
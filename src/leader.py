@@ -0,0 +1,114 @@
+"""
+Poller leader election module.
+Lets several web worker processes share one poller: the process holding an
+exclusive lock on data/poller.lock polls BOCHK and publishes its state to a
+shared file; the other workers serve that state and forward start/stop
+requests through a control file.
+"""
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: no multi-worker gunicorn anyway
+    fcntl = None
+
+from .config import get_data_dir
+
+
+# Held (flock) by the polling process for as long as it lives
+LEADER_LOCK_PATH = os.path.join(get_data_dir(), "poller.lock")
+# Latest state published by the leader for the other workers
+SHARED_STATE_PATH = os.path.join(get_data_dir(), "monitor_state.json")
+# Latest history entries in the shared state (the dashboard shows 10; the
+# full history is in data/history.db)
+SHARED_HISTORY_ENTRIES = 20
+# Desired running state, written by whichever worker handled start/stop
+CONTROL_PATH = os.path.join(get_data_dir(), "monitor_control.json")
+# How often workers check for leadership changes, commands and new state
+LEADER_POLL_SECONDS = 1.0
+
+
+class LeaderElection:
+    """Exclusive, crash-safe leadership based on flock().
+
+    The lock is tied to an open file descriptor, so the kernel releases it
+    when the leader process exits or is killed and another worker can take
+    over on its next try_acquire().
+    """
+
+    def __init__(self, path=LEADER_LOCK_PATH):
+        self.path = path
+        self._handle = None
+
+    @property
+    def is_leader(self):
+        return self._handle is not None
+
+    def try_acquire(self):
+        """Try to become the leader without blocking.
+
+        Returns:
+            bool: True if this process is (now) the leader.
+        """
+        if self._handle is not None:
+            return True
+        if fcntl is None:
+            # No flock(): assume a single process, which is then always the leader
+            self._handle = True
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        handle = open(self.path, "a+")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._handle = handle
+        return True
+
+    def release(self):
+        """Give up leadership."""
+        handle, self._handle = self._handle, None
+        if handle is not None and handle is not True:
+            handle.close()
+
+
+def write_json_atomic(path, data):
+    """Write JSON so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class SharedFile:
+    """JSON file re-read only when its stat signature changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._key = None
+        self._data = None
+
+    def read(self):
+        """Return (data, changed); data is None if the file is missing or invalid."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None, False
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if key == self._key:
+            return self._data, False
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return self._data, False
+        self._key = key
+        self._data = data
+        return data, True
@@ -6,11 +6,20 @@ import logging
 import logging.handlers
 import os
 import glob
+import heapq
 import re
 import ast
+import gzip
+import json
+import mmap
+import shutil
+import threading
 from time import strftime
 import time
 
+from .config import get_data_dir
+from .profiler import profiled
+
 # Get timezone offset from env, default to 0
 # Calculation: User Timezone - Server Timezone
 # Example: User GMT+8, Server GMT-4 => Offset = 8 - (-4) = 12
@@ -25,123 +34,450 @@ def custom_time_converter(timestamp):
 
 logging.Formatter.converter = staticmethod(custom_time_converter)
 
-def _get_data_dir():
-    """Get the persistent data directory (shared with config)."""
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    return os.path.join(project_root, "data")
-
 # Create logs directory path inside data directory
-LOGS_DIR = os.path.join(_get_data_dir(), "logs")
+LOGS_DIR = os.path.join(get_data_dir(), "logs")
 # Log filename based on date (daily log file)
 LOG_FILENAME = os.path.join(LOGS_DIR, strftime("bochk_monitor_%Y_%m_%d.log"))
 
 
-def read_history_from_logs():
-    """Read and parse all log files to reconstruct history."""
-    history = []
-    # Match both old hourly logs and new daily logs
-    log_files = sorted(glob.glob(os.path.join(LOGS_DIR, "bochk_monitor_*.log")))
-    
-    # Regex patterns
-    # 2026-02-12 11:15:35,123 INFO: Monitor cycle: 0 available dates: []
-    cycle_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}).*Monitor cycle: (\d+) available dates: (\[.*\])")
-    # 2026-02-12 11:15:35,123 ERROR: Monitoring error: some error
-    error_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}).*Monitoring error: (.*)")
-    # Legacy/Raw JSON log pattern: 2026-02-12 11:19:55,717 INFO: {'acceptTerms': None, ...}
-    json_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}).*INFO: (\{.*\})")
-    
-    # Keep track of timestamps to prevent duplicates (since we log both summary and raw JSON now)
-    seen_timestamps = set()
+# Sidecar index that remembers, per log file, how far it has been parsed and
+# which history entries it produced, so /history only parses appended bytes.
+# One JSON file per log file, so an append only rewrites the live file's entry.
+HISTORY_INDEX_DIR = os.path.join(LOGS_DIR, ".history_index")
+HISTORY_INDEX_VERSION = 2
+# Bytes at the start of a file used to detect truncation/replacement
+_HEAD_BYTES = 256
+# Unparsed regions larger than this are read through mmap instead of read()
+MMAP_THRESHOLD = 1024 * 1024
+# Rotated log files are gzip-compressed with this extension
+COMPRESSED_SUFFIX = ".gz"
 
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    cycle_match = cycle_pattern.search(line)
-                    if cycle_match:
-                        checked_at = cycle_match.group(1)
-                        
-                        # Dedup: if we already have a record for this second, skip
-                        if checked_at in seen_timestamps:
-                            continue
-                            
-                        available_num = int(cycle_match.group(2))
-                        available_list_str = cycle_match.group(3)
-                        # Parse list string "['20260213', '20260214']" -> list
-                        available_list = [d.strip().strip("'").strip('"') for d in available_list_str.strip("[]").split(",") if d.strip()]
-                        
-                        history.append({
-                            "checked_at": checked_at,
-                            "available_num": available_num,
-                            "available_list": available_list,
-                            "eai_code": "SUCCESS", 
-                            "error": None
-                        })
-                        seen_timestamps.add(checked_at)
-                        continue
-                        
-                    error_match = error_pattern.search(line)
-                    if error_match:
-                        checked_at = error_match.group(1)
-                        
-                        # Dedup
-                        if checked_at in seen_timestamps:
-                            continue
-
-                        error_msg = error_match.group(2)
-                        history.append({
-                            "checked_at": checked_at,
-                            "available_num": None,
-                            "available_list": [],
-                            "eai_code": None,
-                            "error": error_msg
-                        })
-                        seen_timestamps.add(checked_at)
-                        continue
-
-                    # Fallback: Try to parse raw JSON log (for older logs)
-                    json_match = json_pattern.search(line)
-                    if json_match:
-                        try:
-                            checked_at = json_match.group(1)
-                            
-                            # Dedup
-                            if checked_at in seen_timestamps:
-                                continue
-
-                            json_str = json_match.group(2)
-                            data = ast.literal_eval(json_str)
-                            
-                            if isinstance(data, dict) and 'dateQuota' in data:
-                                date_quota = data.get('dateQuota', {})
-                                available_list = []
-                                for date_key, status in date_quota.items():
-                                    if status != 'F':
-                                        available_list.append(date_key)
-                                
-                                history.append({
-                                    "checked_at": checked_at,
-                                    "available_num": len(available_list),
-                                    "available_list": available_list,
-                                    "eai_code": data.get('eaiCode', 'SUCCESS'),
-                                    "error": None
-                                })
-                                seen_timestamps.add(checked_at)
-                        except Exception:
-                            pass # Ignore parse errors for JSON lines
-                            
-        except Exception:
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# Worker processes used to parse unindexed log files (cold rebuilds); 1 disables
+HISTORY_PARSE_WORKERS = _env_int("HISTORY_PARSE_WORKERS", os.cpu_count() or 1)
+# Below this many unindexed files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 4
+
+
+# Regex patterns
+# 2026-02-12 11:15:35,123 INFO: Monitor cycle: 0 available dates: []
+_CYCLE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}).*Monitor cycle: (\d+) available dates: (\[.*\])")
+# 2026-02-12 11:15:35,123 ERROR: Monitoring error: some error
+_ERROR_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}).*Monitoring error: (.*)")
+# Legacy/Raw JSON log pattern: 2026-02-12 11:19:55,717 INFO: {'acceptTerms': None, ...}
+_JSON_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}).*INFO: (\{.*\})")
+
+_HISTORY_INDEX_LOCK = threading.Lock()
+_history_index = None
+
+
+def _parse_history_lines(lines, seen_timestamps):
+    """Parse log lines into compact history records.
+
+    Records are lists of [checked_at, available_num, available_list, eai_code, error].
+    Timestamps already in seen_timestamps are skipped (we log both summary and
+    raw JSON for the same cycle), and newly parsed ones are added to it.
+    """
+    records = []
+    for line in lines:
+        cycle_match = _CYCLE_PATTERN.search(line)
+        if cycle_match:
+            checked_at = cycle_match.group(1)
+
+            # Dedup: if we already have a record for this second, skip
+            if checked_at in seen_timestamps:
+                continue
+
+            available_num = int(cycle_match.group(2))
+            available_list_str = cycle_match.group(3)
+            # Parse list string "['20260213', '20260214']" -> list
+            available_list = [d.strip().strip("'").strip('"') for d in available_list_str.strip("[]").split(",") if d.strip()]
+
+            records.append([checked_at, available_num, available_list, "SUCCESS", None])
+            seen_timestamps.add(checked_at)
+            continue
+
+        error_match = _ERROR_PATTERN.search(line)
+        if error_match:
+            checked_at = error_match.group(1)
+
+            # Dedup
+            if checked_at in seen_timestamps:
+                continue
+
+            records.append([checked_at, None, [], None, error_match.group(2)])
+            seen_timestamps.add(checked_at)
             continue
-            
+
+        # Fallback: Try to parse raw JSON log (for older logs)
+        json_match = _JSON_PATTERN.search(line)
+        if json_match:
+            try:
+                checked_at = json_match.group(1)
+
+                # Dedup
+                if checked_at in seen_timestamps:
+                    continue
+
+                data = ast.literal_eval(json_match.group(2))
+
+                if isinstance(data, dict) and 'dateQuota' in data:
+                    date_quota = data.get('dateQuota', {})
+                    available_list = [date_key for date_key, status in date_quota.items() if status != 'F']
+                    records.append([
+                        checked_at,
+                        len(available_list),
+                        available_list,
+                        data.get('eaiCode', 'SUCCESS'),
+                        None,
+                    ])
+                    seen_timestamps.add(checked_at)
+            except Exception:
+                pass # Ignore parse errors for JSON lines
+
+    return records
+
+
+def _index_path(name):
+    """Sidecar index file for the log file called name."""
+    return os.path.join(HISTORY_INDEX_DIR, name + ".json")
+
+
+def _load_history_index():
+    """Load every per-file sidecar index from disk (once per process)."""
+    global _history_index
+    if _history_index is None:
+        index = {}
+        try:
+            names = os.listdir(HISTORY_INDEX_DIR)
+        except OSError:
+            names = []
+        for index_name in names:
+            if not index_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(HISTORY_INDEX_DIR, index_name), "r", encoding="utf-8") as handle:
+                    entry = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            if isinstance(entry, dict) and entry.get("version") == HISTORY_INDEX_VERSION:
+                index[index_name[:-len(".json")]] = entry
+        _history_index = index
+    return _history_index
+
+
+def _save_index_entry(name, entry):
+    """Atomically persist one file's sidecar index (or remove it if entry is None)."""
+    path = _index_path(name)
+    try:
+        if entry is None:
+            os.remove(path)
+            return
+        os.makedirs(HISTORY_INDEX_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(entry, handle, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass # The index is only a cache; a failed write means a re-parse later
+
+
+def _read_head(log_file, size=_HEAD_BYTES):
+    """Return the first bytes of a file as text, used as a file identity check."""
+    with open(log_file, "rb") as handle:
+        # latin-1 maps bytes 1:1 so a prefix of the file is a prefix of the text
+        return handle.read(size).decode("latin-1")
+
+
+def _iter_text_lines(binary_lines):
+    """Decode an iterable of raw lines."""
+    for raw in binary_lines:
+        yield raw.decode("utf-8", errors="replace")
+
+
+def _iter_mmap_lines(handle, start, end):
+    """Yield raw lines of an open file between byte offsets using mmap."""
+    with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        mapped.seek(start)
+        while mapped.tell() < end:
+            yield mapped.readline()
+
+
+def _parse_compressed_file(log_file):
+    """Stream-decompress and parse a whole rotated (gzip) log file."""
+    with gzip.open(log_file, "rb") as handle:
+        return _parse_history_lines(_iter_text_lines(handle), set())
+
+
+def _parse_plain_region(log_file, entry, size):
+    """Parse complete lines appended to a plain log file since entry["offset"].
+
+    Returns:
+        int: Number of bytes consumed (up to the last newline).
+    """
+    offset = entry["offset"]
+    seen_timestamps = {record[0] for record in entry["records"]}
+    with open(log_file, "rb") as handle:
+        if size - offset > MMAP_THRESHOLD:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = mapped.rfind(b"\n", offset, size) + 1
+            if end:
+                lines = _iter_text_lines(_iter_mmap_lines(handle, offset, end))
+                entry["records"].extend(_parse_history_lines(lines, seen_timestamps))
+            return max(end - offset, 0)
+        handle.seek(offset)
+        chunk = handle.read(size - offset)
+    # Only consume complete lines; a partially written last line is parsed next time
+    end = chunk.rfind(b"\n") + 1
+    if end:
+        lines = chunk[:end].decode("utf-8", errors="replace").split("\n")
+        entry["records"].extend(_parse_history_lines(lines, seen_timestamps))
+    return end
+
+
+def _update_file_entry(log_file, entry):
+    """Bring one file's index entry up to date, parsing only appended bytes.
+
+    Compressed (rotated) files never change, so they are parsed once in full.
+
+    Returns:
+        tuple: (entry, changed) where entry is None if the file can't be read.
+    """
+    try:
+        stat = os.stat(log_file)
+    except OSError:
+        return None, True
+
+    if entry is not None and entry["inode"] == stat.st_ino and stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+        return entry, False
+
+    try:
+        head = _read_head(log_file)
+    except OSError:
+        return None, True
+
+    compressed = log_file.endswith(COMPRESSED_SUFFIX)
+    # Rotated, truncated or replaced: parse the file again from the start
+    if (
+        entry is None
+        or compressed
+        or entry["inode"] != stat.st_ino
+        or stat.st_size < entry["offset"]
+        or not head.startswith(entry["head"])
+    ):
+        entry = {"version": HISTORY_INDEX_VERSION, "offset": 0, "head": "", "records": []}
+
+    try:
+        if compressed:
+            entry["records"] = _parse_compressed_file(log_file)
+            consumed = stat.st_size
+        else:
+            consumed = _parse_plain_region(log_file, entry, stat.st_size)
+    except (OSError, EOFError, gzip.BadGzipFile):
+        return None, True
+
+    entry.update({
+        "inode": stat.st_ino,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "offset": entry["offset"] + consumed,
+        "head": head[:entry["offset"] + consumed],
+    })
+    return entry, True
+
+
+def _parse_new_file(log_file):
+    """Process pool worker: build the index entry of a file that isn't indexed yet."""
+    return _update_file_entry(log_file, None)
+
+
+def _parse_new_files(log_files):
+    """Parse unindexed files, in a process pool when there are enough of them.
+
+    Workers are spawned rather than forked: the parent runs the poller,
+    dispatcher and server threads, whose locks a forked child would inherit in
+    whatever state they happened to be. Each file is parsed independently, so
+    results don't depend on how the work is split.
+
+    Returns:
+        dict: log file path -> (entry, changed), as returned by _update_file_entry.
+    """
+    workers = min(HISTORY_PARSE_WORKERS, len(log_files))
+    if workers > 1 and len(log_files) >= PARALLEL_MIN_FILES:
+        # Only cold rebuilds get here; keep multiprocessing out of startup
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        try:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                return dict(zip(log_files, pool.map(_parse_new_file, log_files)))
+        except (OSError, RuntimeError) as exc:
+            # No process support (sandbox, restricted container): fall back to serial
+            logger.warning(f"Parallel log parsing unavailable: {exc}")
+    return {log_file: _parse_new_file(log_file) for log_file in log_files}
+
+
+def _log_sort_key(path):
+    """Order log files chronologically.
+
+    A daily file's rotated copies (``name.log.YYYY-MM-DD[.gz]``) hold older
+    lines than the live ``name.log`` that was reopened after rotation.
+    """
+    name = os.path.basename(path)
+    base, _, rotated_suffix = name.partition(".log")
+    return (base, 0 if rotated_suffix else 1, rotated_suffix)
+
+
+def list_log_files():
+    """Return live and rotated (plain or compressed) log files in chronological order."""
+    # Match both old hourly logs and new daily logs, plus their rotated copies
+    log_files = glob.glob(os.path.join(LOGS_DIR, "bochk_monitor_*.log")) + glob.glob(
+        os.path.join(LOGS_DIR, "bochk_monitor_*.log.*")
+    )
+    log_files = [f for f in log_files if not f.endswith(".tmp")]
+    return sorted(log_files, key=_log_sort_key)
+
+
+@profiled("history")
+def read_history_from_logs():
+    """Read and parse all log files to reconstruct history.
+
+    Parsed records are kept in a sidecar index (HISTORY_INDEX_DIR) together with
+    each file's byte offset, so repeated calls only parse bytes appended since the
+    last call. Files that were rotated or truncated are re-parsed and files that
+    no longer exist are pruned from the index. Rotated files are gzip-compressed
+    and decompressed as a stream; large plain regions are read through mmap.
+    Files missing from the index (e.g. the first call after a deploy) are parsed
+    across HISTORY_PARSE_WORKERS processes without holding the index lock.
+    Records are merged in timestamp order and the first occurrence of a
+    timestamp wins.
+    """
+    log_files = list_log_files()
+    names = [os.path.basename(log_file) for log_file in log_files]
+
+    with _HISTORY_INDEX_LOCK:
+        unindexed = [f for f, name in zip(log_files, names) if name not in _load_history_index()]
+
+    # Files seen for the first time are parsed in full, in parallel on cold rebuilds
+    parsed = _parse_new_files(unindexed) if unindexed else {}
+
+    with _HISTORY_INDEX_LOCK:
+        files = _load_history_index()
+
+        for name in set(files) - set(names):
+            del files[name]
+            _save_index_entry(name, None)
+
+        for log_file, name in zip(log_files, names):
+            # Another caller may have indexed the file while we were parsing
+            if log_file in parsed and name not in files:
+                entry, entry_changed = parsed[log_file]
+                # Catch up on anything appended since the worker read the file
+                if entry is not None:
+                    entry, _ = _update_file_entry(log_file, entry)
+            else:
+                entry, entry_changed = _update_file_entry(log_file, files.get(name))
+            if entry is None:
+                files.pop(name, None)
+            else:
+                files[name] = entry
+            if entry_changed:
+                _save_index_entry(name, entry)
+
+        # Keep track of timestamps to prevent duplicates across files; on equal
+        # timestamps heapq.merge yields the earlier file first
+        seen_timestamps = set()
+        history = []
+        ordered = heapq.merge(
+            *(files[name]["records"] for name in names if name in files),
+            key=lambda record: record[0],
+        )
+        for checked_at, available_num, available_list, eai_code, error in ordered:
+            if checked_at in seen_timestamps:
+                continue
+            seen_timestamps.add(checked_at)
+            history.append({
+                "checked_at": checked_at,
+                "available_num": available_num,
+                "available_list": list(available_list),
+                "eai_code": eai_code,
+                "error": error,
+            })
+
     return history
 
 
-def _setup_logger():
-    """Configure logger with console and file handlers."""
+def _gzip_namer(default_name):
+    """Name rotated log files with a .gz extension."""
+    return default_name + COMPRESSED_SUFFIX
+
+
+def _gzip_rotator(source, dest):
+    """Compress a rotated log file into dest and remove the original."""
+    tmp_dest = dest + ".tmp"
+    with open(source, "rb") as src, gzip.open(tmp_dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    # Readers never see a partially written archive
+    os.replace(tmp_dest, dest)
+    os.remove(source)
+
+
+_FORMATTER = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
+
+
+def _file_handler():
+    """Create the daily rotating log file handler (and the logs directory)."""
     # Ensure logs directory exists
-    if not os.path.exists(LOGS_DIR):
-        os.makedirs(LOGS_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(LOG_FILENAME), exist_ok=True)
     
+    # File handler (Time-based rotation, daily)
+    # when='midnight' means rotate at midnight
+    # interval=1 means every 1 day
+    # backupCount=30 keeps last 30 days of logs
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        LOG_FILENAME, when='midnight', interval=1, backupCount=30, encoding="utf-8"
+    )
+    # Rotated files are gzip-compressed; read_history_from_logs reads them transparently
+    file_handler.namer = _gzip_namer
+    file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(_FORMATTER)
+    return file_handler
+
+
+class _DeferredHandler(logging.Handler):
+    """Builds the real handler on the first record.
+
+    Importing the package (e.g. gunicorn loading web.py, or a CLI worker that
+    never logs) then doesn't create directories or open the log file.
+    """
+
+    def __init__(self, factory):
+        super().__init__()
+        self._factory = factory
+        self._handler = None
+
+    def emit(self, record):
+        # handle() already holds self.lock
+        if self._handler is None:
+            self._handler = self._factory()
+        self._handler.handle(record)
+
+    def close(self):
+        if self._handler is not None:
+            self._handler.close()
+        super().close()
+
+
+def _setup_logger():
+    """Configure logger with console and (deferred) file handlers."""
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.INFO)
     
@@ -149,23 +485,13 @@ def _setup_logger():
     if logger.handlers:
         return logger
     
-    # Log format
-    formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
-    
     # Console handler
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(_FORMATTER)
     logger.addHandler(console_handler)
     
-    # File handler (Time-based rotation, daily)
-    # when='midnight' means rotate at midnight
-    # interval=1 means every 1 day
-    # backupCount=30 keeps last 30 days of logs
-    file_handler = logging.handlers.TimedRotatingFileHandler(
-        LOG_FILENAME, when='midnight', interval=1, backupCount=30, encoding="utf-8"
-    )
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    # The log file is opened when the first record is written
+    logger.addHandler(_DeferredHandler(_file_handler))
     
     return logger
 
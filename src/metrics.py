@@ -0,0 +1,296 @@
+"""
+Metrics module.
+Minimal Prometheus-compatible counters and histograms, cheap enough to leave
+on: an update is one lock acquisition plus a bisect. Each web worker also
+dumps its samples to data/metrics/ so /metrics can report totals across
+workers.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import get_data_dir
+
+
+# Per-process sample dumps, merged by /metrics
+METRICS_DIR = os.path.join(get_data_dir(), "metrics")
+
+# Latency buckets in seconds (upstream fetches, sends, page builds)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Buckets for in-process work measured in microseconds to milliseconds
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+
+class Registry:
+    """Holds metrics and a generation counter that changes on every update."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.generation = 0
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def export(self):
+        """Return all samples as a JSON-serializable dict."""
+        with self.lock:
+            return {metric.name: metric.export() for metric in self.metrics}
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self.series = {}
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.registry.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+            self.registry.generation += 1
+
+    def export(self):
+        """Samples (caller holds the registry lock)."""
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "series": [[list(key), value] for key, value in self.series.items()],
+        }
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.registry = registry
+        self.series = {}
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            series = self.series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, the last one is +Inf; then the sum
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+            self.registry.generation += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def export(self):
+        """Samples (caller holds the registry lock)."""
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "buckets": list(self.buckets),
+            "series": [[list(key), [list(counts), total]] for key, (counts, total) in self.series.items()],
+        }
+
+
+# Poller
+FETCH_SECONDS = Histogram(
+    "bochk_fetch_duration_seconds", "Latency of jsonAvailableDateAndTime requests."
+)
+PARSE_SECONDS = Histogram(
+    "bochk_parse_duration_seconds", "Time spent extracting available dates from a response.",
+    buckets=FAST_BUCKETS,
+)
+CYCLES = Counter("monitor_cycles_total", "Monitor poll cycles.")
+ERRORS = Counter("monitor_errors_total", "Failed poll cycles by exception type.", ("type",))
+EAI_CODES = Counter("bochk_eai_code_total", "Responses by eaiCode.", ("code",))
+DATE_FLIPS = Counter(
+    "quota_date_flips_total", "Dates that became available (opened) or full (closed).", ("direction",)
+)
+BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes.", ("upstream", "state")
+)
+
+# Notifications
+NOTIFY_SECONDS = Histogram(
+    "notification_send_duration_seconds", "Notification send latency by channel.", ("channel", "outcome")
+)
+ALERTS = Counter(
+    "notification_alerts_total",
+    "Opened dates by alert outcome (sent, batched into a digest, suppressed as a repeat, failed).",
+    ("outcome",),
+)
+
+# Web
+HISTORY_BUILD_SECONDS = Histogram(
+    "history_build_duration_seconds", "Time to build a history page.", ("route",)
+)
+
+
+def record_cycle(eai_code, change=None):
+    """Count a completed poll cycle.
+
+    Args:
+        eai_code (str): Response eaiCode.
+        change (QuotaChange): Detector result, for opened/closed dates.
+    """
+    CYCLES.inc()
+    EAI_CODES.inc(code=eai_code)
+    if change is not None:
+        if change.opened:
+            DATE_FLIPS.inc(len(change.opened), direction="opened")
+        if change.closed:
+            DATE_FLIPS.inc(len(change.closed), direction="closed")
+
+
+def record_error(exc):
+    """Count a failed poll cycle."""
+    CYCLES.inc()
+    ERRORS.inc(type=type(exc).__name__)
+
+
+def _dump_path(pid):
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+_dumped_generation = None
+
+
+def dump_samples():
+    """Write this process's samples for other workers' /metrics (only if changed)."""
+    global _dumped_generation
+    generation = REGISTRY.generation
+    if generation == _dumped_generation:
+        return
+    export = REGISTRY.export()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _dump_path(os.getpid())
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(export, handle, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    _dumped_generation = generation
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _other_exports():
+    """Load the dumps of other live worker processes (and drop dead ones)."""
+    exports = []
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        return exports
+    own_pid = os.getpid()
+    for name in names:
+        pid_text, _, ext = name.partition(".")
+        if ext != "json" or not pid_text.isdigit() or int(pid_text) == own_pid:
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        if not _pid_alive(int(pid_text)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                exports.append(json.load(handle))
+        except (OSError, ValueError):
+            continue
+    return exports
+
+
+def _merge(exports):
+    """Sum samples of the same metric/labels across exports."""
+    merged = {}
+    for export in exports:
+        for name, metric in export.items():
+            target = merged.setdefault(name, dict(metric, series={}))
+            for labels, value in metric["series"]:
+                key = tuple(labels)
+                if metric["type"] == "histogram":
+                    counts, total = target["series"].get(key, ([0] * len(value[0]), 0.0))
+                    target["series"][key] = ([a + b for a, b in zip(counts, value[0])], total + value[1])
+                else:
+                    target["series"][key] = target["series"].get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Render all workers' metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: Exposition text (version 0.0.4).
+    """
+    merged = _merge([REGISTRY.export()] + _other_exports())
+    lines = []
+    for name, metric in merged.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for key, value in sorted(metric["series"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + [float("inf")], counts):
+                cumulative += count
+                le = 'le="{}"'.format(_number(float(bound)))
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_number(float(total))}")
+            lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -2,13 +2,21 @@
 BOCHK appointment monitoring module.
 Core logic for checking appointment availability and sending notifications.
 """
-import requests
+import os
+import signal
+import threading
 import time
 
-from .config import load_config
-from .send_email import send_email
-from .logger import logger
-from .utils import sleep_display
+from .alerts import AlertCoalescer, AlertGroup
+from .breaker import CircuitBreaker, response_failure
+from .changes import QuotaChangeDetector
+from .config import config_version, env_number, load_config
+from .dates import compile_dates
+from .history_store import get_history_store
+from .logger import logger, custom_time_converter
+from .metrics import FETCH_SECONDS, PARSE_SECONDS, record_cycle, record_error
+from .scheduler import WAKE_CHECK, WAKE_CONFIG, WAKE_STOP, Wakeup
+from .subscriptions import SubscriptionIndex
 
 
 # BOCHK API endpoint
@@ -29,16 +37,94 @@ BOCHK_HEADERS = {
 }
 
 
-def get_jsonAvailableDateAndTime():
+# Connection settings for BOCHK requests (seconds / attempts)
+BOCHK_CONNECT_TIMEOUT = env_number("BOCHK_CONNECT_TIMEOUT", 5)
+BOCHK_READ_TIMEOUT = env_number("BOCHK_READ_TIMEOUT", 15)
+BOCHK_MAX_RETRIES = env_number("BOCHK_MAX_RETRIES", 2, int)
+BOCHK_POOL_SIZE = env_number("BOCHK_POOL_SIZE", 4, int)
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+# Tracks dateQuota between run_monitor() cycles (CLI mode)
+_DETECTOR = QuotaChangeDetector()
+# Emails newly opened dates only; created on first use so importing stays cheap
+_ALERTS = None
+
+
+def _build_session():
+    """
+    Build a keep-alive session for the BOCHK API.
+    
+    Connections (and their TLS sessions) are pooled and reused across polls.
+    Only failures to connect are retried here (the request never reached
+    BOCHK); throttling, 5xx answers and read timeouts are returned to the
+    caller, so the circuit breaker and its retry budget see every attempt.
+    """
+    # Imported here so web workers that never poll (followers) don't load requests
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    retry = Retry(
+        total=BOCHK_MAX_RETRIES,
+        connect=BOCHK_MAX_RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=0.5,
+        # The availability query is read-only, so retrying the POST is safe
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=BOCHK_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    # Host is derived from the request URL so mirrored endpoints work too
+    session.headers.update({k: v for k, v in BOCHK_HEADERS.items() if k != 'Host'})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Get the shared BOCHK session, creating it on first use.
+    
+    Returns:
+        requests.Session: Pooled keep-alive session
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = _build_session()
+        return _SESSION
+
+
+def get_jsonAvailableDateAndTime(url=None, params=None, timeout=None):
     """
     Fetch appointment availability data from BOCHK API.
     
+    Args:
+        url: Endpoint to query (default: BOCHK_API_URL)
+        params: Form fields to post (default: empty bean.appDate)
+        timeout: Read timeout in seconds (default: BOCHK_READ_TIMEOUT)
+    
     Returns:
         dict: API response containing dateQuota information
     """
-    payload = "bean.appDate="
-    response = requests.request("POST", BOCHK_API_URL, headers=BOCHK_HEADERS, data=payload)
-    return response.json()
+    payload = params if params is not None else "bean.appDate="
+    with FETCH_SECONDS.time():
+        response = get_session().post(
+            url or BOCHK_API_URL,
+            data=payload,
+            timeout=(BOCHK_CONNECT_TIMEOUT, timeout or BOCHK_READ_TIMEOUT),
+        )
+        response.raise_for_status()
+        return response.json()
 
 
 def parse(res_json, check_dates):
@@ -47,78 +133,193 @@ def parse(res_json, check_dates):
     
     Args:
         res_json: API response JSON
-        check_dates: List of dates to check (or ["all"] for all available dates)
+        check_dates: Date specs (see dates.py, e.g. ["all"] or ["20260213"])
+            or a compiled DateMatcher
         
     Returns:
         tuple: (number of available dates, list of available dates)
     """
     # logger.info(str(res_json))
-    dateQuota = res_json.get("dateQuota", {})
-    available_date_list = []
-    
-    # Support 'all' mode: monitor all available dates
-    if "all" in check_dates:
-        for key in dateQuota:
-            if dateQuota[key] != "F":
-                available_date_list.append(key)
-    else:
-        for key in dateQuota:
-            if dateQuota[key] != "F" and key in check_dates:
-                available_date_list.append(key)
+    started = time.perf_counter()
+    # Throttled answers carry "dateQuota": null
+    dateQuota = res_json.get("dateQuota") or {}
+    # Compiled once per spec list (cached), then one set lookup per date
+    matcher = compile_dates(check_dates)
+    available_date_list = matcher.filter(
+        key for key, status in dateQuota.items() if status != "F"
+    )
     
+    PARSE_SECONDS.observe(time.perf_counter() - started)
     return len(available_date_list), available_date_list
 
 
-def run_monitor(check_dates):
+def now_str():
+    """
+    Get the current time formatted like log timestamps (TIMEZONE_OFFSET applied).
+    
+    Returns:
+        str: Time as YYYY-MM-DD HH:MM:SS
+    """
+    return time.strftime("%Y-%m-%d %H:%M:%S", custom_time_converter(time.time()))
+
+
+def record_history(available_num, available_list, eai_code, error=None):
+    """
+    Append a monitoring cycle to the history store.
+    
+    Args:
+        available_num: Number of available dates (None on error)
+        available_list: List of available dates
+        eai_code: eaiCode from the API response (None on error)
+        error: Error text, if the cycle failed
+        
+    Returns:
+        str: Timestamp the cycle was recorded under
+    """
+    checked_at = now_str()
+    try:
+        get_history_store().record(checked_at, available_num, available_list, eai_code, error)
+    except Exception as e:
+        logger.warning(f"Failed to store history entry: {str(e)}")
+    return checked_at
+
+
+def run_monitor(check_dates, subscriptions=None):
     """
     Run a single monitoring cycle.
     
     Args:
         check_dates: List of dates to monitor
+        subscriptions: SubscriptionIndex notified about dates that opened
+        
+    Returns:
+        str: Failure reason if BOCHK answered with a non-SUCCESS eaiCode, else None
     """
     res_json = get_jsonAvailableDateAndTime()
     available_num, available_list = parse(res_json, check_dates)
     
     logger.info(f"Monitor cycle: {available_num} available dates: {available_list}")
     
-    if available_num > 0:
-        send_email(
-            '中银香港可预约',
-            f"中银香港可预约\n日期{available_list}"
-        )
-        logger.info(f"Notification sent for available dates: {available_list}")
+    # History always records every available date, matching the web monitor
+    change = _DETECTOR.update(res_json)
+    record_cycle(res_json.get("eaiCode"), change)
+    if change.changed and not change.keyframe:
+        logger.info(f"Quota delta: {change.changed}")
+    checked_at = record_history(
+        len(change.available_list), change.available_list, res_json.get("eaiCode")
+    )
+    event = change.event()
+    if event is not None:
+        try:
+            get_history_store().record_quota_event(checked_at, *event)
+        except Exception as e:
+            logger.warning(f"Failed to store quota event: {str(e)}")
+    
+    if change.quota:
+        notify(available_list, change.available_list, subscriptions)
+    
+    return response_failure(res_json)
+
+
+def notify(available_list, all_available, subscriptions=None):
+    """
+    Email the dates that newly opened (repeats and still-open dates are skipped).
+    
+    Args:
+        available_list: Open dates matching check_dates
+        all_available: All open dates, matched against the subscribers
+        subscriptions: SubscriptionIndex of per-subscriber dates and channels
+    """
+    global _ALERTS
+    if _ALERTS is None:
+        _ALERTS = AlertCoalescer()
+    groups = {}
+    if available_list:
+        groups["*"] = AlertGroup(available_list, None, '中银香港可预约', "中银香港可预约\n日期{dates}")
+    if subscriptions is not None:
+        for subscriber, dates in subscriptions.match(all_available).items():
+            receivers = subscriber.channels.get("email")
+            if receivers:
+                groups[subscriber.name] = AlertGroup(dates, receivers, '中银香港可预约', "中银香港可预约\n日期{dates}")
+    _ALERTS.update("cli", groups)
+
+
+def _install_signal_handlers(wakeup):
+    """Wire process signals to the wait between cycles.
+
+    SIGTERM/SIGINT stop after the current cycle, SIGUSR1 checks right away
+    and SIGHUP reloads the configuration and checks.
+    """
+    reasons = {
+        signal.SIGTERM: WAKE_STOP,
+        signal.SIGINT: WAKE_STOP,
+        signal.SIGUSR1: WAKE_CHECK,
+        signal.SIGHUP: WAKE_CONFIG,
+    }
+    for signum, reason in reasons.items():
+        try:
+            signal.signal(signum, lambda _signum, _frame, reason=reason: wakeup.wake(reason))
+        except ValueError:
+            # Not the main thread: signals stay with their default handlers
+            return
 
 
 def main():
     """Main entry point for standalone monitor (no web UI)."""
     logger.info("Starting BOCHK appointment monitor (no web UI mode)")
-    retry_count = 0
-    max_retries = 3
+    # Backs off on errors and throttling, and pauses polling when BOCHK keeps failing
+    breaker = CircuitBreaker()
+    # Waits between cycles; cut short by signals (see _install_signal_handlers)
+    wakeup = Wakeup()
+    _install_signal_handlers(wakeup)
+    loaded_version = None
+    check_dates = compile_dates([])
+    interval_seconds = 60
+    subscriptions = SubscriptionIndex()
     
     while True:
         try:
-            # Load configuration
-            config = load_config()
-            check_dates = config.get("monitor", {}).get("check_dates", [])
-            interval_seconds = config.get("monitor", {}).get("interval_seconds", 60)
+            # Reload configuration only when it changed
+            version = config_version()
+            if version != loaded_version:
+                config = load_config()
+                check_dates = compile_dates(config.get("monitor", {}).get("check_dates", []))
+                interval_seconds = config.get("monitor", {}).get("interval_seconds", 60)
+                subscriptions = SubscriptionIndex.from_config(config.get("subscribers"))
+                if loaded_version is not None:
+                    logger.info("Configuration changed, reloaded")
+                loaded_version = version
+            
+            if not check_dates.specs and not subscriptions:
+                logger.warning("No check_dates or subscribers configured, retrying in 60 seconds...")
+                if wakeup.wait(60) == WAKE_STOP:
+                    break
+                continue
             
-            if not check_dates:
-                logger.warning("No check_dates configured, retrying in 60 seconds...")
-                sleep_display(60)
+            wait = breaker.before_call()
+            if wait > 0:
+                logger.warning(f"Circuit breaker open, next attempt in {wait:.0f} seconds")
+                if wakeup.wait(wait) == WAKE_STOP:
+                    break
                 continue
             
-            run_monitor(check_dates)
-            retry_count = 0  # Reset retry counter on success
+            failure = run_monitor(check_dates, subscriptions)
+            if failure is None:
+                breaker.record_success()
+            else:
+                logger.warning(f"BOCHK answered with {failure}")
+                breaker.record_failure(failure)
             
         except Exception as e:
             logger.error(f"Error during monitoring cycle: {str(e)}")
-            retry_count += 1
-            
-            if retry_count >= max_retries:
-                logger.error(f"Max retries ({max_retries}) exceeded, restarting...")
-                retry_count = 0
+            record_error(e)
+            record_history(None, [], None, str(e))
+            breaker.record_failure(str(e))
         
-        sleep_display(interval_seconds)
+        if wakeup.wait(breaker.next_delay(interval_seconds)) == WAKE_STOP:
+            break
+
+    logger.info("Monitor stopped")
 
 
 if __name__ == "__main__":
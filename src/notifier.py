@@ -0,0 +1,323 @@
+"""
+Notifier module.
+Delivers a notification over several channels (SMTP, Resend, a webhook, a
+file/stdout sink) on a thread pool, each with its own timeout, so a hung
+channel is given up on instead of blocking delivery.
+
+Policies (NOTIFY_POLICY):
+    fallback   send on the channels in order; the next one starts only when
+               the previous fails or times out; done on the first success
+    all        send on every channel, wait for all of them
+    first      send on every channel at once, done on the first success
+    hedged     like fallback, but the next channel also starts when the
+               previous hasn't succeeded within NOTIFY_HEDGE_SECONDS
+
+"first" and "hedged" may deliver twice when two channels both succeed (for
+hedged if the first one is slower than the hedge delay, e.g. a slow SMTP
+server). Fallback is the default on purpose: it never duplicates, at the cost
+of waiting up to the channel timeout before a hung SMTP server is replaced.
+"""
+import abc
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .config import env_number
+from .logger import logger
+from .metrics import NOTIFY_SECONDS
+from .send_email import send_via_resend, send_via_smtp
+
+
+# Channels to use, in order (the order matters for the fallback and hedged policies)
+NOTIFY_CHANNELS = os.getenv("NOTIFY_CHANNELS", "smtp,resend")
+NOTIFY_POLICY = os.getenv("NOTIFY_POLICY", "fallback")
+# hedged: start the next channel if the current one hasn't succeeded by then
+NOTIFY_HEDGE_SECONDS = env_number("NOTIFY_HEDGE_SECONDS", 3)
+# Per-channel timeout; NOTIFY_<CHANNEL>_TIMEOUT (e.g. NOTIFY_WEBHOOK_TIMEOUT) overrides it
+NOTIFY_TIMEOUT_SECONDS = env_number("NOTIFY_TIMEOUT_SECONDS", 10)
+NOTIFY_WEBHOOK_URL = os.getenv("NOTIFY_WEBHOOK_URL", "")
+# File sink: JSON lines appended to this path ("-" = stdout)
+NOTIFY_FILE_PATH = os.getenv("NOTIFY_FILE_PATH", "-")
+
+POLICIES = ("fallback", "all", "first", "hedged")
+
+
+class Channel(abc.ABC):
+    """One way of delivering a notification; deliver() raises on failure.
+
+    Attributes:
+        name (str): Channel name, for logs and metrics.
+        timeout (float): Seconds the notifier waits for this channel.
+    """
+
+    name = "channel"
+
+    def __init__(self, timeout=NOTIFY_TIMEOUT_SECONDS):
+        self.timeout = float(timeout)
+
+    @abc.abstractmethod
+    def deliver(self, title, content, receivers):
+        """Send one notification; raises on failure."""
+
+
+class SmtpChannel(Channel):
+    """Email over the shared, kept-alive SMTP connection."""
+
+    name = "smtp"
+
+    def deliver(self, title, content, receivers):
+        send_via_smtp(title, content, receivers, timeout=self.timeout)
+
+
+class ResendChannel(Channel):
+    """Email through the Resend API."""
+
+    name = "resend"
+
+    def deliver(self, title, content, receivers):
+        send_via_resend(title, content, receivers)
+
+
+class WebhookChannel(Channel):
+    """JSON POST of ``{title, content, receivers}`` to a URL."""
+
+    name = "webhook"
+
+    def __init__(self, url=NOTIFY_WEBHOOK_URL, timeout=NOTIFY_TIMEOUT_SECONDS):
+        super().__init__(timeout)
+        self.url = url
+
+    def deliver(self, title, content, receivers):
+        if not self.url:
+            raise ValueError("NOTIFY_WEBHOOK_URL is not set")
+        # Imported on first use (see monitor._build_session)
+        import requests
+
+        response = requests.post(
+            self.url,
+            json={"title": title, "content": content, "receivers": receivers},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+
+class FileChannel(Channel):
+    """Appends notifications as JSON lines to a file or stdout (for testing)."""
+
+    name = "file"
+
+    def __init__(self, path=NOTIFY_FILE_PATH, timeout=NOTIFY_TIMEOUT_SECONDS):
+        super().__init__(timeout)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def deliver(self, title, content, receivers):
+        line = json.dumps(
+            {"at": time.time(), "title": title, "content": content, "receivers": receivers},
+            ensure_ascii=False,
+        )
+        with self.lock:
+            if self.path == "-":
+                print(line, file=sys.stdout, flush=True)
+                return
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+
+
+CHANNEL_TYPES = {
+    channel.name: channel for channel in (SmtpChannel, ResendChannel, WebhookChannel, FileChannel)
+}
+
+
+def channels_from_spec(spec):
+    """Build channels from a comma-separated list of names (NOTIFY_CHANNELS).
+
+    Unknown names are logged and skipped.
+    """
+    channels = []
+    for name in (spec or "").split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in CHANNEL_TYPES:
+            logger.warning(f"Ignoring unknown notification channel: {name!r}")
+            continue
+        timeout = env_number(f"NOTIFY_{name.upper()}_TIMEOUT", NOTIFY_TIMEOUT_SECONDS)
+        channels.append(CHANNEL_TYPES[name](timeout=timeout))
+    return channels
+
+
+class Notifier:
+    """Sends each notification over its channels according to a policy.
+
+    A channel that exceeds its timeout is given up on (its thread can't be
+    interrupted and finishes in the background); latency and outcome are
+    recorded when the delivery actually ends.
+
+    Attributes:
+        channels (list): Channels, in order.
+        policy (str): One of POLICIES.
+        hedge_seconds (float): Delay before the next channel is started (hedged only).
+    """
+
+    def __init__(self, channels, policy=NOTIFY_POLICY, hedge_seconds=NOTIFY_HEDGE_SECONDS):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown notification policy: {policy}")
+        self.channels = list(channels)
+        self.policy = policy
+        self.hedge_seconds = max(0.0, float(hedge_seconds))
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(4, 2 * len(self.channels)), thread_name_prefix="notify"
+        )
+        self._stats = {channel.name: _ChannelStats() for channel in self.channels}
+
+    def send(self, title, content, receivers=None):
+        """Deliver one notification; blocks until the policy is satisfied.
+
+        Args:
+            title (str): Email subject.
+            content (str): Body text.
+            receivers (list): Email recipients (default: the configured receivers).
+
+        Returns:
+            bool: True if at least one channel delivered it.
+        """
+        if not self.channels:
+            logger.error(f"No notification channels configured, dropped: {title}")
+            return False
+        started = time.monotonic()
+        waiting = list(self.channels)
+        running = {}
+        outcomes = []
+        delivered = False
+        next_start = None
+
+        def start_next():
+            channel = waiting.pop(0)
+            future = self.executor.submit(self._deliver, channel, title, content, receivers)
+            running[future] = (channel, time.monotonic() + channel.timeout)
+
+        in_order = self.policy in ("fallback", "hedged")
+        if in_order:
+            start_next()
+            if self.policy == "hedged":
+                next_start = time.monotonic() + self.hedge_seconds
+        else:
+            while waiting:
+                start_next()
+
+        while running or waiting:
+            deadlines = [deadline for _, deadline in running.values()]
+            if waiting and next_start is not None:
+                deadlines.append(next_start)
+            done, _ = wait(
+                running, timeout=max(0.0, min(deadlines) - time.monotonic()), return_when=FIRST_COMPLETED
+            )
+            now = time.monotonic()
+            for future in done:
+                channel, _ = running.pop(future)
+                ok, elapsed, error = future.result()
+                outcomes.append(f"{channel.name} {'ok' if ok else 'failed'} {elapsed:.2f}s")
+                if ok:
+                    delivered = True
+                elif error:
+                    logger.warning(f"Notification channel {channel.name} failed: {error}")
+            for future, (channel, deadline) in list(running.items()):
+                if now >= deadline:
+                    del running[future]
+                    outcomes.append(f"{channel.name} timed out after {channel.timeout:g}s")
+            if delivered and self.policy != "all":
+                break
+            if in_order and waiting and (not running or (next_start is not None and now >= next_start)):
+                # Previous channel failed or timed out (or, hedged, is slow): bring in the next one
+                start_next()
+                if next_start is not None:
+                    next_start = now + self.hedge_seconds
+
+        elapsed = time.monotonic() - started
+        summary = ", ".join(outcomes) or "no channel finished"
+        if delivered:
+            logger.info(f"Notification sent in {elapsed:.2f}s ({summary}): {title}")
+        else:
+            logger.error(f"Notification failed after {elapsed:.2f}s ({summary}): {title}")
+        return delivered
+
+    def stats(self):
+        """Per-channel delivery counts and latency.
+
+        Returns:
+            dict: Channel name -> sent, failed, last_seconds, avg_seconds.
+        """
+        with self.lock:
+            return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    def close(self):
+        """Stop the worker threads once running deliveries finish."""
+        self.executor.shutdown(wait=False)
+
+    def _deliver(self, channel, title, content, receivers):
+        """Worker: run one channel and record its latency.
+
+        Returns:
+            tuple: (ok, seconds, error text or None)
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            channel.deliver(title, content, receivers)
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+        elapsed = time.perf_counter() - started
+        NOTIFY_SECONDS.observe(elapsed, channel=channel.name, outcome="failure" if error else "success")
+        with self.lock:
+            self._stats[channel.name].record(elapsed, error is None)
+        return error is None, elapsed, error
+
+
+class _ChannelStats:
+    """Delivery counters of one channel (guarded by the notifier's lock)."""
+
+    __slots__ = ("sent", "failed", "last_seconds", "total_seconds")
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.last_seconds = None
+        self.total_seconds = 0.0
+
+    def record(self, seconds, ok):
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.last_seconds = seconds
+        self.total_seconds += seconds
+
+    def snapshot(self):
+        count = self.sent + self.failed
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "last_seconds": None if self.last_seconds is None else round(self.last_seconds, 3),
+            "avg_seconds": round(self.total_seconds / count, 3) if count else None,
+        }
+
+
+_NOTIFIER = None
+_NOTIFIER_LOCK = threading.Lock()
+
+
+def get_notifier():
+    """Return the process-wide notifier built from NOTIFY_* settings."""
+    global _NOTIFIER
+    with _NOTIFIER_LOCK:
+        if _NOTIFIER is None:
+            policy = NOTIFY_POLICY if NOTIFY_POLICY in POLICIES else "fallback"
+            if policy != NOTIFY_POLICY:
+                logger.warning(f"Unknown NOTIFY_POLICY {NOTIFY_POLICY!r}, using fallback")
+            _NOTIFIER = Notifier(channels_from_spec(NOTIFY_CHANNELS), policy)
+        return _NOTIFIER
@@ -0,0 +1,312 @@
+"""
+On-demand profiling module.
+Profiles the next N runs of a hot path (a poll cycle, a history rebuild or a
+route) with cProfile or a low-overhead stack sampler and keeps the output
+under data/profiles/ for download. Unarmed hooks cost one dict check.
+
+Targets:
+    cycle              one MonitorState poll cycle
+    history            read_history_from_logs()
+    route:<path>       one request, e.g. route:/history
+
+Arm them with PROFILE_TARGETS (e.g. ``cycle=3,route:/history=1``) at
+startup, or at runtime with POST /admin/profiles. Streaming routes (the SSE
+stream) never end, so they can't be profiled.
+"""
+import cProfile
+import functools
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+from .config import get_data_dir
+from .leader import SharedFile, write_json_atomic
+
+
+# Saved .pstats / .collapsed files
+PROFILE_DIR = os.path.join(get_data_dir(), "profiles")
+# Latest arm request, picked up by every web worker (see Profiler.sync)
+PROFILE_REQUEST_PATH = os.path.join(PROFILE_DIR, "request.json")
+# Saved profiles kept; older ones are deleted
+PROFILE_KEEP = 50
+# Stack sampling period for the "sample" mode (seconds)
+SAMPLE_INTERVAL = 0.005
+
+# cprofile: deterministic, exact call counts, slows the profiled code down;
+# sample: periodic stack snapshots in flamegraph "collapsed" format, cheap
+PROFILE_MODES = ("cprofile", "sample")
+# Routes whose response never ends; buffering them for a profile would hang
+STREAMING_ROUTES = ("/api/events",)
+_EXTENSIONS = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+_NULL = nullcontext()
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's stack every SAMPLE_INTERVAL seconds."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in sorted(self.counts.items()):
+                handle.write(f"{stack} {count}\n")
+
+
+class _ProfileRun:
+    """Context manager profiling one run of a target."""
+
+    def __init__(self, profiler, target, mode):
+        self.profiler = profiler
+        self.target = target
+        self.mode = mode
+        self.collector = None
+
+    def __enter__(self):
+        if self.mode == "sample":
+            self.collector = _StackSampler(threading.get_ident())
+            self.collector.start()
+            return self
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return self
+        self.collector = profile
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.collector is None:
+            return False
+        if self.mode == "sample":
+            self.collector.stop()
+            self.profiler.save(self.target, self.mode, self.collector.write)
+        else:
+            self.collector.disable()
+            self.profiler.save(self.target, self.mode, self.collector.dump_stats)
+        return False
+
+
+class Profiler:
+    """Registry of armed targets and saved profiles.
+
+    Attributes:
+        directory (str): Where profiles are written.
+        armed (dict): Target -> [remaining runs, mode].
+    """
+
+    def __init__(self, directory=PROFILE_DIR, request_path=PROFILE_REQUEST_PATH):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.armed = {}
+        self._counter = itertools.count(1)
+        self._requests = SharedFile(request_path)
+        self._request_path = request_path
+        self._request_id = None
+        # A request left over from a previous run doesn't apply
+        data, _ = self._requests.read()
+        if data is not None:
+            self._request_id = data.get("id")
+
+    def arm(self, target, runs=1, mode="cprofile"):
+        """Profile the next runs of target in this process.
+
+        Args:
+            target (str): ``cycle``, ``history`` or ``route:<path>``.
+            runs (int): Number of runs to profile (0 disarms).
+            mode (str): One of PROFILE_MODES.
+
+        Raises:
+            ValueError: If mode is unknown or target is a streaming route.
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if target.startswith("route:") and target[len("route:"):] in STREAMING_ROUTES:
+            raise ValueError(f"Streaming route can't be profiled: {target}")
+        runs = int(runs)
+        with self.lock:
+            if runs > 0:
+                self.armed[target] = [runs, mode]
+            else:
+                self.armed.pop(target, None)
+
+    def arm_from_spec(self, spec, mode="cprofile"):
+        """Arm targets from a ``target=runs,...`` string (PROFILE_TARGETS).
+
+        Invalid items are logged and skipped (this runs at import time).
+        """
+        for item in (spec or "").split(","):
+            target, _, runs = item.strip().partition("=")
+            if not target:
+                continue
+            try:
+                self.arm(target, int(runs or 1), mode)
+            except ValueError as exc:
+                # logger.py imports this module, so its logger isn't set up yet
+                logging.getLogger(__name__).warning(f"Ignoring PROFILE_TARGETS item {item.strip()!r}: {exc}")
+
+    def request(self, target, runs=1, mode="cprofile"):
+        """Arm target in this process and ask every other web worker to do the same."""
+        self.arm(target, runs, mode)
+        request_id = f"{os.getpid()}-{time.time_ns()}"
+        write_json_atomic(
+            self._request_path, {"id": request_id, "target": target, "runs": runs, "mode": mode}
+        )
+        self._request_id = request_id
+
+    def sync(self):
+        """Apply an arm request written by another worker (called periodically)."""
+        data, changed = self._requests.read()
+        if not changed or data is None or data.get("id") == self._request_id:
+            return
+        self._request_id = data.get("id")
+        try:
+            self.arm(data["target"], data.get("runs", 1), data.get("mode", "cprofile"))
+        except (KeyError, ValueError):
+            pass
+
+    def armed_targets(self):
+        """Return {target: {"runs", "mode"}} for the armed targets."""
+        with self.lock:
+            return {target: {"runs": runs, "mode": mode} for target, (runs, mode) in self.armed.items()}
+
+    def section(self, target):
+        """Context manager that profiles this run of target if it is armed.
+
+        Returns:
+            A shared no-op context manager when target isn't armed.
+        """
+        if target not in self.armed:
+            return _NULL
+        with self.lock:
+            slot = self.armed.get(target)
+            if slot is None:
+                return _NULL
+            slot[0] -= 1
+            if slot[0] <= 0:
+                del self.armed[target]
+            return _ProfileRun(self, target, slot[1])
+
+    def save(self, target, mode, write):
+        """Write one profile via write(path) and prune old ones."""
+        from .logger import logger
+
+        os.makedirs(self.directory, exist_ok=True)
+        slug = target.replace("route:", "route").replace("/", "_").strip("_") or "root"
+        name = "{}-{}-{}-{}{}".format(
+            slug, time.strftime("%Y%m%d-%H%M%S"), os.getpid(), next(self._counter), _EXTENSIONS[mode]
+        )
+        try:
+            write(os.path.join(self.directory, name))
+        except OSError as exc:
+            logger.warning(f"Failed to save profile for {target}: {exc}")
+            return
+        logger.info(f"Saved {mode} profile for {target}: {name}")
+        for old in self.files()[PROFILE_KEEP:]:
+            try:
+                os.remove(os.path.join(self.directory, old["name"]))
+            except OSError:
+                pass
+
+    def files(self):
+        """Saved profiles, newest first.
+
+        Returns:
+            list: Dicts with name, size and mtime.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        files = []
+        for name in names:
+            if not name.endswith(tuple(_EXTENSIONS.values())):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append({"name": name, "size": stat.st_size, "mtime": stat.st_mtime})
+        files.sort(key=lambda item: item["mtime"], reverse=True)
+        return files
+
+
+PROFILER = Profiler()
+PROFILER.arm_from_spec(os.getenv("PROFILE_TARGETS"), os.getenv("PROFILE_MODE", "cprofile"))
+
+profile = PROFILER.section
+
+
+def profiled(target):
+    """Decorator: profile calls of the function while target is armed."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.armed:
+                return func(*args, **kwargs)
+            with PROFILER.section(target):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class ProfilerMiddleware:
+    """WSGI middleware profiling requests to armed ``route:<path>`` targets.
+
+    A profiled response is buffered so that streamed bodies (templates
+    rendered while sending) are part of the profile, except for event
+    streams, which never end: for those the profile stops at the headers.
+    """
+
+    def __init__(self, wsgi_app, profiler=PROFILER):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        if not self.profiler.armed:
+            return self.wsgi_app(environ, start_response)
+        run = self.profiler.section("route:" + environ.get("PATH_INFO", "/"))
+        if run is _NULL:
+            return self.wsgi_app(environ, start_response)
+        with run:
+            content_types = []
+
+            def capture(status, headers, exc_info=None):
+                content_types.extend(value for name, value in headers if name.lower() == "content-type")
+                return start_response(status, headers, exc_info)
+
+            iterable = self.wsgi_app(environ, capture)
+            if any(value.startswith("text/event-stream") for value in content_types):
+                return iterable
+            try:
+                body = list(iterable)
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+        return body
@@ -0,0 +1,215 @@
+"""
+Adaptive polling scheduler.
+Learns from recorded history at which times of day dates tend to open up and
+spends a daily request budget there: short intervals inside those windows,
+long ones outside, with jitter. Pollers wait between cycles on a Wakeup, so
+stop, config changes and "check now" take effect immediately.
+"""
+import random
+import threading
+import time
+
+from .logger import custom_time_converter
+
+
+SCHEDULE_MODES = ("fixed", "adaptive")
+
+# Hard lower bound for any polling interval, adaptive or not
+MIN_INTERVAL_FLOOR = 5
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def count_openings(entries, bucket_seconds):
+    """Count, per time-of-day bucket, cycles where a date flipped to available.
+
+    Args:
+        entries (list): History entries in chronological order.
+        bucket_seconds (int): Bucket width in seconds.
+
+    Returns:
+        list: Opening counts, one per bucket.
+    """
+    counts = [0] * (SECONDS_PER_DAY // bucket_seconds)
+    previous = None
+    for entry in entries:
+        # Failed cycles tell us nothing about availability; keep the last known state
+        if entry["available_num"] is None:
+            continue
+        current = set(entry["available_list"])
+        if previous is not None and current - previous:
+            clock = entry["checked_at"][11:19]
+            hours, minutes, seconds = (int(part) for part in clock.split(":"))
+            counts[(hours * 3600 + minutes * 60 + seconds) // bucket_seconds] += 1
+        previous = current
+    return counts
+
+
+def allocate_intervals(weights, bucket_seconds, daily_budget, min_interval, max_interval):
+    """Split a daily request budget over buckets proportionally to weights.
+
+    Buckets whose share would poll faster than min_interval (or slower than
+    max_interval) are clamped and the remaining budget is re-spread over the
+    other buckets.
+
+    Returns:
+        list: Polling interval in seconds for each bucket.
+    """
+    intervals = [None] * len(weights)
+    free = set(range(len(weights)))
+    budget = float(daily_budget)
+    while free:
+        total_weight = sum(weights[b] for b in free)
+        if budget <= 0 or total_weight <= 0:
+            for b in free:
+                intervals[b] = max_interval
+            break
+        proposed = {
+            b: bucket_seconds * total_weight / (budget * weights[b]) if weights[b] else float("inf")
+            for b in free
+        }
+        out_of_range = [b for b, interval in proposed.items() if not min_interval <= interval <= max_interval]
+        if not out_of_range:
+            for b, interval in proposed.items():
+                intervals[b] = interval
+            break
+        for b in out_of_range:
+            intervals[b] = min(max(proposed[b], min_interval), max_interval)
+            budget -= bucket_seconds / intervals[b]
+            free.discard(b)
+    return intervals
+
+
+class AdaptiveScheduler:
+    """Chooses the next polling interval from learned opening windows.
+
+    Attributes:
+        min_interval (float): Shortest interval used inside hot windows.
+        max_interval (float): Longest interval used outside them.
+        daily_budget (int): Upstream requests to spend per day.
+        bucket_seconds (int): Width of a time-of-day window.
+        intervals (list): Current interval per window.
+    """
+
+    def __init__(
+        self,
+        load_entries,
+        min_interval=15,
+        max_interval=300,
+        daily_budget=1440,
+        bucket_minutes=30,
+        lookback_days=14,
+        jitter=0.1,
+        refresh_seconds=3600,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            load_entries (callable): Takes a ``since`` timestamp string and
+                returns chronological history entries.
+            min_interval (float): Shortest allowed interval (seconds).
+            max_interval (float): Longest allowed interval (seconds).
+            daily_budget (int): Upstream requests per day.
+            bucket_minutes (int): Width of the learned time-of-day windows.
+            lookback_days (int): How much history to learn from.
+            jitter (float): Relative random jitter applied to every interval.
+            refresh_seconds (float): How often to re-learn from history.
+        """
+        self.load_entries = load_entries
+        self.min_interval = max(MIN_INTERVAL_FLOOR, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.daily_budget = max(1, int(daily_budget))
+        self.bucket_seconds = int(bucket_minutes) * 60
+        self.lookback_days = lookback_days
+        self.jitter = jitter
+        self.refresh_seconds = refresh_seconds
+        self.intervals = None
+        self.openings = None
+        self._learned_at = None
+
+    def configure(self, min_interval=None, max_interval=None, daily_budget=None):
+        """Update limits; intervals are recomputed on the next call."""
+        if min_interval is not None:
+            self.min_interval = max(MIN_INTERVAL_FLOOR, float(min_interval))
+        if max_interval is not None:
+            self.max_interval = float(max_interval)
+        if daily_budget is not None:
+            self.daily_budget = max(1, int(daily_budget))
+        self.max_interval = max(self.min_interval, self.max_interval)
+        self._learned_at = None
+
+    def learn(self):
+        """Recompute per-window intervals from recent history."""
+        since = time.strftime(
+            "%Y-%m-%d %H:%M:%S",
+            custom_time_converter(time.time() - self.lookback_days * SECONDS_PER_DAY),
+        )
+        self.openings = count_openings(self.load_entries(since), self.bucket_seconds)
+        # Smoothing keeps some budget everywhere so new windows can still be found
+        weights = [count + 0.5 for count in self.openings]
+        self.intervals = allocate_intervals(
+            weights, self.bucket_seconds, self.daily_budget, self.min_interval, self.max_interval
+        )
+        self._learned_at = time.monotonic()
+
+    def next_interval(self, now=None):
+        """Return seconds to wait before the next poll.
+
+        Args:
+            now (float): Epoch seconds (default: current time).
+        """
+        if self._learned_at is None or time.monotonic() - self._learned_at > self.refresh_seconds:
+            self.learn()
+        clock = custom_time_converter(time.time() if now is None else now)
+        bucket = (clock.tm_hour * 3600 + clock.tm_min * 60 + clock.tm_sec) // self.bucket_seconds
+        interval = self.intervals[bucket]
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return min(max(interval, MIN_INTERVAL_FLOOR), self.max_interval * (1 + self.jitter))
+
+
+# Wakeup reasons
+WAKE_STOP = "stop"
+WAKE_CONFIG = "config"
+WAKE_CHECK = "check"
+_WAKE_PRIORITY = {WAKE_CONFIG: 0, WAKE_CHECK: 1, WAKE_STOP: 2}
+
+
+class Wakeup:
+    """Interruptible wait between poll cycles.
+
+    wait() sleeps on a condition variable until its timeout or until wake()
+    is called from another thread (or a signal handler). Wakes that arrive
+    while nobody is waiting are kept, so none is lost between two waits; if
+    several arrive, the strongest reason wins (stop > check > config).
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._reason = None
+
+    def wake(self, reason):
+        """Interrupt the current (or next) wait.
+
+        Args:
+            reason (str): WAKE_STOP, WAKE_CONFIG or WAKE_CHECK.
+        """
+        with self._condition:
+            if self._reason is None or _WAKE_PRIORITY[reason] > _WAKE_PRIORITY[self._reason]:
+                self._reason = reason
+            self._condition.notify_all()
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds.
+
+        Returns:
+            str: Wake reason, or None if the timeout expired.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._reason is not None, max(0.0, timeout))
+            reason, self._reason = self._reason, None
+            return reason
+
+    def clear(self):
+        """Drop a pending wake."""
+        with self._condition:
+            self._reason = None
@@ -1,10 +1,13 @@
 """
 Email sending module with support for multiple email providers.
 Supports: QQ, Gmail, Outlook, Office365
+SMTP and Resend are the email channels of notifier.py, which send_email()
+goes through.
 """
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
-import resend
 import os
 
 from .config import load_config
@@ -20,25 +23,33 @@ EMAIL_PROVIDERS = {
 }
 
 
-def send_email(title, content):
+# Reused SMTP connections are checked with NOOP after this many idle seconds
+SMTP_IDLE_CHECK_SECONDS = 30
+# Socket timeout for SMTP connections (seconds)
+SMTP_TIMEOUT_SECONDS = 10
+
+
+def _email_settings(config=None, receivers=None):
     """
-    Send email notification.
+    Resolve email settings from config.
     
     Args:
-        title: Email subject
-        content: Email body text
+        config: Configuration dict (default: load_config())
+        receivers: Recipients overriding the configured ones (e.g. a subscriber's)
         
     Returns:
-        bool: True if sent successfully, False otherwise
+        dict: Settings with mail_host, mail_port, mail_user, mail_pass, sender
+              and receivers, or None if they are incomplete
     """
-    config = load_config()
+    if config is None:
+        config = load_config()
     email_config = config.get("email", {})
     mail_host = email_config.get("mail_host", "smtp.qq.com")
     mail_port = email_config.get("mail_port", None)
     mail_user = email_config.get("mail_user", "")
     mail_pass = email_config.get("mail_pass", "")
     sender = email_config.get("sender", "")
-    receivers = email_config.get("receivers", [])
+    receivers = receivers or email_config.get("receivers", [])
 
     # Handle receivers as string
     if isinstance(receivers, str):
@@ -46,8 +57,7 @@ def send_email(title, content):
 
     # Validate configuration
     if not (mail_user and mail_pass and sender and receivers):
-        print("Email settings are incomplete. Please update config.json.")
-        return False
+        return None
 
     # Auto-detect port if not specified
     if mail_port is None:
@@ -61,61 +71,207 @@ def send_email(title, content):
             # Unknown provider, default to SSL
             mail_port = 465
 
-    # Build email message
-    message = MIMEText(content, "plain", "utf-8")
-    message["From"] = sender
-    message["To"] = ",".join(receivers)
-    message["Subject"] = title
+    return {
+        "mail_host": mail_host,
+        "mail_port": mail_port,
+        "mail_user": mail_user,
+        "mail_pass": mail_pass,
+        "sender": sender,
+        "receivers": receivers,
+    }
+
+
+class SmtpConnectionCache:
+    """
+    Keeps one authenticated SMTP connection open across sends.
     
-    try:
+    The connection is reopened when the settings change, when a NOOP check on
+    an idle connection fails, or when the server has dropped it mid-send.
+    """
+
+    def __init__(self, idle_check_seconds=SMTP_IDLE_CHECK_SECONDS):
+        self.idle_check_seconds = idle_check_seconds
+        self.lock = threading.Lock()
+        self.smtp = None
+        self.key = None
+        self.last_used = 0.0
+
+    def send(self, settings, message, timeout=SMTP_TIMEOUT_SECONDS):
+        """
+        Send a message, reusing the cached connection when possible.
+        
+        Args:
+            settings: Settings dict from _email_settings()
+            message: MIMEText message
+            timeout: Socket timeout in seconds
+        """
+        with self.lock:
+            for attempt in range(2):
+                smtp = self._connection(settings, timeout)
+                try:
+                    smtp.sendmail(settings["sender"], settings["receivers"], message.as_string())
+                    self.last_used = time.monotonic()
+                    return
+                # SMTP exceptions subclass OSError, so the specific ones come first
+                except smtplib.SMTPResponseException as e:
+                    # 421: service closing the channel, safe to retry on a new connection;
+                    # anything else (bad recipient, auth, policy) is final
+                    if attempt or e.smtp_code != 421:
+                        raise
+                    self._close()
+                except smtplib.SMTPServerDisconnected:
+                    # Expired/dropped connection: reconnect once and retry
+                    self._close()
+                    if attempt:
+                        raise
+                except smtplib.SMTPException:
+                    # e.g. every recipient refused: retrying won't help
+                    raise
+                except OSError:
+                    # Socket error mid-send: the connection can't be trusted anymore
+                    self._close()
+                    if attempt:
+                        raise
+
+    def close(self):
+        """Close the cached connection."""
+        with self.lock:
+            self._close()
+
+    def _connection(self, settings, timeout):
+        """Return an open, authenticated connection for settings."""
+        key = (settings["mail_host"], settings["mail_port"], settings["mail_user"], settings["mail_pass"])
+        if self.smtp is not None and self.key == key:
+            if self.smtp.sock is not None:
+                self.smtp.sock.settimeout(timeout)
+            if time.monotonic() - self.last_used < self.idle_check_seconds:
+                return self.smtp
+            try:
+                if self.smtp.noop()[0] == 250:
+                    return self.smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._close()
+
+        mail_host = settings["mail_host"]
+        mail_port = settings["mail_port"]
         # Choose connection method based on port
         if mail_port == 587:
             # TLS method (Outlook recommended)
-            smtp_obj = smtplib.SMTP(mail_host, mail_port, timeout=10)
+            smtp_obj = smtplib.SMTP(mail_host, mail_port, timeout=timeout)
             smtp_obj.starttls()  # Enable TLS encryption
         else:
             # SSL method (QQ, Gmail, etc.)
-            smtp_obj = smtplib.SMTP_SSL(mail_host, mail_port, timeout=10)
+            smtp_obj = smtplib.SMTP_SSL(mail_host, mail_port, timeout=timeout)
+        try:
+            smtp_obj.login(settings["mail_user"], settings["mail_pass"])
+        except Exception:
+            smtp_obj.close()
+            raise
+        self.smtp = smtp_obj
+        self.key = key
+        self.last_used = time.monotonic()
+        return smtp_obj
+
+    def _close(self):
+        """Quit and forget the cached connection (lock held)."""
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self.smtp.close()
+        self.smtp = None
+        self.key = None
+
+
+# Shared by every sender in the process (web monitor, CLI, dispatcher)
+smtp_connections = SmtpConnectionCache()
+
+
+def send_email(title, content, receivers=None):
+    """
+    Send a notification through the configured channels (see notifier.py).
+    
+    Args:
+        title: Email subject
+        content: Email body text
+        receivers: Recipients (default: the configured receivers)
         
-        smtp_obj.login(mail_user, mail_pass)
-        smtp_obj.sendmail(sender, receivers, message.as_string())
-        smtp_obj.quit()
-        print("Email sent successfully!")
-        return True
-    except Exception as e:
-        print(f"SMTP Error: {e}")
-        print("Attempting to send via Resend fallback...")
-        return send_via_resend(title, content, receivers)
-
-
-def send_via_resend(title, content, receivers):
+    Returns:
+        bool: True if sent successfully, False otherwise
     """
-    Send email using Resend API as a fallback.
+    from .notifier import get_notifier
+    
+    return get_notifier().send(title, content, receivers)
+
+
+def _message(settings, title, content):
+    """Build the MIMEText message for settings' sender and receivers."""
+    message = MIMEText(content, "plain", "utf-8")
+    message["From"] = settings["sender"]
+    message["To"] = ",".join(settings["receivers"])
+    message["Subject"] = title
+    return message
+
+
+def send_via_smtp(title, content, receivers=None, timeout=SMTP_TIMEOUT_SECONDS):
     """
-    try:
-        api_key = os.getenv("RESEND_API_KEY")
-        if not api_key:
-            print("RESEND_API_KEY not found in environment variables.")
-            return False
-            
-        resend.api_key = api_key
-        
-        # Format content as HTML since Resend prefers it, or supports it
-        html_content = f"<p>{content}</p>"
+    Send email over the shared SMTP connection.
+    
+    Args:
+        title: Email subject
+        content: Email body text
+        receivers: Recipients (default: the configured receivers)
+        timeout: Socket timeout in seconds
         
-        params = {
-            "from": "onboarding@resend.dev",
-            "to": receivers,
-            "subject": title,
-            "html": html_content
-        }
+    Raises:
+        ValueError: If the email settings are incomplete.
+        smtplib.SMTPException / OSError: If sending failed.
+    """
+    settings = _email_settings(receivers=receivers)
+    if settings is None:
+        raise ValueError("Email settings are incomplete. Please update config.json.")
+    smtp_connections.send(settings, _message(settings, title, content), timeout)
+
+
+def send_via_resend(title, content, receivers=None):
+    """
+    Send email using the Resend API.
+    
+    Args:
+        title: Email subject
+        content: Email body text
+        receivers: Recipients (default: the configured receivers)
         
-        r = resend.Emails.send(params)
-        print(f"Resend email sent: {r}")
-        return True
-    except Exception as e:
-        print(f"Resend Error: {e}")
-        return False
+    Raises:
+        ValueError: If RESEND_API_KEY or the receivers are missing.
+        Exception: Whatever the Resend client raises on failure.
+    """
+    api_key = os.getenv("RESEND_API_KEY")
+    if not api_key:
+        raise ValueError("RESEND_API_KEY not found in environment variables.")
+    receivers = receivers or load_config().get("email", {}).get("receivers", [])
+    if isinstance(receivers, str):
+        receivers = [item.strip() for item in receivers.split(",") if item.strip()]
+    if not receivers:
+        raise ValueError("No receivers configured.")
+    
+    # Imported on first use: it pulls in requests, and most sends never need it
+    import resend
+    
+    resend.api_key = api_key
+    
+    # Format content as HTML since Resend prefers it, or supports it
+    html_content = f"<p>{content}</p>"
+    
+    params = {
+        "from": "onboarding@resend.dev",
+        "to": receivers,
+        "subject": title,
+        "html": html_content
+    }
+    
+    return resend.Emails.send(params)
 
 
 if __name__ == "__main__":
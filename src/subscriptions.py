@@ -0,0 +1,169 @@
+"""
+Subscriptions module.
+Many subscribers, each with their own dates and notification channels, are
+served from one upstream fetch per cycle: a date -> subscribers index maps the
+open dates to the people watching them, and the alert coalescer emails only the
+ones that newly opened.
+"""
+from .dates import compile_dates, today_str
+from .logger import logger
+
+# Channels subscribers can be notified on. Webhook and file delivery are
+# process-wide (NOTIFY_CHANNELS), not per-subscriber targets.
+SUPPORTED_CHANNELS = ("email",)
+
+
+class Subscriber:
+    """One person (or team channel) watching a set of dates.
+
+    Attributes:
+        name (str): Unique subscriber name.
+        dates (DateMatcher): Watched dates, compiled from date specs
+            (see dates.py: literal dates, ranges, weekdays, next:N, !exclusions).
+        channels (dict): Channel name (one of SUPPORTED_CHANNELS) -> targets,
+            e.g. ``{"email": ["alice@example.com"]}``.
+    """
+
+    __slots__ = ("name", "dates", "channels")
+
+    def __init__(self, name, dates, channels):
+        self.name = name
+        self.dates = dates
+        self.channels = channels
+
+    @classmethod
+    def from_config(cls, item):
+        """Build a subscriber from a ``subscribers`` config entry.
+
+        Unsupported channel names are logged and dropped, so a typo or an
+        unsupported channel doesn't go unnoticed while nothing is delivered.
+
+        Args:
+            item (dict): Entry with ``name``, ``dates`` (date specs or
+                ``"all"``) and ``channels``.
+
+        Raises:
+            ValueError: If the entry is malformed.
+        """
+        if not isinstance(item, dict):
+            raise ValueError(f"expected an object, got {type(item).__name__}")
+        name = item.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("missing or empty 'name'")
+        specs = item.get("dates") or []
+        if not isinstance(specs, (str, list)):
+            raise ValueError(f"{name}: 'dates' must be a string or a list")
+        channels = item.get("channels") or {}
+        if not isinstance(channels, dict):
+            raise ValueError(f"{name}: 'channels' must be an object")
+        channels = {channel: _as_list(name, channel, targets) for channel, targets in channels.items()}
+        for channel in [channel for channel in channels if channel not in SUPPORTED_CHANNELS]:
+            logger.warning(
+                f"Subscriber {name}: ignoring unsupported channel {channel!r} "
+                f"(supported: {', '.join(SUPPORTED_CHANNELS)})"
+            )
+            del channels[channel]
+        if not any(channels.values()):
+            logger.warning(f"Subscriber {name}: no notification targets; it will never be notified")
+        return cls(name.strip(), compile_dates(specs), channels)
+
+
+def _as_list(name, channel, targets):
+    """Accept a comma-separated string or a list of channel targets."""
+    if isinstance(targets, str):
+        return [target.strip() for target in targets.split(",") if target.strip()]
+    if not isinstance(targets, list):
+        raise ValueError(f"{name}: targets of channel {channel!r} must be a string or a list")
+    return [str(target) for target in targets]
+
+
+class SubscriptionIndex:
+    """Inverted index from date to the subscribers watching it.
+
+    match() only touches the dates passed in (the dates open this cycle,
+    looked up only on cycles where something changed), so its cost doesn't
+    grow with the number of subscribers or the size of their date lists. The index covers each
+    matcher's compile window and is rebuilt when the day rolls over.
+    """
+
+    def __init__(self, subscribers=()):
+        self.subscribers = list(subscribers)
+        self._build(today_str())
+
+    def _build(self, today):
+        """(Re)build the index for today."""
+        self.today = today
+        self.by_date = {}
+        self.everything = []
+        self.inexact = []
+        for subscriber in self.subscribers:
+            subscriber.dates = compile_dates(subscriber.dates)
+            if subscriber.dates.everything:
+                self.everything.append(subscriber)
+                continue
+            if not subscriber.dates.exact:
+                self.inexact.append(subscriber)
+            for date in subscriber.dates.dates:
+                self.by_date.setdefault(date, []).append(subscriber)
+        if self.subscribers:
+            self.window_start = min(s.dates.window_start for s in self.subscribers)
+            self.window_end = max(s.dates.window_end for s in self.subscribers)
+        else:
+            self.window_start = self.window_end = today
+
+    @classmethod
+    def from_config(cls, items):
+        """Build the index from the ``subscribers`` config list.
+
+        Malformed entries and repeated names are logged and skipped, so one
+        bad entry doesn't take the monitor down.
+        """
+        if items and not isinstance(items, list):
+            logger.warning(f"Ignoring 'subscribers': expected a list, got {type(items).__name__}")
+            items = []
+        subscribers = {}
+        for position, item in enumerate(items or []):
+            try:
+                subscriber = Subscriber.from_config(item)
+            except ValueError as exc:
+                logger.warning(f"Ignoring subscriber #{position + 1}: {exc}")
+                continue
+            if subscriber.name in subscribers:
+                logger.warning(f"Ignoring subscriber #{position + 1}: duplicate name {subscriber.name!r}")
+                continue
+            subscribers[subscriber.name] = subscriber
+        return cls(subscribers.values())
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def match(self, dates):
+        """Group dates by the subscribers watching them.
+
+        Callers pass every open date (QuotaChange.available_list), not only
+        the newly opened ones: the alert coalescer needs each group's full
+        open set to tell still-open dates from closed and reopened ones.
+
+        Args:
+            dates (iterable): Dates to look up.
+
+        Returns:
+            dict: Subscriber -> list of their dates, in input order.
+        """
+        today = today_str()
+        if today != self.today:
+            self._build(today)
+        matches = {}
+        for date in dates:
+            if self.window_start <= date <= self.window_end:
+                watchers = self.by_date.get(date, ())
+            else:
+                # Outside the indexed window (rare): the index is complete for
+                # exact matchers, the others have to be asked
+                watchers = self.by_date.get(date, [])
+                watchers = watchers + [s for s in self.inexact if date in s.dates]
+            for subscriber in watchers:
+                matches.setdefault(subscriber, []).append(date)
+            for subscriber in self.everything:
+                matches.setdefault(subscriber, []).append(date)
+        return matches
@@ -2,7 +2,6 @@
 Utility functions.
 """
 import time
-from tqdm import tqdm
 
 
 def sleep_display(seconds):
@@ -12,6 +11,8 @@ def sleep_display(seconds):
     Args:
         seconds: Number of seconds to sleep
     """
+    from tqdm import tqdm
+    
     for _ in tqdm(range(0, seconds)):
         time.sleep(1)
 
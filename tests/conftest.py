@@ -0,0 +1,39 @@
+"""Shared test setup."""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_DATA_DIR = None
+
+
+def pytest_configure(config):
+    """Point DATA_DIR at a scratch directory before any src module is imported.
+
+    Module-level paths (logs, poller.lock, metrics, alert state) are resolved
+    at import time, so a per-test tmp_path would come too late.
+    """
+    global _DATA_DIR
+    _DATA_DIR = tempfile.mkdtemp(prefix="bochk_test_data_")
+    os.environ["DATA_DIR"] = _DATA_DIR
+
+
+def pytest_unconfigure(config):
+    if _DATA_DIR is not None:
+        shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+
+class FakeClock:
+    """Manually advanced clock for code that takes a ``clock`` callable."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
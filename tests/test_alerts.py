@@ -0,0 +1,111 @@
+"""Tests for the alert coalescer (src/alerts.py)."""
+import pytest
+
+from src.alerts import AlertCoalescer, AlertGroup
+
+
+class FakeSend:
+    """Stands in for enqueue_email and reports the outcome right away."""
+
+    def __init__(self):
+        self.calls = []
+        self.queued = True
+        self.delivered = True
+
+    def __call__(self, title, content, receivers=None, on_done=None):
+        self.calls.append((title, content, receivers))
+        if self.queued and on_done is not None:
+            on_done(self.delivered)
+        return self.queued
+
+
+@pytest.fixture
+def send():
+    return FakeSend()
+
+
+@pytest.fixture
+def make_coalescer(tmp_path, send, clock):
+    def make(**kwargs):
+        kwargs.setdefault("dedup_seconds", 3600)
+        kwargs.setdefault("digest_seconds", 0)
+        return AlertCoalescer(path=str(tmp_path / "alert_state.json"), send=send, clock=clock, **kwargs)
+    return make
+
+
+def group(*dates):
+    return {"*": AlertGroup(list(dates), None, "title", "open: {dates}")}
+
+
+def test_new_dates_are_sent_once_while_open(make_coalescer, send):
+    alerts = make_coalescer()
+
+    assert alerts.update("poller", group("20260301")) == {"*": ["20260301"]}
+    assert alerts.update("poller", group("20260301")) == {}
+    assert alerts.update("poller", group("20260301", "20260302")) == {"*": ["20260302"]}
+    assert [content for _, content, _ in send.calls] == ["open: 20260301", "open: 20260302"]
+
+
+def test_failed_send_is_retried_on_next_update(make_coalescer, send):
+    send.delivered = False
+    alerts = make_coalescer()
+
+    alerts.update("poller", group("20260301"))
+    assert alerts.retry_pending("poller")
+    assert not alerts.retry_pending("target:other")
+
+    send.delivered = True
+    assert alerts.update("poller", group("20260301")) == {"*": ["20260301"]}
+    assert not alerts.retry_pending("poller")
+    assert len(send.calls) == 2
+
+    alerts.update("poller", group("20260301"))
+    assert len(send.calls) == 2
+
+
+def test_dropped_send_is_retried_on_next_update(make_coalescer, send):
+    send.queued = False
+    alerts = make_coalescer()
+
+    alerts.update("poller", group("20260301"))
+    assert alerts.retry_pending("poller")
+
+    send.queued = True
+    assert alerts.update("poller", group("20260301")) == {"*": ["20260301"]}
+
+
+def test_reopening_within_dedup_window_is_suppressed(make_coalescer, send, clock):
+    alerts = make_coalescer(dedup_seconds=600)
+
+    alerts.update("poller", group("20260301"))
+    clock.now += 60
+    alerts.update("poller", {})
+    clock.now += 60
+    assert alerts.update("poller", group("20260301")) == {}
+
+    alerts.update("poller", {})
+    clock.now += 600
+    assert alerts.update("poller", group("20260301")) == {"*": ["20260301"]}
+    assert len(send.calls) == 2
+
+
+def test_state_survives_restart(make_coalescer, send):
+    make_coalescer().update("poller", group("20260301"))
+
+    restarted = make_coalescer()
+    assert restarted.update("poller", group("20260301")) == {}
+    assert len(send.calls) == 1
+
+
+def test_digest_sends_dates_in_one_email(make_coalescer, send, clock):
+    alerts = make_coalescer(digest_seconds=3600)
+
+    alerts.update("poller", group("20260301"))
+    alerts.update("poller", group("20260301", "20260302"))
+    assert send.calls == []
+    assert alerts.stats()["pending"] == 2
+
+    clock.now += 3600
+    alerts.flush()
+    assert [content for _, content, _ in send.calls] == ["open: 20260301, 20260302"]
+    assert alerts.stats()["pending"] == 0
@@ -0,0 +1,110 @@
+"""Tests for the asyncio polling engine (src/async_engine.py) against the fake BOCHK server."""
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_bochk import FakeBochkServer
+from src.async_engine import AsyncPollEngine, PollTarget
+from src.monitor import BOCHK_POOL_SIZE
+
+
+@pytest.fixture
+def server():
+    with FakeBochkServer(pattern="open", days=14) as fake:
+        yield fake
+
+
+def collect(engine_targets, count, **kwargs):
+    """Run an engine until count results arrived; return them by target name."""
+    results = {}
+    done = threading.Event()
+
+    def on_result(target, result):
+        results.setdefault(target.name, []).append(result)
+        if sum(len(items) for items in results.values()) >= count:
+            done.set()
+
+    engine = AsyncPollEngine(engine_targets, on_result=on_result, **kwargs)
+    engine.start()
+    try:
+        assert done.wait(10)
+    finally:
+        engine.stop()
+    return results, engine
+
+
+def test_polls_every_target(server):
+    targets = [PollTarget(name, url=server.url, interval_seconds=60, timeout=5) for name in ("a", "b", "c")]
+    results, engine = collect(targets, 3)
+
+    assert set(results) == {"a", "b", "c"}
+    for (result,) in results.values():
+        assert result["error"] is None
+        assert result["eai_code"] == "SUCCESS"
+        assert result["available_num"] == 2  # Every 7th of 14 dates
+        assert result["breaker"]["state"] == "closed"
+    assert set(engine.snapshot()) == {"a", "b", "c"}
+
+
+def test_slow_target_times_out(server):
+    server.latency = 1.0
+    results, _ = collect([PollTarget("slow", url=server.url, timeout=0.2)], 1)
+
+    (result,) = results["slow"]
+    # Either the engine's deadline or the session's read timeout fires first
+    assert "timed out" in result["error"]
+    assert result["available_list"] == []
+
+
+def test_server_errors_and_throttling_are_failures(server):
+    server.throttle_rate = 1.0
+    results, _ = collect([PollTarget("busy", url=server.url, timeout=5)], 1)
+
+    (result,) = results["busy"]
+    assert result["eai_code"] == "SYSTEM_BUSY"
+    assert result["breaker"]["failures"] == 1
+
+
+def test_concurrency_is_bounded_by_the_connection_pool(server):
+    server.latency = 0.1
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def fetch(url, params, timeout):
+        with lock:
+            in_flight.append(url)
+            peak.append(len(in_flight))
+        try:
+            time.sleep(0.05)
+            return {"eaiCode": "SUCCESS", "dateQuota": {}}
+        finally:
+            with lock:
+                in_flight.pop()
+
+    targets = [PollTarget(f"t{index}", url=server.url, timeout=5) for index in range(8)]
+    results, engine = collect(targets, 8, fetch=fetch)
+
+    assert len(results) == 8
+    assert engine.workers == max(1, BOCHK_POOL_SIZE - 1)
+    assert max(peak) <= engine.workers
+
+
+def test_results_are_handled_off_the_event_loop(server):
+    threads = []
+    done = threading.Event()
+
+    def on_result(target, result):
+        threads.append(threading.current_thread())
+        done.set()
+
+    engine = AsyncPollEngine([PollTarget("a", url=server.url, timeout=5)], on_result=on_result)
+    engine.start()
+    loop_thread = engine.thread
+    try:
+        assert done.wait(10)
+    finally:
+        engine.stop()
+    assert threads[0] is not loop_thread
+    assert threads[0].name.startswith("poll-result")
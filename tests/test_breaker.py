@@ -0,0 +1,71 @@
+"""Tests for the circuit breaker and backoff (src/breaker.py)."""
+import pytest
+
+from src.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryBudget, backoff_delay, response_failure
+
+
+@pytest.fixture
+def make_breaker(clock):
+    def make(**kwargs):
+        kwargs.setdefault("failure_threshold", 3)
+        kwargs.setdefault("open_seconds", 100)
+        kwargs.setdefault("max_open_seconds", 1000)
+        kwargs.setdefault("backoff_base", 10)
+        kwargs.setdefault("backoff_max", 80)
+        return CircuitBreaker(name="test", clock=clock, **kwargs)
+    return make
+
+
+def test_response_failure():
+    assert response_failure({"eaiCode": "SUCCESS"}) is None
+    assert response_failure({}) is None
+    assert response_failure({"eaiCode": "SYSTEM_BUSY"}) == "eaiCode SYSTEM_BUSY"
+
+
+def test_backoff_delay_doubles_up_to_the_cap():
+    for failures, full in ((1, 10), (2, 20), (3, 40), (6, 80)):
+        delay = backoff_delay(failures, base=10, cap=80)
+        assert full / 2 <= delay <= full
+
+
+def test_opens_after_consecutive_failures(make_breaker):
+    breaker = make_breaker()
+    for _ in range(2):
+        assert breaker.before_call() == 0
+        breaker.record_failure("boom")
+    assert breaker.state == CLOSED
+    assert breaker.next_delay(5) >= 10
+
+    breaker.before_call()
+    breaker.record_failure("boom")
+    assert breaker.state == OPEN
+    wait = breaker.before_call()
+    assert 90 <= wait <= 110
+
+
+def test_probe_success_closes_and_failure_reopens_longer(make_breaker, clock):
+    breaker = make_breaker(failure_threshold=1)
+    breaker.record_failure("boom")
+    clock.now += 111
+    assert breaker.before_call() == 0
+    assert breaker.state == HALF_OPEN
+
+    breaker.record_failure("still down")
+    assert breaker.state == OPEN
+    assert 180 <= breaker.before_call() <= 220
+
+    clock.now += 221
+    assert breaker.before_call() == 0
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+    assert breaker.next_delay(5) == 5
+
+
+def test_exhausted_retry_budget_opens(make_breaker):
+    breaker = make_breaker(failure_threshold=10, budget=RetryBudget(capacity=1, ratio=0))
+    breaker.record_failure("boom")
+    assert breaker.before_call() == 0  # Spends the only retry
+    breaker.record_failure("boom")
+    assert breaker.before_call() > 0
+    assert breaker.state == OPEN
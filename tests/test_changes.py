@@ -0,0 +1,58 @@
+"""Tests for the quota change detector (src/changes.py)."""
+from src.changes import QuotaChangeDetector
+
+
+def response(**quota):
+    return {"eaiCode": "SUCCESS", "dateQuota": {date.lstrip("d"): status for date, status in quota.items()}}
+
+
+def test_first_response_is_a_keyframe():
+    detector = QuotaChangeDetector()
+    change = detector.update(response(d20260301="F", d20260302="A"))
+    assert change.keyframe
+    assert change.opened == ["20260302"]
+    assert change.available_list == ["20260302"]
+    assert change.event() == ("key", {"20260301": "F", "20260302": "A"})
+
+
+def test_unchanged_quota_reports_nothing():
+    detector = QuotaChangeDetector()
+    detector.update(response(d20260301="F", d20260302="A"))
+    change = detector.update(response(d20260301="F", d20260302="A"))
+    assert not change.keyframe
+    assert change.changed == {}
+    assert change.available_list == ["20260302"]
+    assert change.event() is None
+
+
+def test_transitions_are_reported_as_deltas():
+    detector = QuotaChangeDetector()
+    detector.update(response(d20260301="F", d20260302="A", d20260303="F"))
+    change = detector.update(response(d20260301="A", d20260302="F", d20260304="F"))
+    assert change.opened == ["20260301"]
+    assert change.closed == ["20260302"]
+    assert change.changed == {
+        "20260301": ("F", "A"),
+        "20260302": ("A", "F"),
+        "20260303": ("F", None),
+        "20260304": (None, "F"),
+    }
+    assert change.event() == ("delta", {"20260301": "A", "20260302": "F", "20260303": None, "20260304": "F"})
+
+
+def test_keyframes_repeat_periodically():
+    detector = QuotaChangeDetector(keyframe_every=3)
+    keyframes = [detector.update(response(d20260301="F")).keyframe for _ in range(7)]
+    assert keyframes == [True, False, False, True, False, False, True]
+
+
+def test_throttled_response_keeps_the_previous_state():
+    detector = QuotaChangeDetector()
+    detector.update(response(d20260301="A"))
+    change = detector.update({"eaiCode": "SYSTEM_BUSY", "dateQuota": None})
+    assert change.quota == {}
+    assert change.changed == {}
+
+    change = detector.update(response(d20260301="A"))
+    assert change.changed == {}
+    assert change.available_list == ["20260301"]
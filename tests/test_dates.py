@@ -0,0 +1,67 @@
+"""Tests for the compiled date matcher (src/dates.py)."""
+from src.dates import DateMatcher, compile_dates, normalize_specs
+
+# A Monday
+TODAY = "20260302"
+
+
+def matcher(*specs):
+    return DateMatcher(normalize_specs(list(specs)), TODAY)
+
+
+def test_literal_dates_and_ranges():
+    dates = matcher("20260305", "20260310-20260312")
+    assert dates.filter(["20260304", "20260305", "20260310", "20260311", "20260312", "20260313"]) == [
+        "20260305", "20260310", "20260311", "20260312",
+    ]
+
+
+def test_all_matches_everything():
+    dates = matcher("all")
+    assert dates.everything
+    assert "20991231" in dates
+
+
+def test_weekdays_restrict_dates():
+    dates = matcher("20260301-20260310", "weekends")
+    assert dates.filter(["20260301", "20260302", "20260307", "20260308", "20260309"]) == [
+        "20260301", "20260307", "20260308",
+    ]
+
+
+def test_weekday_only_spec_matches_every_such_day():
+    dates = matcher("sat")
+    assert "20260307" in dates
+    assert "20260308" not in dates
+
+
+def test_exclusions_are_removed_last():
+    dates = matcher("20260301-20260331", "weekdays", "!20260305", "!fri")
+    assert "20260304" in dates
+    assert "20260305" not in dates
+    assert "20260306" not in dates
+    assert "20260307" not in dates
+
+
+def test_next_business_days_start_today():
+    dates = matcher("next:3")
+    assert sorted(dates.dates) == ["20260302", "20260303", "20260304"]
+
+
+def test_invalid_specs_are_ignored():
+    dates = matcher("tomorrow", "20260305")
+    assert dates.filter(["20260305", "20260306"]) == ["20260305"]
+
+
+def test_empty_spec_matches_nothing():
+    assert matcher().filter(["20260305"]) == []
+
+
+def test_dates_outside_the_window_use_the_rules():
+    dates = matcher("weekends")
+    assert "21000102" in dates  # A Saturday, far beyond the compiled window
+    assert "21000104" not in dates
+
+
+def test_compiled_matchers_are_shared():
+    assert compile_dates("20260305,20260306") is compile_dates(["20260305", "20260306"])
@@ -0,0 +1,44 @@
+"""Tests for the in-memory history ring (src/history_buffer.py)."""
+from src.history_buffer import HistoryRecord, HistoryRing
+
+
+def record(second):
+    return HistoryRecord(f"2026-03-01 10:00:{second:02d}", 0, [], "SUCCESS", None)
+
+
+def checked_at(records):
+    return [item.checked_at[-2:] for item in records]
+
+
+def test_ring_keeps_the_newest_records():
+    ring = HistoryRing(capacity=3)
+    for second in range(5):
+        ring.append(record(second))
+
+    snapshot = ring.snapshot()
+    assert len(snapshot) == 3
+    assert checked_at(snapshot) == ["02", "03", "04"]
+    assert checked_at(snapshot.latest(2)) == ["04", "03"]
+
+
+def test_old_snapshot_length_matches_records_still_readable():
+    ring = HistoryRing(capacity=4)
+    for second in range(4):
+        ring.append(record(second))
+    snapshot = ring.snapshot()
+
+    for second in range(4, 6):
+        ring.append(record(second))
+
+    assert len(snapshot) == 2
+    assert checked_at(snapshot) == ["02", "03"]
+    assert checked_at(snapshot.latest()) == ["03", "02"]
+
+
+def test_resize_keeps_the_newest_records():
+    ring = HistoryRing(capacity=4)
+    for second in range(4):
+        ring.append(record(second))
+    ring.resize(2)
+
+    assert checked_at(ring.snapshot()) == ["02", "03"]
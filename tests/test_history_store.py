@@ -0,0 +1,42 @@
+"""Tests for the SQLite history store (src/history_store.py)."""
+import pytest
+
+from src.history_store import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.db"))
+
+
+def test_cycles_in_the_same_second_are_all_kept(store):
+    store.record("2026-03-01 10:00:00", 0, [], "SUCCESS", None)
+    store.record("2026-03-01 10:00:00", 1, ["20260301"], "SUCCESS", None)
+    store.record_quota_event("2026-03-01 10:00:00", "key", {"20260301": "F"})
+    store.record_quota_event("2026-03-01 10:00:00", "delta", {"20260301": "A"})
+
+    assert store.count() == 2
+    assert [entry["available_num"] for entry in store.entries()] == [0, 1]
+    assert store.quota_at("2026-03-01 10:00:00") == {"20260301": "A"}
+
+
+def test_paging_does_not_skip_rows_sharing_a_second(store):
+    for second, num in (("00", 0), ("01", 1), ("01", 2), ("02", 3)):
+        store.record(f"2026-03-01 10:00:{second}", num, [], "SUCCESS", None)
+
+    first, cursor = store.page(limit=2)
+    second, last = store.page(before=cursor, limit=2)
+    assert [entry["available_num"] for entry in first] == [3, 2]
+    assert [entry["available_num"] for entry in second] == [1, 0]
+    assert last is None
+
+
+def test_backfill_skips_seconds_already_stored(store):
+    store.record("2026-03-01 10:00:00", 1, [], "SUCCESS", None)
+    entry = {"available_num": 0, "available_list": [], "eai_code": "SUCCESS", "error": None}
+    store.import_entries([
+        dict(entry, checked_at="2026-03-01 10:00:00"),
+        dict(entry, checked_at="2026-03-01 10:00:05"),
+    ])
+
+    assert [entry["available_num"] for entry in store.entries()] == [1, 0]
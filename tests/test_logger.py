@@ -0,0 +1,69 @@
+"""Tests for rebuilding history from log files (src/logger.py)."""
+import gzip
+import importlib
+
+import pytest
+
+# src re-exports the logger object under the submodule's name
+logger_module = importlib.import_module("src.logger")
+
+
+@pytest.fixture
+def logs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger_module, "LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(logger_module, "HISTORY_INDEX_DIR", str(tmp_path / ".history_index"))
+    monkeypatch.setattr(logger_module, "_history_index", None)
+    return tmp_path
+
+
+def cycle(checked_at, *dates):
+    return f"{checked_at},000 INFO: Monitor cycle: {len(dates)} available dates: {list(dates)}\n"
+
+
+def write_logs(logs_dir):
+    """Five daily files; the live 03 file repeats the last second of its rotated copy."""
+    for day in ("01", "02"):
+        (logs_dir / f"bochk_monitor_2026_03_{day}.log").write_text(
+            cycle(f"2026-03-{day} 10:00:00") + cycle(f"2026-03-{day} 10:01:00", "20260401")
+        )
+    with gzip.open(logs_dir / "bochk_monitor_2026_03_03.log.2026-03-03.gz", "wt") as handle:
+        handle.write(cycle("2026-03-03 09:00:00"))
+    (logs_dir / "bochk_monitor_2026_03_03.log").write_text(
+        cycle("2026-03-03 09:00:00", "20260402") + cycle("2026-03-03 12:00:00")
+    )
+    (logs_dir / "bochk_monitor_2026_03_04.log").write_text(
+        "2026-03-04 08:00:00,000 ERROR: Monitoring error: timeout\n"
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_history_is_merged_in_timestamp_order(logs_dir, monkeypatch, workers):
+    monkeypatch.setattr(logger_module, "HISTORY_PARSE_WORKERS", workers)
+    write_logs(logs_dir)
+
+    history = logger_module.read_history_from_logs()
+
+    assert [entry["checked_at"] for entry in history] == [
+        "2026-03-01 10:00:00",
+        "2026-03-01 10:01:00",
+        "2026-03-02 10:00:00",
+        "2026-03-02 10:01:00",
+        "2026-03-03 09:00:00",
+        "2026-03-03 12:00:00",
+        "2026-03-04 08:00:00",
+    ]
+    # The rotated copy holds the earlier lines, so its record wins
+    assert history[4]["available_list"] == []
+    assert history[-1]["error"] == "timeout"
+
+
+def test_appended_lines_are_picked_up_from_the_index(logs_dir):
+    write_logs(logs_dir)
+    logger_module.read_history_from_logs()
+
+    with open(logs_dir / "bochk_monitor_2026_03_04.log", "a") as handle:
+        handle.write(cycle("2026-03-04 09:00:00", "20260403"))
+    history = logger_module.read_history_from_logs()
+
+    assert history[-1]["available_list"] == ["20260403"]
+    assert len(history) == 8
@@ -0,0 +1,41 @@
+"""Tests for the subscriber index (src/subscriptions.py)."""
+from src.subscriptions import SubscriptionIndex
+
+
+def test_match_groups_dates_by_subscriber():
+    index = SubscriptionIndex.from_config([
+        {"name": "alice", "dates": ["20260301", "20260302"], "channels": {"email": "a@example.com"}},
+        {"name": "bob", "dates": "all", "channels": {"email": ["b@example.com"]}},
+    ])
+
+    matches = {subscriber.name: dates for subscriber, dates in index.match(["20260302", "20260303"]).items()}
+    assert matches == {"alice": ["20260302"], "bob": ["20260302", "20260303"]}
+
+
+def test_malformed_entries_are_skipped():
+    index = SubscriptionIndex.from_config([
+        "alice@example.com",
+        {"dates": ["20260301"]},
+        {"name": "  ", "dates": ["20260301"]},
+        {"name": "carol", "dates": 20260301},
+        {"name": "dave", "channels": ["d@example.com"]},
+        {"name": "erin", "channels": {"email": 42}},
+        {"name": "frank", "dates": ["20260301"], "channels": {"email": "f@example.com"}},
+        {"name": "frank", "dates": ["20260302"]},
+    ])
+
+    assert [subscriber.name for subscriber in index.subscribers] == ["frank"]
+    assert index.subscribers[0].channels == {"email": ["f@example.com"]}
+
+
+def test_non_list_config_is_ignored():
+    assert len(SubscriptionIndex.from_config({"name": "alice"})) == 0
+    assert len(SubscriptionIndex.from_config(None)) == 0
+
+
+def test_unsupported_channels_are_dropped():
+    index = SubscriptionIndex.from_config([
+        {"name": "alice", "dates": "all", "channels": {"email": "a@example.com", "webhook": "https://example.com"}},
+    ])
+
+    assert index.subscribers[0].channels == {"email": ["a@example.com"]}
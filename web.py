@@ -1,7 +1,8 @@
 """Entry point for Flask web application.
 
 This script starts the BOCHK monitoring web interface with the monitor
-running in a background thread. Used by Procfile for web dyno.
+running in a background thread. Used by Procfile for web dyno
+(``gunicorn 'web:create_app()'``: each worker builds its own app).
 
 Environment variables:
     PORT: Port to listen on (default: 5000)
@@ -10,15 +11,27 @@ Environment variables:
 """
 
 import os
-from src.app import app, monitor_state
+from src.app import create_app
+
+
+def __getattr__(name):
+    """Keep ``web:app`` and ``from web import app, monitor_state`` working (built on first access)."""
+    if name in ("app", "monitor_state"):
+        import src.app
+
+        return getattr(src.app, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
     # Get port from environment or use default
     port = int(os.getenv("PORT", 5000))
     host = os.getenv("HOST", "0.0.0.0")
 
+    app = create_app()
+
     # Start monitor in background thread
-    monitor_state.start()
+    app.extensions["monitor_state"].start()
 
     # In production, gunicorn will handle the web server
     # This block is for local development only